@@ -0,0 +1,220 @@
+'''batch analysis of Checkers positions from the command line
+
+reads positions in FEN, one per line, from files or stdin, and writes one
+JSON object per line for each, in the order of the input: its legal
+moves, whether the game is over, or the best move of a search to a fixed
+depth. blank lines and lines starting with # are skipped
+
+the positions are analysed in batches on a pool of worker processes. at
+most WINDOW batches per worker are read ahead of the output, so memory
+stays bounded however long the input is, and results stream out as soon
+as every position before them is done
+
+    python CheckersAnalyze.py search positions.txt --depth 8 > results.jsonl
+    cat positions.txt | python CheckersAnalyze.py moves'''
+import argparse
+from collections import deque
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from CheckersEngine import CheckersBoard
+import CheckersPDN
+from CheckersSearch import SearchEngine
+from CheckersTablebase import Tablebase
+from CheckersTransposition import TranspositionTable
+
+MODES = ('moves', 'endgame', 'search')
+
+# positions sent to a worker at once
+BATCH_SIZE = 32
+
+# batches read ahead of the output for each worker
+WINDOW = 4
+
+# engines and tablebases already built in this process
+_engines = {}
+_tablebases = {}
+
+
+def get_engine(memory):
+    '''get_engine(memory) -> SearchEngine
+    returns the engine of this process with a transposition table of memory bytes'''
+    if memory not in _engines:
+        _engines[memory] = SearchEngine(time_limit=float('inf'), table=TranspositionTable(memory))
+
+    return _engines[memory]
+
+
+def get_tablebase(path):
+    '''get_tablebase(path) -> Tablebase or None
+    returns the tablebase of path opened in this process, None if path is None'''
+    if path is None:
+        return None
+    if path not in _tablebases:
+        _tablebases[path] = Tablebase(path)
+
+    return _tablebases[path]
+
+
+def analyze_position(text, mode, depth=6, rows=8, columns=8, memory=4*1024*1024, tablebase_path=None):
+    '''analyze_position(text, mode[, depth=6, rows=8, columns=8, memory=4*1024*1024,
+                        tablebase_path=None]) -> dict
+    returns the analysis of the position in FEN text for mode
+        moves: the legal moves of the player to move
+        endgame: the winner if the game is over, None otherwise
+        search: the best move, its score and the nodes of a depth plies search
+    a position that cannot be read gives an error instead'''
+    result = {'fen': text}
+    try:
+        position = CheckersPDN.parse_fen(text, rows, columns)
+    except ValueError as error:
+        result['error'] = str(error)
+        return result
+
+    board = CheckersBoard(rows, columns)
+    board.set_position(position)
+    board.set_tablebase(get_tablebase(tablebase_path))
+    bitboard = board.get_bitboard()
+    result['player'] = board.get_player()
+
+    if mode == 'moves':
+        result['moves'] = [CheckersPDN.format_move(tuple(bitboard.square_index(pos) for pos in move.get_path()),
+                                                   bitboard) for move in board.get_legal_moves()]
+    elif mode == 'endgame':
+        board.check_endgame()
+        winner = board.get_endgame()
+        result['winner'] = winner
+        result['result'] = '*' if winner is None else CheckersPDN.RESULTS[winner]
+    else:
+        # every position is searched from a clean state, so the results do
+        # not depend on which worker searched which positions before
+        engine = get_engine(memory)
+        engine.table.clear()
+        engine.history = {}
+        engine.tablebase = get_tablebase(tablebase_path)
+        path = engine.search_bitboard(bitboard.copy(), float('inf'), depth)
+        stats = engine.get_stats()
+        result['move'] = None if path is None else CheckersPDN.format_move(path, bitboard)
+        result.update(score=stats['score'], depth=stats['depth'], nodes=stats['nodes'])
+
+    return result
+
+
+def analyze_batch(task):
+    '''analyze_batch(task) -> (list, int)
+    analyses the batch described by the tuple
+        (lines, mode, depth, rows, columns, memory, tablebase_path)
+    where lines are (line number, FEN) pairs
+    returns a JSON line for each and the number of positions not read'''
+    (lines, *options) = task
+    results = []
+    errors = 0
+    for (number, text) in lines:
+        result = {'line': number}
+        result.update(analyze_position(text, *options))
+        errors += 'error' in result
+        results.append(json.dumps(result) + '\n')
+
+    return (results, errors)
+
+
+def read_batches(lines, batch_size=BATCH_SIZE):
+    '''read_batches(lines[, batch_size=BATCH_SIZE]) -> generator
+    yields lists of at most batch_size (line number, FEN) pairs of lines,
+    numbered from 1, leaving out blank lines and comments'''
+    batch = []
+    for (number, line) in enumerate(lines, 1):
+        text = line.strip()
+        if text == '' or text.startswith('#'):
+            continue
+        batch.append((number, text))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def analyze(lines, out, mode, depth=6, workers=None, batch_size=BATCH_SIZE, rows=8, columns=8,
+            memory=4*1024*1024, tablebase_path=None):
+    '''analyze(lines, out, mode[, depth=6, workers=None, batch_size=BATCH_SIZE, rows=8, columns=8,
+               memory=4*1024*1024, tablebase_path=None]) -> dict
+    writes the analysis of every position of lines to out, one JSON line
+    each in the order of lines, on a pool of workers processes, one per
+    core if None, or in this process if 0
+    returns the number of positions, of errors and the seconds taken'''
+    if mode not in MODES:
+        raise ValueError(f'unknown mode {mode!r}')
+
+    totals = {'positions': 0, 'errors': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    tasks = ((batch, mode, depth, rows, columns, memory, tablebase_path)
+             for batch in read_batches(lines, batch_size))
+
+    def write(batch):
+        (results, errors) = batch
+        out.writelines(results)
+        out.flush()
+        totals['positions'] += len(results)
+        totals['errors'] += errors
+
+    if workers == 0:
+        for task in tasks:
+            write(analyze_batch(task))
+    else:
+        if workers is None:
+            workers = os.cpu_count()
+        with multiprocessing.Pool(workers) as pool:
+            # a window of batches in flight, written in order as the oldest finishes
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(analyze_batch, (task,)))
+                if len(pending) >= workers * WINDOW:
+                    write(pending.popleft().get())
+            while pending:
+                write(pending.popleft().get())
+
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='analyse Checkers positions given in FEN, one per line')
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('paths', nargs='*', help='files of positions, stdin if none or -')
+    parser.add_argument('--depth', type=int, default=6, help='plies searched in search mode')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, 0 for none')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='positions sent to a worker at once')
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--memory', type=int, default=4*1024*1024, help='transposition table bytes per worker')
+    parser.add_argument('--tablebase', default=None, help='an endgame tablebase file')
+    options = parser.parse_args(args)
+
+    def read_lines():
+        for path in options.paths or ['-']:
+            if path == '-':
+                yield from sys.stdin
+            else:
+                with open(path, encoding='utf-8') as lines:
+                    yield from lines
+
+    try:
+        totals = analyze(read_lines(), sys.stdout, options.mode, options.depth, options.workers, options.batch,
+                         options.rows, options.columns, options.memory, options.tablebase)
+    except BrokenPipeError:
+        # the reader of the output is gone, like head, nothing more to say
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    rate = totals['positions'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+    print(f"{totals['positions']:,} positions, {totals['errors']:,} errors in {totals['seconds']:.2f} s,"
+          f" {rate:,.0f} positions/sec", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+'''a SearchEngine running in a background thread, for interfaces that
+must keep handling events while the engine thinks
+
+the search runs on a copy of the position, so the board can be read and
+drawn meanwhile. the caller polls for progress and for the result, with
+Tk's after() for instance, and never blocks on the search
+
+pondering searches the position while the opponent thinks, with no time
+limit. its result is thrown away, but the transposition table keeps what
+it found for the search of the engine's next move'''
+import threading
+
+from CheckersSearch import SearchEngine
+
+
+class BackgroundEngine:
+    '''runs the searches of a SearchEngine in a background thread'''
+
+    def __init__(self, engine=None):
+        '''BackgroundEngine([engine=None])
+        creates a background runner for engine, a new SearchEngine if None'''
+        if engine is None:
+            engine = SearchEngine()
+
+        # attributes
+        self.engine = engine
+        self.thread = None
+        self.pondering = False
+        self.result = None
+        self.finished = False
+
+    def get_engine(self):
+        '''BackgroundEngine.get_engine() -> SearchEngine
+        returns the engine searching in the background'''
+        return self.engine
+
+    def start(self, board, time_limit=None, ponder=False):
+        '''BackgroundEngine.start(board[, time_limit=None, ponder=False])
+        stops any running search and starts searching the position of the
+        CheckersBoard board for time_limit seconds, the engine's limit if None
+        a ponder search runs until it is stopped'''
+        self.stop()
+        bitboard = board.get_bitboard().copy()
+        if ponder:
+            time_limit = float('inf')
+
+        # attributes
+        self.pondering = ponder
+        self.result = None
+        self.finished = False
+        self.engine.stop_requested = False
+        self.thread = threading.Thread(target=self.run, args=(bitboard, time_limit), daemon=True)
+        self.thread.start()
+
+    def run(self, bitboard, time_limit):
+        '''BackgroundEngine.run(bitboard, time_limit)
+        searches bitboard, runs in the background thread'''
+        self.result = self.engine.search_bitboard(bitboard, time_limit)
+        self.finished = True
+
+    def stop(self):
+        '''BackgroundEngine.stop()
+        cancels the running search, if any, and waits for it to end
+        its result is dropped'''
+        if self.thread is not None:
+            self.engine.stop()
+            self.thread.join()
+            self.thread = None
+        self.pondering = False
+        self.result = None
+        self.finished = False
+
+    def is_thinking(self):
+        '''BackgroundEngine.is_thinking() -> bool
+        returns whether a search for a move, not pondering, is running'''
+        return self.thread is not None and not self.pondering and not self.finished
+
+    def is_pondering(self):
+        '''BackgroundEngine.is_pondering() -> bool
+        returns whether the engine is pondering'''
+        return self.thread is not None and self.pondering and not self.finished
+
+    def get_result(self):
+        '''BackgroundEngine.get_result() -> tuple or None
+        returns the move found, as a tuple of squares, once a search for a
+        move has finished, and forgets it, otherwise returns None'''
+        if self.thread is None or self.pondering or not self.finished:
+            return None
+
+        self.thread.join()
+        result = self.result
+        self.thread = None
+        self.result = None
+        self.finished = False
+        return result
+
+    def get_progress(self):
+        '''BackgroundEngine.get_progress() -> dict
+        returns the progress of the running or last search, see SearchEngine.get_progress'''
+        return self.engine.get_progress()
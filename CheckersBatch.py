@@ -0,0 +1,102 @@
+'''batched move generation for many Checkers positions at once with NumPy
+
+positions are encoded as rows of four unsigned 64-bit integers: the masks
+of player 0, player 1 and the kings, and the player to move, the same
+values Bitboard.get_position returns. boards of up to 64 dark squares fit
+
+like get_playable_pieces, the moves found are single steps: a jump is
+the first jump of a sequence, and jumps are forced per position'''
+import numpy as np
+
+from CheckersBitboard import DIRECTIONS, KING_DIRECTIONS, MAN_DIRECTIONS, OPPOSITE, get_shift_table, iter_bits
+
+
+def encode_positions(positions):
+    '''encode_positions(positions) -> numpy.ndarray
+    returns an (N, 4) uint64 array of positions returned by Bitboard.get_position'''
+    return np.array(positions, dtype=np.uint64).reshape(-1, 4)
+
+
+class BatchMoveGenerator:
+    '''generates the legal moves of arrays of positions of one board size'''
+
+    def __init__(self, rows=8, columns=8):
+        '''BatchMoveGenerator([rows=8, columns=8])
+        creates a generator for boards of rows * columns'''
+        if rows * (columns//2) > 64:
+            raise ValueError('boards with more than 64 dark squares do not fit in 64 bits')
+
+        # the shifts of the bitboard, as NumPy scalars
+        self.rows = rows
+        self.columns = columns
+        self.shifts = [[(np.uint64(abs(shift)), shift > 0, np.uint64(source)) for (shift, source) in pairs]
+                       for pairs in get_shift_table(rows, columns)]
+        self.jump_shifts = tuple(2*dr*(columns//2) + dc for (dr, dc) in DIRECTIONS)
+        self.full = np.uint64((1 << (rows * (columns//2))) - 1)
+
+    def step(self, masks, direction):
+        '''BatchMoveGenerator.step(masks, direction) -> numpy.ndarray
+        returns masks with every square moved one step in direction'''
+        result = np.zeros_like(masks)
+        for (shift, left, source) in self.shifts[direction]:
+            if left:
+                result |= (masks & source) << shift
+            else:
+                result |= (masks & source) >> shift
+
+        return result
+
+    def generate(self, positions):
+        '''BatchMoveGenerator.generate(positions) -> (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        returns, for an (N, 4) array of positions,
+            the (N, 4) masks of the pieces that can move in each direction
+            the (N, 4) masks of the pieces that can jump in each direction
+            the (N,) bool array of the positions where jumps are forced
+        simple moves are cleared where jumps are forced'''
+        positions = np.asarray(positions, dtype=np.uint64)
+        player = positions[:, 3]
+        own = np.where(player == 0, positions[:, 0], positions[:, 1])
+        enemy = np.where(player == 0, positions[:, 1], positions[:, 0])
+        own_kings = own & positions[:, 2]
+        empty = ~(positions[:, 0] | positions[:, 1]) & self.full
+
+        moves = np.zeros((len(positions), 4), dtype=np.uint64)
+        jumps = np.zeros((len(positions), 4), dtype=np.uint64)
+        for direction in KING_DIRECTIONS:
+            # men only move forward, kings move in every direction
+            forward = 0 if direction in MAN_DIRECTIONS[0] else 1
+            able = np.where(player == forward, own, own_kings)
+
+            back = OPPOSITE[direction]
+            moves[:, direction] = self.step(empty, back) & able
+            jumps[:, direction] = self.step(self.step(empty, back) & enemy, back) & able
+
+        # jumps are forced
+        has_jump = (jumps != 0).any(axis=1)
+        moves[has_jump] = 0
+        return (moves, jumps, has_jump)
+
+    def count_moves(self, positions):
+        '''BatchMoveGenerator.count_moves(positions) -> numpy.ndarray
+        returns the number of legal steps of each position'''
+        (moves, jumps, _) = self.generate(positions)
+        return np.bitwise_count(moves).sum(axis=1) + np.bitwise_count(jumps).sum(axis=1)
+
+    def get_playable_moves(self, moves, jumps, has_jump, row):
+        '''BatchMoveGenerator.get_playable_moves(moves, jumps, has_jump, row) -> dict
+        returns the result of generate for position row in the form of
+        Bitboard.get_playable_moves
+            key: square, value: squares the piece can go to'''
+        playable = {}
+        for direction in KING_DIRECTIONS:
+            for (shift, source) in get_shift_table(self.rows, self.columns)[direction]:
+                # every jump in one direction lands the same number of squares away
+                if has_jump[row]:
+                    (sources, distance) = (int(jumps[row, direction]) & source, self.jump_shifts[direction])
+                else:
+                    (sources, distance) = (int(moves[row, direction]) & source, shift)
+
+                for start in iter_bits(sources):
+                    playable.setdefault(start, []).append(start + distance)
+
+        return playable
@@ -0,0 +1,504 @@
+'''bitboard representation of a Checkers position
+
+the dark squares are numbered row by row from the top left, so on an
+8x8 board square 0 is (0, 1), square 3 is (0, 7) and square 4 is (1, 0)
+a position is a mask per player plus a mask of the kings'''
+import random
+
+# diagonal directions: up-left, up-right, down-left, down-right
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+OPPOSITE = (3, 2, 1, 0)
+
+# directions a man can move in for player 0 (up) and player 1 (down)
+MAN_DIRECTIONS = ((0, 1), (2, 3))
+KING_DIRECTIONS = (0, 1, 2, 3)
+
+# shift tables, square tables and zobrist keys already built for each board size
+_shift_tables = {}
+_square_tables = {}
+_zobrist_keys = {}
+
+# the zobrist keys are drawn from a fixed seed so hashes are the same in every process
+ZOBRIST_SEED = 20240101
+
+
+def position_to_index(pos, columns=8):
+    '''position_to_index(pos[, columns=8]) -> int or None
+    returns the square number of pos
+    returns None if pos is not a dark square'''
+    (row, col) = pos
+    if row % 2 == col % 2:
+        return None
+
+    return row * (columns//2) + col//2
+
+
+def index_to_position(index, columns=8):
+    '''index_to_position(index[, columns=8]) -> (int, int)
+    returns the position of square number index'''
+    (row, k) = divmod(index, columns//2)
+    if row % 2 == 0:
+        return (row, 2*k + 1)
+    else:
+        return (row, 2*k)
+
+
+def iter_bits(mask):
+    '''iter_bits(mask) -> generator
+    yields the square numbers set in mask, lowest first'''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def get_shift_table(rows, columns):
+    '''get_shift_table(rows, columns) -> tuple
+    returns, for each direction, the (shift, source mask) pairs that move
+    every square of a mask one step in that direction'''
+    if (rows, columns) not in _shift_tables:
+        table = []
+        for (dr, dc) in DIRECTIONS:
+            shifts = {}
+            for index in range(rows * (columns//2)):
+                (row, col) = index_to_position(index, columns)
+
+                # group the squares that have a neighbor by the shift that reaches it
+                if (0 <= row+dr < rows) and (0 <= col+dc < columns):
+                    shift = position_to_index((row+dr, col+dc), columns) - index
+                    shifts[shift] = shifts.get(shift, 0) | (1 << index)
+            table.append(tuple(shifts.items()))
+
+        _shift_tables[(rows, columns)] = tuple(table)
+
+    return _shift_tables[(rows, columns)]
+
+
+def get_square_tables(rows, columns):
+    '''get_square_tables(rows, columns) -> (tuple, tuple, dict, tuple)
+    returns the tables of the squares of a rows * columns board
+        for each square and direction, the neighbor square or None
+        for each square and direction, the squares jumped over and landed on or None
+        the square jumped over by each (start, landing) pair
+        the position of each square'''
+    if (rows, columns) not in _square_tables:
+        num_squares = rows * (columns//2)
+        positions = tuple(index_to_position(index, columns) for index in range(num_squares))
+
+        def square(row, col):
+            if (0 <= row < rows) and (0 <= col < columns):
+                return position_to_index((row, col), columns)
+            return None
+
+        neighbors = []
+        jumps = []
+        middles = {}
+        for (row, col) in positions:
+            neighbors.append(tuple(square(row+dr, col+dc) for (dr, dc) in DIRECTIONS))
+            square_jumps = []
+            for (dr, dc) in DIRECTIONS:
+                (over, end) = (square(row+dr, col+dc), square(row+2*dr, col+2*dc))
+                if end is None:
+                    square_jumps.append(None)
+                else:
+                    square_jumps.append((over, end))
+                    middles[(position_to_index((row, col), columns), end)] = over
+            jumps.append(tuple(square_jumps))
+
+        _square_tables[(rows, columns)] = (tuple(neighbors), tuple(jumps), middles, positions)
+
+    return _square_tables[(rows, columns)]
+
+
+def get_zobrist_keys(num_squares):
+    '''get_zobrist_keys(num_squares) -> (list, int)
+    returns the random 64-bit keys of each piece on each square,
+    indexed [player][is_king][square], and the key of player 1 to move'''
+    if num_squares not in _zobrist_keys:
+        rng = random.Random(ZOBRIST_SEED + num_squares)
+        keys = [[[rng.getrandbits(64) for _ in range(num_squares)] for is_king in (0, 1)] for player in (0, 1)]
+        _zobrist_keys[num_squares] = (keys, rng.getrandbits(64))
+
+    return _zobrist_keys[num_squares]
+
+
+class Bitboard:
+    '''represents a Checkers position as bit masks over the dark squares'''
+
+    def __init__(self, rows=8, columns=8):
+        '''Bitboard([rows=8, columns=8])
+        creates a Bitboard in starting position'''
+        if columns % 2 != 0:
+            raise ValueError('columns must be even')
+
+        # attributes
+        self.rows = rows
+        self.columns = columns
+        self.num_squares = rows * (columns//2)
+        self.full = (1 << self.num_squares) - 1
+        self.shifts = get_shift_table(rows, columns)
+        (self.neighbors, self.jump_squares, self.middles, self.positions) = get_square_tables(rows, columns)
+        self.jump_shifts = tuple(2*dr*(columns//2) + dc for (dr, dc) in DIRECTIONS)
+        self.crown_rows = (0, rows-1)
+        self.pieces = [0, 0]
+        self.kings = 0
+        self.player = 0
+        self.undo_stack = []
+        (self.zobrist, self.zobrist_player) = get_zobrist_keys(self.num_squares)
+
+        # find starting positions
+        for index in range(self.num_squares):
+            row = index // (columns//2)
+            if row < rows//2 - 1:
+                # player 1
+                self.pieces[1] |= 1 << index
+            elif row > rows//2:
+                # player 0
+                self.pieces[0] |= 1 << index
+        self.hash = self.compute_hash()
+
+    def copy(self):
+        '''Bitboard.copy() -> Bitboard
+        returns a copy of the position'''
+        other = Bitboard.__new__(Bitboard)
+        other.__dict__.update(self.__dict__)
+        other.pieces = self.pieces[:]
+        other.undo_stack = []
+        return other
+
+    def get_position(self):
+        '''Bitboard.get_position() -> (int, int, int, int)
+        returns the masks of player 0, player 1, kings and the player to move'''
+        return (self.pieces[0], self.pieces[1], self.kings, self.player)
+
+    def set_position(self, position, hash_value=None):
+        '''Bitboard.set_position(position[, hash_value=None])
+        sets the masks from a tuple returned by get_position
+        hash_value is the known hash of position, computed if None'''
+        (self.pieces[0], self.pieces[1], self.kings, self.player) = position
+        if hash_value is None:
+            hash_value = self.compute_hash()
+        self.hash = hash_value
+
+    def compute_hash(self):
+        '''Bitboard.compute_hash() -> int
+        returns the zobrist hash of the position computed from scratch
+        the hash attribute is kept equal to it as the position changes'''
+        value = self.zobrist_player if self.player == 1 else 0
+        for player in (0, 1):
+            for index in iter_bits(self.pieces[player]):
+                value ^= self.zobrist[player][(self.kings >> index) & 1][index]
+
+        return value
+
+    def get_hash(self):
+        '''Bitboard.get_hash() -> int
+        returns the zobrist hash of the position'''
+        return self.hash
+
+    def square_index(self, pos):
+        '''Bitboard.square_index(pos) -> int or None
+        returns the square number of pos
+        returns None if pos is off the board or not a dark square'''
+        if not ((0 <= pos[0] < self.rows) and (0 <= pos[1] < self.columns)):
+            return None
+
+        return position_to_index(pos, self.columns)
+
+    def square_position(self, index):
+        '''Bitboard.square_position(index) -> (int, int)
+        returns the position of square number index'''
+        return self.positions[index]
+
+    def get_piece(self, index):
+        '''Bitboard.get_piece(index) -> (int, bool) or None
+        returns the player and king status of the piece on square index
+        returns None if the square is empty'''
+        bit = 1 << index
+        for player in (0, 1):
+            if self.pieces[player] & bit:
+                return (player, bool(self.kings & bit))
+
+        return None
+
+    def get_empty(self):
+        '''Bitboard.get_empty() -> int
+        returns the mask of empty squares'''
+        return self.full & ~(self.pieces[0] | self.pieces[1])
+
+    def step(self, mask, direction):
+        '''Bitboard.step(mask, direction) -> int
+        returns mask with every square moved one step in direction
+        squares that would leave the board are dropped'''
+        result = 0
+        for (shift, source) in self.shifts[direction]:
+            if shift > 0:
+                result |= (mask & source) << shift
+            else:
+                result |= (mask & source) >> -shift
+
+        return result
+
+    def add_piece(self, index, player, is_king=False):
+        '''Bitboard.add_piece(index, player[, is_king=False])
+        puts a piece of player on square index'''
+        self.pieces[player] |= 1 << index
+        if is_king:
+            self.kings |= 1 << index
+        self.hash ^= self.zobrist[player][int(is_king)][index]
+
+    def remove_piece(self, index):
+        '''Bitboard.remove_piece(index)
+        removes the piece on square index'''
+        piece = self.get_piece(index)
+        if piece is not None:
+            self.hash ^= self.zobrist[piece[0]][int(piece[1])][index]
+
+        clear = ~(1 << index)
+        self.pieces[0] &= clear
+        self.pieces[1] &= clear
+        self.kings &= clear
+
+    def move_piece(self, start, end):
+        '''Bitboard.move_piece(start, end)
+        moves the piece on square start to square end'''
+        bits = (1 << start) | (1 << end)
+        is_king = (self.kings >> start) & 1
+        for player in (0, 1):
+            if self.pieces[player] & (1 << start):
+                self.pieces[player] ^= bits
+                keys = self.zobrist[player][is_king]
+                self.hash ^= keys[start] ^ keys[end]
+        if is_king:
+            self.kings ^= bits
+
+    def make_king(self, index):
+        '''Bitboard.make_king(index)
+        turns the piece on square index into a king'''
+        bit = 1 << index
+        if self.kings & bit:
+            return
+
+        self.kings |= bit
+        for player in (0, 1):
+            if self.pieces[player] & bit:
+                self.hash ^= self.zobrist[player][0][index] ^ self.zobrist[player][1][index]
+
+    def promote(self, index):
+        '''Bitboard.promote(index) -> bool
+        turns the man on square index into a king if it reached the far row
+        returns True if it was crowned'''
+        bit = 1 << index
+        if self.kings & bit:
+            return False
+
+        row = index // (self.columns//2)
+        for player in (0, 1):
+            if self.pieces[player] & bit and row == self.crown_rows[player]:
+                self.make_king(index)
+                return True
+
+        return False
+
+    def get_middle(self, start, end):
+        '''Bitboard.get_middle(start, end) -> int
+        returns the square jumped over going from square start to square end'''
+        return self.middles[(start, end)]
+
+    def is_jump(self, start, end):
+        '''Bitboard.is_jump(start, end) -> bool
+        returns whether going from square start to square end is a jump'''
+        return abs(start//(self.columns//2) - end//(self.columns//2)) == 2
+
+    def next_player(self):
+        '''Bitboard.next_player()
+        goes to the next player'''
+        self.player = 1 - self.player
+        self.hash ^= self.zobrist_player
+
+    def get_movers(self, player):
+        '''Bitboard.get_movers(player) -> int
+        returns the mask of player's pieces that can make a simple move'''
+        empty = self.get_empty()
+        own = self.pieces[player]
+        movers = 0
+        for direction in KING_DIRECTIONS:
+            # men only move forward, kings move in every direction
+            if direction in MAN_DIRECTIONS[player]:
+                able = own
+            else:
+                able = own & self.kings
+            movers |= self.step(empty, OPPOSITE[direction]) & able
+
+        return movers
+
+    def get_jumpers(self, player):
+        '''Bitboard.get_jumpers(player) -> int
+        returns the mask of player's pieces that can jump'''
+        empty = self.get_empty()
+        own = self.pieces[player]
+        enemy = self.pieces[1-player]
+        jumpers = 0
+        for direction in KING_DIRECTIONS:
+            if direction in MAN_DIRECTIONS[player]:
+                able = own
+            else:
+                able = own & self.kings
+            # an enemy piece with an empty square behind it
+            targets = self.step(empty, OPPOSITE[direction]) & enemy
+            jumpers |= self.step(targets, OPPOSITE[direction]) & able
+
+        return jumpers
+
+    def count_steps(self, player):
+        '''Bitboard.count_steps(player) -> int
+        returns the number of simple moves of player's pieces, forced jumps aside'''
+        empty = self.get_empty()
+        own = self.pieces[player]
+        steps = 0
+        for direction in KING_DIRECTIONS:
+            if direction in MAN_DIRECTIONS[player]:
+                able = own
+            else:
+                able = own & self.kings
+            steps += (self.step(empty, OPPOSITE[direction]) & able).bit_count()
+
+        return steps
+
+    def get_directions(self, index):
+        '''Bitboard.get_directions(index) -> tuple
+        returns the directions the piece on square index can move in'''
+        bit = 1 << index
+        if self.kings & bit:
+            return KING_DIRECTIONS
+        elif self.pieces[0] & bit:
+            return MAN_DIRECTIONS[0]
+        else:
+            return MAN_DIRECTIONS[1]
+
+    def get_moves(self, index):
+        '''Bitboard.get_moves(index) -> list
+        returns the squares the piece on square index can move to'''
+        occupied = self.pieces[0] | self.pieces[1]
+        neighbors = self.neighbors[index]
+        moves = []
+        for direction in self.get_directions(index):
+            end = neighbors[direction]
+            if end is not None and not (occupied >> end) & 1:
+                moves.append(end)
+
+        return moves
+
+    def get_jumps(self, index):
+        '''Bitboard.get_jumps(index) -> list
+        returns the squares the piece on square index can jump to'''
+        occupied = self.pieces[0] | self.pieces[1]
+        if (self.pieces[0] >> index) & 1:
+            enemy = self.pieces[1]
+        else:
+            enemy = self.pieces[0]
+        squares = self.jump_squares[index]
+        jumps = []
+        for direction in self.get_directions(index):
+            if squares[direction] is not None:
+                (over, end) = squares[direction]
+                if (enemy >> over) & 1 and not (occupied >> end) & 1:
+                    jumps.append(end)
+
+        return jumps
+
+    def get_playable_moves(self):
+        '''Bitboard.get_playable_moves() -> dict
+        returns a dict of the squares whose piece can be played
+            key: square, value: squares the piece can go to
+        jumps are forced, so only jumps are returned if there are any'''
+        own = self.pieces[self.player]
+        enemy = self.pieces[1-self.player]
+        empty = self.get_empty()
+        playable = {}
+        for direction in KING_DIRECTIONS:
+            if direction in MAN_DIRECTIONS[self.player]:
+                able = own
+            else:
+                able = own & self.kings
+
+            # every jump in one direction lands the same number of squares away
+            targets = self.step(self.step(able, direction) & enemy, direction) & empty
+            for end in iter_bits(targets):
+                playable.setdefault(end - self.jump_shifts[direction], []).append(end)
+
+        # jumps are forced
+        if len(playable) > 0:
+            return playable
+
+        for direction in KING_DIRECTIONS:
+            if direction in MAN_DIRECTIONS[self.player]:
+                able = own
+            else:
+                able = own & self.kings
+
+            # shift each group of squares separately to know where the moves came from
+            for (shift, source) in self.shifts[direction]:
+                if shift > 0:
+                    targets = ((able & source) << shift) & empty
+                else:
+                    targets = ((able & source) >> -shift) & empty
+                for end in iter_bits(targets):
+                    playable.setdefault(end - shift, []).append(end)
+
+        return playable
+
+    def add_jump_sequences(self, path, sequences):
+        '''Bitboard.add_jump_sequences(path, sequences)
+        appends to sequences every complete jump sequence that continues path
+        a sequence ends when the piece cannot jump again or has just been crowned'''
+        start = path[-1]
+        for end in self.get_jumps(start):
+            position = self.get_position()
+            hash_value = self.hash
+            self.move_piece(start, end)
+            self.remove_piece(self.get_middle(start, end))
+
+            # crowning ends the move, like it does in the game
+            if self.promote(end) or len(self.get_jumps(end)) == 0:
+                sequences.append(path + (end,))
+            else:
+                self.add_jump_sequences(path + (end,), sequences)
+
+            self.set_position(position, hash_value)
+
+    def get_legal_moves(self):
+        '''Bitboard.get_legal_moves() -> list
+        returns the complete moves of the player to move as tuples of squares
+        a jump move lists every square the piece lands on'''
+        jumpers = self.get_jumpers(self.player)
+
+        # jumps are forced
+        if jumpers:
+            sequences = []
+            for start in iter_bits(jumpers):
+                self.add_jump_sequences((start,), sequences)
+            return sequences
+
+        return [(start, end) for (start, ends) in self.get_playable_moves().items() for end in ends]
+
+    def play_move(self, move):
+        '''Bitboard.play_move(move)
+        plays a move returned by get_legal_moves and goes to the next player'''
+        for (start, end) in zip(move, move[1:]):
+            self.move_piece(start, end)
+            if self.is_jump(start, end):
+                self.remove_piece(self.get_middle(start, end))
+        self.promote(move[-1])
+        self.next_player()
+
+    def make_move(self, move):
+        '''Bitboard.make_move(move)
+        plays move like play_move, remembering the position so unmake_move can restore it'''
+        self.undo_stack.append((self.pieces[0], self.pieces[1], self.kings, self.player, self.hash))
+        self.play_move(move)
+
+    def unmake_move(self):
+        '''Bitboard.unmake_move()
+        takes back the last move played with make_move'''
+        (self.pieces[0], self.pieces[1], self.kings, self.player, self.hash) = self.undo_stack.pop()
@@ -0,0 +1,316 @@
+'''opening book for Checkers
+
+build replays games, self-played or read from PDN files and game archives,
+and counts for every position of their first plies how often each move
+was played and how the games ended. the counts are written as
+fixed-width records sorted by the zobrist hash of the position, and Book
+reads them through mmap, so opening a book reads nothing but its header
+and a lookup is a binary search touching a few pages
+
+    python CheckersBook.py selfplay book.ckob --games 2000 -a search --time 0.05 --noise 0.2
+    python CheckersBook.py build book.ckob games.pdn games.ckga
+    python CheckersBook.py probe book.ckob'''
+import argparse
+import math
+import mmap
+import multiprocessing
+import random
+import struct
+import sys
+import time
+
+from CheckersBitboard import Bitboard
+from CheckersEngine import CheckersBoard
+import CheckersPDN
+
+# the plies of a game counted into the book
+BOOK_PLIES = 16
+
+# standard normal quantile of the confidence a book move's score is bounded with
+CONFIDENCE_Z = 1.96
+
+# file layout: a header, then one record per position and move sorted by hash
+# a move is its index among the sorted legal moves of the position
+MAGIC = b'CKOB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBI')
+RECORD = struct.Struct('<QHIII')
+KEY = struct.Struct('<Q')
+
+
+def count_games(records, max_plies=BOOK_PLIES, rows=8, columns=8, counts=None, skipped=None):
+    '''count_games(records[, max_plies=BOOK_PLIES, rows=8, columns=8, counts=None, skipped=None]) -> dict
+    adds the first max_plies moves of the replayed GameRecords records to counts,
+    a dict of position hash -> {move index: [games, wins, draws]}, new if None
+    wins are counted for the player making the move
+    the plies of each record in the sequence skipped, like random moves, are
+    played but not counted
+    games without a result or of another board size are skipped'''
+    if counts is None:
+        counts = {}
+    if skipped is None:
+        skipped = [()] * len(records)
+
+    for (record, skip) in zip(records, skipped):
+        result = record.get_result()
+        if result == '*' or (record.rows, record.columns) != (rows, columns):
+            continue
+
+        bitboard = Bitboard(rows, columns)
+        bitboard.set_position(record.get_start())
+        for (ply, move) in enumerate(record.get_moves()[:max_plies]):
+            legal = sorted(bitboard.get_legal_moves())
+            if move not in legal:
+                # a jump sequence given by its ends only, the record was not replayed
+                break
+            if ply in skip:
+                bitboard.play_move(move)
+                continue
+
+            index = legal.index(move)
+            entry = counts.setdefault(bitboard.get_hash(), {}).setdefault(index, [0, 0, 0])
+            entry[0] += 1
+            if result == '1/2-1/2':
+                entry[2] += 1
+            elif CheckersPDN.RESULTS.index(result) == bitboard.player:
+                entry[1] += 1
+            bitboard.play_move(move)
+
+    return counts
+
+
+def write_book(path, counts, max_plies=BOOK_PLIES, rows=8, columns=8, min_games=1):
+    '''write_book(path, counts[, max_plies=BOOK_PLIES, rows=8, columns=8, min_games=1]) -> int
+    writes the moves of counts played in at least min_games games to the file path
+    returns the number of records written'''
+    records = sorted((key, index, *entry) for (key, moves) in counts.items()
+                     for (index, entry) in moves.items() if entry[0] >= min_games)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, columns, max_plies, len(records)))
+        for record in records:
+            f.write(RECORD.pack(*record))
+
+    return len(records)
+
+
+def play_selfplay(task):
+    '''play_selfplay(task) -> (GameRecord, tuple)
+    plays one game described by the tuple
+        (spec, time_limit, opening_plies, noise, seed, max_plies)
+    where each of the first opening_plies moves is a random one with the
+    chance noise, and returns its record and the plies played at random
+    a game reaching max_plies is drawn'''
+    from CheckersTournament import get_player
+
+    (spec, time_limit, opening_plies, noise, seed, max_plies) = task
+    player = get_player(spec, time_limit)
+    player.new_game()
+    board = CheckersBoard()
+
+    rng = random.Random(seed)
+    plies = 0
+    random_plies = []
+    board.check_endgame()
+    while board.get_endgame() is None and plies < max_plies:
+        if plies < opening_plies and rng.random() < noise:
+            board.make_move(rng.choice(board.get_legal_moves()))
+            random_plies.append(plies)
+        else:
+            board.make_move(player.choose_move(board))
+        plies += 1
+        board.check_endgame()
+
+    record = CheckersPDN.record_board(board)
+    if record.result == '*':
+        record.result = '1/2-1/2'
+    return (record, tuple(random_plies))
+
+
+def selfplay(path, games, spec='search', time_limit=0.05, opening_plies=BOOK_PLIES, noise=0.2, max_plies=BOOK_PLIES,
+             workers=None, seed=0, min_games=1, out=None):
+    '''selfplay(path, games[, spec='search', time_limit=0.05, opening_plies=BOOK_PLIES, noise=0.2,
+                max_plies=BOOK_PLIES, workers=None, seed=0, min_games=1, out=None]) -> int
+    plays games games of the player spec against itself, thinking time_limit
+    seconds a move, on a pool of workers processes, and writes the book of
+    their first max_plies plies to path
+    the games vary by playing each of their first opening_plies moves at
+    random with the chance noise. the random moves are left out of the book,
+    so from the start position on it holds the moves of the player itself
+    the games are played to the end
+    returns the number of records written, progress is printed to out if not None'''
+    from CheckersTournament import MAX_PLIES
+
+    tasks = [(spec, time_limit, opening_plies, noise, seed * 1000003 + game, MAX_PLIES) for game in range(games)]
+    counts = {}
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for (done, (record, random_plies)) in enumerate(pool.imap_unordered(play_selfplay, tasks), 1):
+            count_games([record], max_plies, counts=counts, skipped=[random_plies])
+            if out is not None and done % 100 == 0:
+                print(f'{done} games, {len(counts):,} positions, {time.perf_counter() - start:.1f} s',
+                      file=out, flush=True)
+
+    return write_book(path, counts, max_plies, min_games=min_games)
+
+
+class Book:
+    '''represents an opening book file, read through mmap'''
+
+    def __init__(self, path):
+        '''Book(path)
+        opens the book written by write_book to path'''
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.rows, self.columns, self.max_plies, self.count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an opening book')
+
+        # attributes
+        self.path = path
+        self.probes = 0
+        self.hits = 0
+
+    def close(self):
+        '''Book.close()
+        closes the file'''
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def get_count(self):
+        '''Book.get_count() -> int
+        returns the number of position and move records'''
+        return self.count
+
+    def get_stats(self):
+        '''Book.get_stats() -> dict
+        returns the number of lookups and of positions found'''
+        return {'probes': self.probes, 'hits': self.hits}
+
+    def lookup(self, bitboard):
+        '''Book.lookup(bitboard) -> list
+        returns the book moves of the position of bitboard as
+        (move, games, wins, draws) tuples, the most played first
+        move is a tuple of squares, wins are counted for the player to move'''
+        if (bitboard.rows, bitboard.columns) != (self.rows, self.columns):
+            return []
+
+        self.probes += 1
+        key = bitboard.get_hash()
+
+        # binary search for the first record of the position
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, HEADER.size + middle*RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        legal = None
+        while low < self.count:
+            (found, index, games, wins, draws) = RECORD.unpack_from(self.data, HEADER.size + low*RECORD.size)
+            if found != key:
+                break
+            if legal is None:
+                legal = sorted(bitboard.get_legal_moves())
+            if index >= len(legal):
+                # another position with the same hash
+                return []
+            entries.append((legal[index], games, wins, draws))
+            low += 1
+
+        if entries:
+            self.hits += 1
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        return entries
+
+    def choose(self, bitboard, rng=None, min_games=1):
+        '''Book.choose(bitboard[, rng=None, min_games=1]) -> tuple or None
+        returns a book move of the position of bitboard played in at least
+        min_games games, the one whose score, (wins + draws/2) / games, is
+        best at the lower bound of its confidence interval, so a move played
+        once does not beat one played often, or one drawn at random in
+        proportion to the points it scored if rng is a random generator
+        returns None if the position is not in the book'''
+        entries = [entry for entry in self.lookup(bitboard) if entry[1] >= min_games]
+        if len(entries) == 0:
+            return None
+
+        points = [wins + draws/2 for (_, _, wins, draws) in entries]
+        if rng is not None and sum(points) > 0:
+            return rng.choices([entry[0] for entry in entries], points)[0]
+
+        # the best bound, the most played among equal bounds
+        best = max(range(len(entries)), key=lambda i: (score_bound(points[i], entries[i][1]), entries[i][1]))
+        return entries[best][0]
+
+
+def score_bound(points, games, z=CONFIDENCE_Z):
+    '''score_bound(points, games[, z=CONFIDENCE_Z]) -> float
+    returns the lower bound of the Wilson interval of the score points / games'''
+    score = points / games
+    spread = z * math.sqrt(score * (1 - score) / games + z*z / (4 * games*games))
+    return (score + z*z / (2*games) - spread) / (1 + z*z / games)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers opening books')
+    commands = parser.add_subparsers(dest='command', required=True)
+    selfplay_parser = commands.add_parser('selfplay', help='build a book from self-play games')
+    selfplay_parser.add_argument('path')
+    selfplay_parser.add_argument('--games', type=int, default=1000)
+    selfplay_parser.add_argument('-a', default='search', help="the player, e.g. 'search:depth=8' or 'mcts'")
+    selfplay_parser.add_argument('--time', type=float, default=0.05, help='seconds per move')
+    selfplay_parser.add_argument('--opening', type=int, default=BOOK_PLIES, help='plies of each game noise applies to')
+    selfplay_parser.add_argument('--noise', type=float, default=0.2, help='chance of a random move in those plies')
+    selfplay_parser.add_argument('--workers', type=int, default=None)
+    selfplay_parser.add_argument('--seed', type=int, default=0)
+    build_parser = commands.add_parser('build', help='build a book from PDN files and game archives')
+    build_parser.add_argument('path')
+    build_parser.add_argument('sources', nargs='+', help='.pdn or .ckga files')
+    for command_parser in (selfplay_parser, build_parser):
+        command_parser.add_argument('--plies', type=int, default=BOOK_PLIES, help='plies of each game in the book')
+        command_parser.add_argument('--min-games', type=int, default=1, help='leave out rarer moves')
+    probe_parser = commands.add_parser('probe', help='print the book moves of positions')
+    probe_parser.add_argument('path')
+    probe_parser.add_argument('positions', nargs='*', help='positions in FEN, the start position by default')
+    options = parser.parse_args(args)
+
+    start = time.perf_counter()
+    if options.command == 'selfplay':
+        count = selfplay(options.path, options.games, options.a, options.time, options.opening, options.noise,
+                         options.plies, options.workers, options.seed, options.min_games, out=sys.stdout)
+    elif options.command == 'build':
+        counts = {}
+        errors = []
+        for source in options.sources:
+            if source.endswith('.ckga'):
+                count_games(CheckersPDN.Archive(source).iter_records(), options.plies, counts=counts)
+            else:
+                with open(source, encoding='utf-8') as lines:
+                    count_games(CheckersPDN.read_pdn(lines, errors=errors), options.plies, counts=counts)
+        CheckersPDN.report_errors(errors)
+        count = write_book(options.path, counts, options.plies, min_games=options.min_games)
+    if options.command != 'probe':
+        print(f'{count:,} records written to {options.path} in {time.perf_counter() - start:.1f} s')
+        return 0
+
+    book = Book(options.path)
+    bitboard = Bitboard(book.rows, book.columns)
+    for text in options.positions or [CheckersPDN.make_fen(bitboard.get_position())]:
+        bitboard.set_position(CheckersPDN.parse_fen(text, book.rows, book.columns))
+        print(text)
+        for (move, games, wins, draws) in book.lookup(bitboard):
+            score = (wins + draws/2) / games
+            print(f'  {CheckersPDN.format_move(move, bitboard):>8} {games:8,} games  score {score:6.1%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
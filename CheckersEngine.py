@@ -0,0 +1,450 @@
+'''the Checkers rules engine
+does not import tkinter, so it can be used without a display'''
+from CheckersBitboard import Bitboard, iter_bits
+
+# results of a position for the player to move, as endgame tablebases give them
+LOSS = 0
+DRAW = 1
+WIN = 2
+
+
+class CheckersPiece:
+    '''represents a piece of Checkers'''
+
+    def __init__(self, player, pos, is_king=False):
+        '''CheckersPiece(player, pos[, is_king=False])
+        creates a Checkers piece of player, in which position, if king'''
+        # attributes
+        self.player = player
+        self.pos = pos
+        self.is_king = is_king
+
+    def get_player(self):
+        '''CheckersPiece.get_player() -> int
+        returns the player's number'''
+        return self.player
+
+    def get_position(self):
+        '''CheckersPiece.get_position() -> (int, int)
+        returns the position of piece'''
+        return self.pos
+
+    def get_king(self):
+        '''CheckersPiece.get_king() -> bool
+        returns whether or not piece is king'''
+        return self.is_king
+
+    def make_king(self):
+        '''CheckersPiece.make_king()
+        turns piece into a king'''
+        self.is_king = True
+
+    def change_position(self, pos):
+        '''CheckersPieces.change_position(pos)
+        changes position of piece to pos'''
+        self.pos = pos
+
+
+class CheckersMove:
+    '''represents a complete move of Checkers, every jump of a sequence included'''
+
+    def __init__(self, path, captures=()):
+        '''CheckersMove(path[, captures=()])
+        creates a move of the piece through the positions of path
+        capturing the pieces at the positions of captures'''
+        # attributes
+        self.path = tuple(path)
+        self.captures = tuple(captures)
+
+    def __eq__(self, other):
+        return isinstance(other, CheckersMove) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f'CheckersMove({list(self.path)})'
+
+    def get_path(self):
+        '''CheckersMove.get_path() -> tuple
+        returns the positions the piece goes through, start and end included'''
+        return self.path
+
+    def get_start(self):
+        '''CheckersMove.get_start() -> (int, int)
+        returns the position the piece starts from'''
+        return self.path[0]
+
+    def get_end(self):
+        '''CheckersMove.get_end() -> (int, int)
+        returns the position the piece ends on'''
+        return self.path[-1]
+
+    def get_captures(self):
+        '''CheckersMove.get_captures() -> tuple
+        returns the positions of the captured pieces'''
+        return self.captures
+
+    def is_jump(self):
+        '''CheckersMove.is_jump() -> bool
+        returns whether the move captures'''
+        return len(self.captures) > 0
+
+
+class CheckersBoard:
+    '''represents a board of Checkers
+    the position is kept in a Bitboard, the pieces are a view of it'''
+    player_ids = (0, 1)
+    
+    def __init__(self, rows=8, columns=8):
+        '''CheckersBoard([rows=8, columns=8])
+        creates a CheckersBoard in starting position'''
+        # create starting board
+        self.bitboard = Bitboard(rows, columns)
+
+        # attributes
+        self.rows = rows
+        self.columns = columns
+        self.endgame = None
+        self.tablebase = None
+
+        # legal moves are cached until the generation changes
+        self.generation = 0
+        self.cache_generation = 0
+        self.move_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.set_position(self.bitboard.get_position())
+
+    def set_position(self, position):
+        '''CheckersBoard.set_position(position)
+        sets the board to a position returned by Bitboard.get_position'''
+        self.bitboard.set_position(position)
+        self.bitboard.undo_stack = []
+        self.undo_stack = []
+        self.current_player = self.player_ids[self.bitboard.player]
+        self.generation += 1
+
+        # the moves played from this position, for saving the game
+        self.start_position = position
+        self.history = []
+        self.step_path = None
+
+        # map each occupied square to its piece
+        self.piece_map = {}
+        for player in (0, 1):
+            for index in iter_bits(self.bitboard.pieces[player]):
+                pos = self.bitboard.square_position(index)
+                is_king = bool((self.bitboard.kings >> index) & 1)
+                self.piece_map[index] = CheckersPiece(self.player_ids[player], pos, is_king)
+
+    def get_piece(self, pos):
+        '''CheckersBoard.get_piece(pos) -> CheckersPiece or None
+        returns the piece at position'''
+        index = self.bitboard.square_index(pos)
+        if index is None:
+            return None
+
+        return self.piece_map.get(index)
+
+    def remove_piece(self, piece):
+        '''CheckersBoard.remove_piece(piece)
+        removes piece from board'''
+        index = self.bitboard.square_index(piece.get_position())
+        self.bitboard.remove_piece(index)
+        del self.piece_map[index]
+        self.generation += 1
+
+    def get_all_pieces_positions(self, player=None):
+        '''CheckersBoard.get_all_pieces_positions([players=None]) -> list
+        None returns all piece positions
+        otherwise returns only player piece positions'''
+        # the masks of the bitboard say where the pieces are
+        if player is None:
+            mask = self.bitboard.pieces[0] | self.bitboard.pieces[1]
+        else:
+            mask = self.bitboard.pieces[player]
+
+        return [self.bitboard.square_position(index) for index in iter_bits(mask)]
+    
+    def get_all_pieces(self):
+        '''CheckersBoard.get_all_pieces() -> list
+        returns all the pieces on board'''
+        return list(self.piece_map.values())
+
+    def get_player(self):
+        '''CheckersBoard.get_player() -> int
+        returns the current player'''
+        return self.current_player
+
+    def next_player(self):
+        '''CheckersBoard.next_player()
+        goes to the next player'''
+        self.current_player = self.player_ids[1-self.current_player]
+        self.bitboard.next_player()
+        self.generation += 1
+
+    def get_endgame(self):
+        '''CheckersBoard.get_endgame() -> int or None
+        returns endgame state'''
+        return self.endgame
+
+    def get_bitboard(self):
+        '''CheckersBoard.get_bitboard() -> Bitboard
+        returns the bitboard holding the position'''
+        return self.bitboard
+
+    def set_tablebase(self, tablebase):
+        '''CheckersBoard.set_tablebase(tablebase)
+        makes check_endgame end the game as soon as tablebase knows who wins
+        None goes back to playing until a player cannot move'''
+        self.tablebase = tablebase
+
+    def get_start_position(self):
+        '''CheckersBoard.get_start_position() -> tuple
+        returns the position the moves of the history were played from'''
+        return self.start_position
+
+    def get_history(self):
+        '''CheckersBoard.get_history() -> list
+        returns the CheckersMoves played from the start position'''
+        return list(self.history)
+
+    def get_hash(self):
+        '''CheckersBoard.get_hash() -> int
+        returns the zobrist hash of the position and player to move'''
+        return self.bitboard.get_hash()
+
+    def is_movable(self, piece):
+        '''CheckersBoard.is_movable(piece) -> dict or None
+        returns a dict of the possible positions where piece can move
+            key: piece, value: possible move positions
+        returns None if piece cannot move'''
+        # piece does not belong to current player
+        if piece.get_player() != self.current_player:
+            return None
+
+        index = self.bitboard.square_index(piece.get_position())
+        possible_moves = [self.bitboard.square_position(i) for i in self.bitboard.get_moves(index)]
+
+        # no possible moves
+        if len(possible_moves) == 0:
+            return None
+        else:
+            return {piece: possible_moves}
+
+    def is_jumpable(self, piece):
+        '''CheckersBoard.is_jumpable(piece) -> dict or None
+        returns a dict of the possible positions where piece can jump
+            key: piece, value: positions jump positions
+        returns None if piece cannot jump'''
+        # piece does not belong to current player
+        if piece.get_player() != self.current_player:
+            return None
+
+        index = self.bitboard.square_index(piece.get_position())
+        possible_jumps = [self.bitboard.square_position(i) for i in self.bitboard.get_jumps(index)]
+
+        # no possible jumps
+        if len(possible_jumps) == 0:
+            return None
+        else:
+            return {piece: possible_jumps}
+
+    def get_cached(self, name, find):
+        '''CheckersBoard.get_cached(name, find) -> object
+        returns the value cached as name for the current generation
+        calling find() to compute it the first time'''
+        # the position changed, everything cached is stale
+        if self.cache_generation != self.generation:
+            self.move_cache = {}
+            self.cache_generation = self.generation
+
+        if name in self.move_cache:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            self.move_cache[name] = find()
+
+        return self.move_cache[name]
+
+    def get_cache_stats(self):
+        '''CheckersBoard.get_cache_stats() -> dict
+        returns the hits and misses of the legal move cache and the generation'''
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'generation': self.generation}
+
+    def get_movable_pieces(self):
+        '''CheckersBoard.get_movable_pieces() -> dict
+        returns a dict of pieces that can move
+            key: piece, value: possible move positions
+        the dict is cached until the position changes, do not modify it'''
+        return self.get_cached('movable', self.find_movable_pieces)
+
+    def get_jumpable_pieces(self):
+        '''CheckersBoard.get_jumpable_pieces() -> dict
+        returns a dict of pieces that can jump
+            key: piece, value: possible jump positions
+        the dict is cached until the position changes, do not modify it'''
+        return self.get_cached('jumpable', self.find_jumpable_pieces)
+
+    def get_playable_pieces(self):
+        '''CheckersBoard.get_playable_pieces() -> dict
+        returns a dict of piece that can be played
+            key: piece, value: playable positions
+        the dict is cached until the position changes, do not modify it'''
+        return self.get_cached('playable', self.find_playable_pieces)
+
+    def find_movable_pieces(self):
+        '''CheckersBoard.find_movable_pieces() -> dict
+        computes get_movable_pieces without the cache'''
+        movable_pieces = {}
+        for index in iter_bits(self.bitboard.get_movers(self.current_player)):
+            moves = self.bitboard.get_moves(index)
+            movable_pieces[self.piece_map[index]] = [self.bitboard.square_position(i) for i in moves]
+
+        return movable_pieces
+
+    def find_jumpable_pieces(self):
+        '''CheckersBoard.find_jumpable_pieces() -> dict
+        computes get_jumpable_pieces without the cache'''
+        jumpable_pieces = {}
+        for index in iter_bits(self.bitboard.get_jumpers(self.current_player)):
+            jumps = self.bitboard.get_jumps(index)
+            jumpable_pieces[self.piece_map[index]] = [self.bitboard.square_position(i) for i in jumps]
+        
+        return jumpable_pieces
+
+    def find_playable_pieces(self):
+        '''CheckersBoard.find_playable_pieces() -> dict
+        computes get_playable_pieces without the cache'''
+        playable_pieces = {}
+        for (index, targets) in self.bitboard.get_playable_moves().items():
+            playable_pieces[self.piece_map[index]] = [self.bitboard.square_position(i) for i in targets]
+
+        return playable_pieces
+
+    def move(self, piece, pos):
+        '''CheckersBoard.move(piece, pos)
+        moves piece to pos'''
+        start = self.bitboard.square_index(piece.get_position())
+        end = self.bitboard.square_index(pos)
+        self.bitboard.move_piece(start, end)
+        self.piece_map[end] = self.piece_map.pop(start)
+        piece.change_position(pos)
+        self.generation += 1
+
+        # turn piece into king if it reaches the far row, whatever the size of the board
+        if self.bitboard.promote(end):
+            piece.make_king()
+
+    def check_endgame(self):
+        '''CheckersBoard.check_endgame()
+        checks if game is over
+        updates the endgame message if over'''
+        # check if there are no pieces left of current player or no playable pieces
+        if self.bitboard.pieces[self.current_player] == 0 or len(self.get_playable_pieces()) == 0:
+            self.endgame = 1 - self.current_player
+        # the tablebase knows who wins with best play
+        elif self.tablebase is not None:
+            result = self.tablebase.probe(self.bitboard)
+            if result is not None and result[0] == WIN:
+                self.endgame = self.current_player
+            elif result is not None and result[0] == LOSS:
+                self.endgame = 1 - self.current_player
+
+    def make_step(self, start, end):
+        '''CheckersBoard.make_step(start, end) -> bool
+        moves the piece at start to end and removes the piece it jumps over
+        returns True if the piece must keep jumping
+        otherwise goes to the next player and returns False'''
+        piece = self.get_piece(start)
+        was_king = piece.get_king()
+        self.move(piece, end)
+
+        # record the steps until the move is complete
+        if self.step_path is None:
+            self.step_path = ([start], [])
+        self.step_path[0].append(end)
+
+        # piece jumped
+        if abs(start[0]-end[0]) == 2:
+            middle = ((start[0]+end[0]) // 2, (start[1]+end[1]) // 2)
+            self.remove_piece(self.get_piece(middle))
+            self.step_path[1].append(middle)
+
+            # piece keeps jumping unless it has just become king
+            if self.is_jumpable(piece) is not None and (was_king or not piece.get_king()):
+                return True
+
+        self.history.append(CheckersMove(*self.step_path))
+        self.step_path = None
+        self.next_player()
+        return False
+
+    def get_legal_moves(self):
+        '''CheckersBoard.get_legal_moves() -> list
+        returns the complete moves of the current player as CheckersMoves
+        jumps are forced and jump sequences are played to the end
+        the list is cached until the position changes, do not modify it'''
+        return self.get_cached('legal', self.find_legal_moves)
+
+    def find_legal_moves(self):
+        '''CheckersBoard.find_legal_moves() -> list
+        computes get_legal_moves without the cache'''
+        moves = []
+        for path in self.bitboard.get_legal_moves():
+            positions = [self.bitboard.square_position(index) for index in path]
+            captures = [self.bitboard.square_position(self.bitboard.get_middle(start, end))
+                        for (start, end) in zip(path, path[1:]) if self.bitboard.is_jump(start, end)]
+            moves.append(CheckersMove(positions, captures))
+
+        return moves
+
+    def find_move(self, path):
+        '''CheckersBoard.find_move(path) -> CheckersMove or None
+        returns the legal move through path, a tuple of Bitboard squares
+        returns None if there is no such move'''
+        positions = tuple(self.bitboard.square_position(index) for index in path)
+        for move in self.get_legal_moves():
+            if move.get_path() == positions:
+                return move
+
+        return None
+
+    def make_move(self, move):
+        '''CheckersBoard.make_move(move)
+        plays a complete CheckersMove and goes to the next player
+        unmake_move takes it back'''
+        path = [self.bitboard.square_index(pos) for pos in move.get_path()]
+        piece = self.piece_map.pop(path[0])
+        was_king = piece.get_king()
+
+        # keep the captured pieces so they can be put back
+        captured = [self.piece_map.pop(self.bitboard.square_index(pos)) for pos in move.get_captures()]
+        self.undo_stack.append((move, piece, was_king, captured, self.endgame))
+        self.history.append(move)
+
+        self.bitboard.make_move(path)
+        self.piece_map[path[-1]] = piece
+        piece.change_position(move.get_end())
+        if self.bitboard.kings & (1 << path[-1]):
+            piece.make_king()
+        self.current_player = self.player_ids[self.bitboard.player]
+        self.generation += 1
+
+    def unmake_move(self):
+        '''CheckersBoard.unmake_move()
+        takes back the last move played with make_move'''
+        (move, piece, was_king, captured, self.endgame) = self.undo_stack.pop()
+        self.history.pop()
+        self.bitboard.unmake_move()
+
+        # put the piece back and restore its king status
+        del self.piece_map[self.bitboard.square_index(move.get_end())]
+        piece.change_position(move.get_start())
+        piece.is_king = was_king
+        self.piece_map[self.bitboard.square_index(move.get_start())] = piece
+        for p in captured:
+            self.piece_map[self.bitboard.square_index(p.get_position())] = p
+        self.current_player = self.player_ids[self.bitboard.player]
+        self.generation += 1
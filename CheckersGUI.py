@@ -0,0 +1,363 @@
+'''the tkinter interface of Checkers'''
+import time
+from tkinter import *
+from CheckersBackground import BackgroundEngine
+from CheckersEngine import CheckersBoard
+import CheckersPDN
+from CheckersSearch import SearchEngine
+
+# milliseconds between two looks at the background engine
+POLL_INTERVAL = 100
+
+
+class CheckersSquare(Canvas):
+    '''displays a square in the Checkers game'''
+    
+    def __init__(self, master, pos):
+        '''CheckersSquare(master)
+        creates a new Checkers square'''
+        super().__init__(master, width=50, height=50)
+
+        # attributes
+        self.pos = pos
+        self.piece = None
+        self.is_highlighted = False
+
+        # the piece is drawn once and only shown, hidden or recolored afterwards
+        self.oval = self.create_oval(10, 10, 44, 44, state='hidden')
+        self.star = self.create_text(27, 35, fill='black', font=('Arial', 30), text='*', state='hidden')
+
+        # set the mouse events
+        self.bind('<Button>', master.click_on)
+
+    def get_position(self):
+        '''CheckersSquare.get_position() -> (int, int)
+        returns position of square'''
+        return self.pos
+
+    def show_piece(self, color, with_star=False):
+        '''CheckersSquare.add_piece(color[, with_star=False])
+        adds a piece to square of color'''
+        # the piece is already shown
+        if self.piece == (color, with_star):
+            return
+
+        self.itemconfigure(self.oval, fill=color, state='normal')
+
+        # star the piece
+        if with_star:
+            self.itemconfigure(self.star, state='normal')
+        else:
+            self.itemconfigure(self.star, state='hidden')
+        self.piece = (color, with_star)
+
+    def highlight(self, on=True):
+        '''CheckersSquare.highlight(on=True)
+        highlights square if True, unhiglight if False'''
+        self.is_highlighted = on
+        if on:
+            self['bg'] = 'light green'
+            self['highlightbackground'] = 'yellow'
+        else:
+            self['bg'] = 'dark green'
+            self['highlightbackground'] = 'dark green'
+
+    def clear(self):
+        '''CheckersSquare.clear()
+        removes current piece on square'''
+        # hide the piece
+        if self.piece is not None:
+            self.itemconfigure(self.oval, state='hidden')
+            self.itemconfigure(self.star, state='hidden')
+            self.piece = None
+
+
+class CheckersGame(Frame):
+    '''represents a game for Checkers'''
+    
+    def __init__(self, master, rows=8, columns=8, colors=('red', 'white'), engine_player=None, think_time=1.0,
+                 ponder=True, book=None):
+        '''CheckersGame(master[, rows=8, columns=8, colors=('red', 'white'), engine_player=None,
+                     think_time=1.0, ponder=True, book=None])
+        creates a new Checkers game with rows * columns board and pieces of colors
+        the engine plays engine_player, 0 or 1, thinking think_time seconds a move
+        and pondering while the other player thinks if ponder
+        it plays the moves of the opening Book book while the game is in it
+        two people play if engine_player is None'''
+        super().__init__(master, bg='white')
+        self.grid()
+        
+        # set up board and piece colors
+        self.board = CheckersBoard(rows, columns)
+        self.colors = colors
+
+        # the engine searches in a background thread so the window stays responsive
+        # there is none when two people play
+        self.engine_player = engine_player
+        self.ponder = ponder
+        self.engine = None
+        if engine_player is not None:
+            self.engine = BackgroundEngine(SearchEngine(time_limit=think_time, book=book))
+        self.poll_id = None
+
+        # rows and columns
+        self.rows = rows
+        self.columns = columns
+
+        # create the squares
+        self.squares = {}
+        for row in range(rows):
+            for col in range(columns):
+                pos = (row, col)
+                self.squares[pos] = CheckersSquare(self, pos)
+                self.squares[pos].grid(row=row, column=col)
+                
+                # make the squares different colors
+                if row % 2 == col % 2:
+                    self.squares[pos]['bg'] = 'blanched almond'
+                    self.squares[pos]['highlightbackground'] = 'blanched almond'
+                else:
+                    self.squares[pos]['bg'] = 'dark green'
+                    self.squares[pos]['highlightbackground'] = 'dark green'
+
+        # status configuration
+        self.rowconfigure(rows, minsize=3)
+        status_row = rows + 1
+
+        # turn label in status row
+        self.turn_label = Label(self, text='Turn:', font=('Arial', 14), bg='white')
+        self.turn_label.grid(row=status_row, column=1)
+        
+        # turn color in status row
+        self.turn_color = CheckersSquare(self, (status_row, 2))
+        self.turn_color.grid(row=status_row, column=2)
+        self.turn_color.unbind('<Button>')
+
+        # win label in status row, shown when the game is over
+        self.win_label = Label(self, font=('Arial', 24))
+
+        # what the engine is doing, below the status row
+        self.engine_label = Label(self, text='', font=('Arial', 10), bg='white')
+        self.engine_label.grid(row=status_row+1, column=0, columnspan=columns)
+
+        # what each dark square shows: (piece color, is king) or None, and whether it is highlighted
+        self.displayed = {}
+        self.redraw_stats = {'redraws': 0, 'squares': 0, 'seconds': 0.0, 'last_squares': 0, 'last_seconds': 0.0}
+
+        # save and load games as PDN, start a new game
+        master.bind('<Control-s>', self.ask_save_game)
+        master.bind('<Control-o>', self.ask_load_game)
+        master.bind('<Control-n>', self.new_game)
+
+        self.start_turn()
+
+    def start_turn(self):
+        '''CheckersGame.start_turn()
+        waits for the current player to select a piece
+        or starts the engine if it is its turn'''
+        # input_mode: 0 for select, 1 for move
+        self.input_mode = 0
+        self.highlight_squares = []
+
+        engine_turn = (self.board.get_endgame() is None and self.engine_player is not None
+                       and self.board.get_player() == self.engine_player)
+        if engine_turn:
+            self.engine.start(self.board)
+        elif self.board.get_endgame() is None and self.engine_player is not None and self.ponder:
+            self.engine.start(self.board, ponder=True)
+        else:
+            self.stop_engine()
+
+        # put the playable pieces of a person in the highlight list
+        if not engine_turn:
+            for p in self.board.get_playable_pieces():
+                self.highlight_squares.append(self.squares[p.get_position()])
+
+        # look at the engine until it is done
+        if engine_turn or (self.engine is not None and self.engine.is_pondering()):
+            if self.poll_id is None:
+                self.poll_id = self.after(POLL_INTERVAL, self.poll_engine)
+        else:
+            self.engine_label['text'] = ''
+
+        self.update_display()
+
+    def stop_engine(self):
+        '''CheckersGame.stop_engine()
+        cancels any search of the engine, if there is one'''
+        if self.engine is not None:
+            self.engine.stop()
+
+    def poll_engine(self):
+        '''CheckersGame.poll_engine()
+        shows the progress of the engine and plays its move once found
+        runs every POLL_INTERVAL milliseconds while the engine searches'''
+        self.poll_id = None
+        progress = self.engine.get_progress()
+        doing = 'pondering' if self.engine.is_pondering() else 'thinking'
+        self.engine_label['text'] = (f"engine {doing}: depth {progress['depth']}, {progress['nodes']:,} nodes,"
+                                     f" {progress['nodes_per_second']:,.0f} nodes/sec")
+
+        move = self.engine.get_result()
+        if move is not None:
+            self.board.make_move(self.board.find_move(move))
+            self.board.check_endgame()
+            self.start_turn()
+        elif self.engine.is_thinking() or self.engine.is_pondering():
+            self.poll_id = self.after(POLL_INTERVAL, self.poll_engine)
+
+    def new_game(self, event=None):
+        '''CheckersGame.new_game([event=None])
+        cancels any search and starts a new game'''
+        self.stop_engine()
+        self.board = CheckersBoard(self.rows, self.columns)
+        self.start_turn()
+
+    def save_game(self, path):
+        '''CheckersGame.save_game(path)
+        appends the game played so far to the PDN file path'''
+        with open(path, 'a', encoding='utf-8') as out:
+            out.write(CheckersPDN.format_game(CheckersPDN.record_board(self.board)))
+
+    def load_game(self, path, index=0):
+        '''CheckersGame.load_game(path[, index=0])
+        continues the game number index, from 0, of the PDN file path'''
+        with open(path, encoding='utf-8') as lines:
+            for (number, record) in enumerate(CheckersPDN.read_pdn(lines, self.rows, self.columns)):
+                if number == index:
+                    self.stop_engine()
+                    self.board = record.get_board()
+                    self.start_turn()
+                    return
+
+        raise ValueError(f'{path} has no game {index}')
+
+    def ask_save_game(self, event=None):
+        '''CheckersGame.ask_save_game([event=None])
+        asks for a file and saves the game to it'''
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(defaultextension='.pdn', filetypes=[('PDN', '*.pdn')])
+        if path:
+            self.save_game(path)
+
+    def ask_load_game(self, event=None):
+        '''CheckersGame.ask_load_game([event=None])
+        asks for a file and loads its first game'''
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(filetypes=[('PDN', '*.pdn')])
+        if path:
+            self.load_game(path)
+    
+    def click_on(self, event):
+        '''CheckersGame.click_on(event)
+        event handler for mouse click
+        gets click data and tries to make a move'''
+        square = event.widget
+        pos = square.get_position()
+
+        # do nothing if click is not on a highlighted square
+        if not square in self.highlight_squares:
+            return
+
+        # move piece
+        if self.input_mode == 1:
+            self.input_mode = 0
+
+            # move piece from selected pos to pos, the board removes any jumped piece
+            keep_jumping = self.board.make_step(self.selected_pos, pos)
+
+            # piece can continue jumping
+            if keep_jumping:
+                self.input_mode = 1
+                self.selected_pos = pos
+
+                # highlight the new jump positions
+                self.highlight_squares = []
+                for sq in self.get_movable_squares(self.squares[pos]):
+                    self.highlight_squares.append(sq)
+            else:
+                # the other player's turn, the engine starts if it is its turn
+                self.board.check_endgame()
+                self.start_turn()
+                return
+        # select piece
+        else:
+            self.input_mode = 1
+
+            # put the playable positions in the highlight list
+            self.highlight_squares = []
+            for s in self.get_movable_squares(square):
+                self.highlight_squares.append(s)
+
+            self.selected_pos = square.get_position()
+
+        self.update_display()
+
+    def get_movable_squares(self, square):
+        '''CheckersGame.get_movable_squares(square) -> list
+        returns a list of the squares that have a playable piece'''
+        movable_squares = []
+        piece = self.board.get_piece(square.get_position())
+
+        # find the playable positions and append the corresponding squares to the list
+        for pos in self.board.get_playable_pieces().get(piece):
+            movable_squares.append(self.squares[pos])
+
+        return movable_squares
+
+    def update_display(self):
+        '''CheckersGame.update_display()
+        updates squares to match board
+        only the squares whose piece or highlight changed are touched'''
+        start = time.perf_counter()
+        game_over = isinstance(self.board.get_endgame(), int)
+
+        # what every square should show now
+        wanted = {}
+        for piece in self.board.get_all_pieces():
+            wanted[piece.get_position()] = ((self.colors[piece.get_player()], piece.get_king()), False)
+        # highlight the squares which contain the squares that can be clicked
+        if not game_over:
+            for square in self.highlight_squares:
+                pos = square.get_position()
+                wanted[pos] = (wanted.get(pos, (None, False))[0], True)
+
+        # change only the squares that differ from what is displayed
+        changed = 0
+        for pos in set(self.displayed) | set(wanted):
+            (old_piece, old_highlight) = self.displayed.get(pos, (None, False))
+            (new_piece, new_highlight) = wanted.get(pos, (None, False))
+            square = self.squares[pos]
+            if new_piece != old_piece:
+                if new_piece is None:
+                    square.clear()
+                else:
+                    square.show_piece(*new_piece)
+            if new_highlight != old_highlight:
+                square.highlight(new_highlight)
+            if (new_piece, new_highlight) != (old_piece, old_highlight):
+                changed += 1
+        self.displayed = wanted
+
+        # check if the game is over
+        if game_over:
+            self.turn_color.clear()
+            self.win_label['text'] = f'{self.colors[self.board.get_endgame()]} wins!'.capitalize()
+            self.win_label.grid(row=self.rows+1, column=self.columns//2, columnspan=4)
+        else:
+            # show whose turn it is in the turn square
+            self.win_label.grid_remove()
+            self.turn_color.show_piece(self.colors[self.board.get_player()])
+
+        seconds = time.perf_counter() - start
+        self.redraw_stats['redraws'] += 1
+        self.redraw_stats['squares'] += changed
+        self.redraw_stats['seconds'] += seconds
+        self.redraw_stats['last_squares'] = changed
+        self.redraw_stats['last_seconds'] = seconds
+
+    def get_redraw_stats(self):
+        '''CheckersGame.get_redraw_stats() -> dict
+        returns the number of redraws, the squares changed and the seconds
+        spent in update_display, in total and for the last redraw'''
+        return dict(self.redraw_stats)
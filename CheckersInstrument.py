@@ -0,0 +1,270 @@
+'''opt-in instrumentation of the Checkers rules engine and interface
+
+enable wraps the move generation and board mutation methods, and the
+click and redraw methods of the interface, with wrappers counting their
+calls and timing them, inclusive and exclusive of the other instrumented
+methods they call. disable puts the original methods back, so nothing is
+left on the hot paths while instrumentation is off
+
+the data can be printed, or dumped in the format of cProfile for pstats,
+snakeviz and the like
+
+    python CheckersInstrument.py perft 6 --out perft.prof
+    CHECKERS_PROFILE=gui.prof python Checkers.py'''
+import argparse
+import functools
+import importlib
+import marshal
+import random
+import sys
+import time
+
+# the methods instrumented, by module and class
+TARGETS = (
+    ('CheckersEngine', 'CheckersBoard', (
+        'get_piece', 'remove_piece', 'get_all_pieces_positions', 'get_all_pieces', 'next_player',
+        'is_movable', 'is_jumpable', 'get_movable_pieces', 'get_jumpable_pieces', 'get_playable_pieces',
+        'find_movable_pieces', 'find_jumpable_pieces', 'find_playable_pieces', 'move', 'check_endgame',
+        'make_step', 'get_legal_moves', 'find_legal_moves', 'make_move', 'unmake_move')),
+    ('CheckersBitboard', 'Bitboard', (
+        'get_movers', 'get_jumpers', 'get_moves', 'get_jumps', 'get_playable_moves', 'add_jump_sequences',
+        'get_legal_moves', 'move_piece', 'remove_piece', 'play_move', 'make_move', 'unmake_move')),
+    ('CheckersReference', 'CheckersBoard', (
+        'get_all_pieces_positions', 'is_movable', 'is_jumpable', 'get_movable_pieces', 'get_jumpable_pieces',
+        'get_playable_pieces', 'move', 'remove_piece', 'next_player')),
+    ('CheckersGUI', 'CheckersGame', ('click_on', 'update_display')),
+    ('CheckersGUI', 'CheckersSquare', ('show_piece', 'highlight', 'clear')),
+)
+
+
+class Instrumentation:
+    '''counts and times calls to the methods of TARGETS while enabled'''
+
+    def __init__(self):
+        '''Instrumentation()
+        creates a disabled instrumentation with no data'''
+        # attributes
+        self.originals = []
+        self.names = {}
+
+        # for every function: [primitive calls, calls, own seconds, cumulative seconds, callers]
+        # callers holds the same first four numbers for the calls from each caller
+        self.stats = {}
+        self.stack = []
+        self.active = {}
+
+    def reset(self):
+        '''Instrumentation.reset()
+        forgets the data collected so far'''
+        # the wrappers hold on to these, so they are emptied, not replaced
+        self.stats.clear()
+        self.stack.clear()
+        self.active.clear()
+
+    def is_enabled(self):
+        '''Instrumentation.is_enabled() -> bool
+        returns whether the methods are wrapped'''
+        return len(self.originals) > 0
+
+    def wrap(self, key, function):
+        '''Instrumentation.wrap(key, function) -> function
+        returns function recording its calls under key'''
+        stats = self.stats
+        stack = self.stack
+        active = self.active
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # a call of a function already running is not primitive
+            outermost = key not in active
+            active[key] = active.get(key, 0) + 1
+            frame = [key, 0.0]
+            stack.append(frame)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                stack.pop()
+                if active[key] == 1:
+                    del active[key]
+                else:
+                    active[key] -= 1
+
+                own = elapsed - frame[1]
+                cumulative = elapsed if outermost else 0.0
+                record = stats.get(key)
+                if record is None:
+                    record = stats[key] = [0, 0, 0.0, 0.0, {}]
+                record[0] += outermost
+                record[1] += 1
+                record[2] += own
+                record[3] += cumulative
+
+                if stack:
+                    caller = stack[-1]
+                    caller[1] += elapsed
+                    counts = record[4].get(caller[0])
+                    if counts is None:
+                        counts = record[4][caller[0]] = [0, 0, 0.0, 0.0]
+                    counts[0] += outermost
+                    counts[1] += 1
+                    counts[2] += own
+                    counts[3] += cumulative
+
+        return wrapper
+
+    def enable(self, targets=TARGETS):
+        '''Instrumentation.enable([targets=TARGETS])
+        wraps the methods of targets, (module, class, method names) tuples
+        modules that cannot be imported, like CheckersGUI without tkinter, are skipped'''
+        if self.is_enabled():
+            return
+
+        for (module_name, class_name, method_names) in targets:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            cls = getattr(module, class_name)
+            for name in method_names:
+                function = cls.__dict__[name]
+                code = function.__code__
+                key = (code.co_filename, code.co_firstlineno, function.__qualname__)
+                self.names[key] = f'{module_name}.{function.__qualname__}'
+                self.originals.append((cls, name, function))
+                setattr(cls, name, self.wrap(key, function))
+
+    def disable(self):
+        '''Instrumentation.disable()
+        puts the original methods back, keeping the data'''
+        for (cls, name, function) in reversed(self.originals):
+            setattr(cls, name, function)
+        self.originals = []
+
+    def get_stats(self):
+        '''Instrumentation.get_stats() -> dict
+        returns the calls, the cumulative seconds and the own seconds,
+        not counting the instrumented methods called, of every method called'''
+        return {self.names[key]: {'calls': calls, 'seconds': cumulative, 'own_seconds': own}
+                for (key, (_, calls, own, cumulative, _)) in self.stats.items()}
+
+    def print_stats(self, out=sys.stdout, sort='seconds', limit=None):
+        '''Instrumentation.print_stats([out=sys.stdout, sort='seconds', limit=None])
+        prints the stats of the methods called, sorted by sort,
+        seconds, own_seconds or calls, limit lines at most'''
+        stats = sorted(self.get_stats().items(), key=lambda item: item[1][sort], reverse=True)
+        print(f"{'calls':>10} {'seconds':>10} {'own':>10} {'us/call':>9}  method", file=out)
+        for (name, values) in stats[:limit]:
+            per_call = 1e6 * values['seconds'] / values['calls']
+            print(f"{values['calls']:10,} {values['seconds']:10.4f} {values['own_seconds']:10.4f} {per_call:9.2f}"
+                  f"  {name}", file=out)
+
+    def dump_stats(self, path):
+        '''Instrumentation.dump_stats(path)
+        writes the data to path in the format of cProfile, for pstats.Stats(path)'''
+        stats = {}
+        for (key, (primitive, calls, own, cumulative, callers)) in self.stats.items():
+            stats[key] = (primitive, calls, own, cumulative,
+                          {caller: tuple(counts) for (caller, counts) in callers.items()})
+
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
+
+
+# the instrumentation the module functions use
+_instrumentation = Instrumentation()
+
+
+def enable(targets=TARGETS):
+    '''enable([targets=TARGETS])
+    starts counting and timing the methods of targets'''
+    _instrumentation.enable(targets)
+
+
+def disable():
+    '''disable()
+    stops counting and timing'''
+    _instrumentation.disable()
+
+
+def reset():
+    '''reset()
+    forgets the data collected so far'''
+    _instrumentation.reset()
+
+
+def get_stats():
+    '''get_stats() -> dict
+    returns the calls and seconds of every instrumented method called'''
+    return _instrumentation.get_stats()
+
+
+def print_stats(out=sys.stdout, sort='seconds', limit=None):
+    '''print_stats([out=sys.stdout, sort='seconds', limit=None])
+    prints the data collected so far'''
+    _instrumentation.print_stats(out, sort, limit)
+
+
+def dump_stats(path):
+    '''dump_stats(path)
+    writes the data collected so far to path in the format of cProfile'''
+    _instrumentation.dump_stats(path)
+
+
+def play_clicks(games, seed=0):
+    '''play_clicks(games[, seed=0])
+    plays random games on CheckersBoard the way the interface does,
+    a step at a time asking for the playable pieces after each click'''
+    from CheckersEngine import CheckersBoard
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = CheckersBoard()
+        for _ in range(200):
+            board.check_endgame()
+            if board.get_endgame() is not None:
+                break
+            playable = board.get_playable_pieces()
+            piece = rng.choice(list(playable))
+            start = piece.get_position()
+            end = rng.choice(playable[piece])
+            while board.make_step(start, end):
+                (start, end) = (end, rng.choice(board.get_playable_pieces()[piece]))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='instrumented runs of the Checkers engine')
+    parser.add_argument('workload', choices=('perft', 'search', 'clicks'))
+    parser.add_argument('size', nargs='?', type=float, default=None,
+                        help='perft depth, search seconds or games to click through')
+    parser.add_argument('--out', default=None, help='write the data here in the format of cProfile')
+    parser.add_argument('--sort', default='seconds', choices=('seconds', 'own_seconds', 'calls'))
+    parser.add_argument('--limit', type=int, default=30)
+    options = parser.parse_args(args)
+
+    enable()
+    start = time.perf_counter()
+    if options.workload == 'perft':
+        from CheckersBitboard import Bitboard
+        from CheckersPerft import perft
+        perft(Bitboard(), int(options.size or 5))
+    elif options.workload == 'search':
+        from CheckersEngine import CheckersBoard
+        from CheckersSearch import SearchEngine
+        SearchEngine(time_limit=options.size or 2.0).search(CheckersBoard())
+    else:
+        play_clicks(int(options.size or 20))
+    seconds = time.perf_counter() - start
+    disable()
+
+    print(f'{options.workload} took {seconds:.2f} s instrumented')
+    print_stats(sort=options.sort, limit=options.limit)
+    if options.out is not None:
+        dump_stats(options.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
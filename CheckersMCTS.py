@@ -0,0 +1,395 @@
+'''Monte Carlo tree search for Checkers
+
+the tree is searched with UCT and every new node is valued by a playout
+to the end of the game. moves are the complete moves of the Bitboard, so
+jumps are forced and a jump sequence is played to the end inside the
+tree and the playouts, exactly like get_playable_pieces and the
+continued jumps of the game
+
+the tree holds at most max_nodes nodes and the part below the move
+played is kept for the next search. ParallelMCTS runs one tree per
+process on the same position and adds up the visits of the root moves'''
+import math
+import multiprocessing
+import random
+import time
+
+from CheckersBitboard import Bitboard
+
+# playouts longer than this are scored by material
+PLAYOUT_PLIES = 150
+
+# engines already built in this process, by their options, and the
+# search each of them last worked on
+_engines = {}
+_searches = {}
+
+
+class MCTSNode:
+    '''represents a position in the search tree, reached by move'''
+
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins', 'mover')
+
+    def __init__(self, move, parent, mover):
+        '''MCTSNode(move, parent, mover)
+        creates a node reached by move from parent, played by player mover'''
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+        self.mover = mover
+
+    def count(self):
+        '''MCTSNode.count() -> int
+        returns the number of nodes of the subtree'''
+        total = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            total += 1
+            stack.extend(node.children)
+
+        return total
+
+
+def choose_playout_move(bitboard, moves, rng, heuristic):
+    '''choose_playout_move(bitboard, moves, rng, heuristic) -> tuple
+    returns the move of a playout, a random one or, if heuristic,
+    one of the longest jumps, else a crowning move, else a random one'''
+    if not heuristic:
+        return rng.choice(moves)
+
+    if bitboard.is_jump(moves[0][0], moves[0][1]):
+        longest = max(len(move) for move in moves)
+        return rng.choice([move for move in moves if len(move) == longest])
+
+    crown_row = bitboard.crown_rows[bitboard.player]
+    crowning = [move for move in moves if move[-1] // (bitboard.columns//2) == crown_row and
+                not (bitboard.kings >> move[0]) & 1]
+    if crowning:
+        return rng.choice(crowning)
+    return rng.choice(moves)
+
+
+def playout(bitboard, rng, heuristic=True):
+    '''playout(bitboard, rng[, heuristic=True]) -> float
+    plays bitboard out and returns the result for player 0:
+    1 for a win, 0 for a loss, in between by material if it takes too long'''
+    for _ in range(PLAYOUT_PLIES):
+        moves = bitboard.get_legal_moves()
+
+        # a player who cannot move has lost
+        if len(moves) == 0:
+            return 0.0 if bitboard.player == 0 else 1.0
+        bitboard.play_move(choose_playout_move(bitboard, moves, rng, heuristic))
+
+    # material decides an unfinished game
+    own = bitboard.pieces[0].bit_count() + (bitboard.pieces[0] & bitboard.kings).bit_count()
+    enemy = bitboard.pieces[1].bit_count() + (bitboard.pieces[1] & bitboard.kings).bit_count()
+    if own == enemy:
+        return 0.5
+    return 1.0 if own > enemy else 0.0
+
+
+class MCTSEngine:
+    '''searches Checkers positions with Monte Carlo tree search'''
+
+    def __init__(self, time_limit=1.0, max_playouts=None, max_nodes=200000, exploration=1.4,
+                 heuristic=True, seed=None):
+        '''MCTSEngine([time_limit=1.0, max_playouts=None, max_nodes=200000, exploration=1.4,
+                      heuristic=True, seed=None])
+        creates an engine searching time_limit seconds or max_playouts
+        playouts per move, with at most max_nodes nodes in its tree
+        exploration is the UCT constant, heuristic chooses guided playouts'''
+        # attributes
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.max_nodes = max_nodes
+        self.exploration = exploration
+        self.heuristic = heuristic
+        self.rng = random.Random(seed)
+        self.root = None
+        self.root_position = None
+        self.node_count = 0
+        self.stats = {}
+
+    def get_stats(self):
+        '''MCTSEngine.get_stats() -> dict
+        returns the playouts, seconds, playouts per second, nodes in the
+        tree and nodes kept from the last search, of the last search'''
+        return dict(self.stats)
+
+    def search(self, board, time_limit=None, max_playouts=None):
+        '''MCTSEngine.search(board[, time_limit=None, max_playouts=None]) -> CheckersMove or None
+        returns the best move of the current player of board
+        returns None if the player cannot move'''
+        path = self.search_bitboard(board.get_bitboard().copy(), time_limit, max_playouts)
+        if path is None:
+            return None
+
+        positions = [board.get_bitboard().square_position(index) for index in path]
+        for move in board.get_legal_moves():
+            if list(move.get_path()) == positions:
+                return move
+
+    def search_bitboard(self, bitboard, time_limit=None, max_playouts=None):
+        '''MCTSEngine.search_bitboard(bitboard[, time_limit=None, max_playouts=None]) -> tuple or None
+        returns the move with the most visits as a tuple of squares
+        returns None if the player cannot move'''
+        self.run(bitboard, time_limit, max_playouts)
+        if not self.root.children:
+            return None
+        return max(self.root.children, key=lambda child: child.visits).move
+
+    def run(self, bitboard, time_limit=None, max_playouts=None):
+        '''MCTSEngine.run(bitboard[, time_limit=None, max_playouts=None]) -> dict
+        grows the tree of bitboard and returns the visits and wins of each root move'''
+        if time_limit is None:
+            time_limit = self.time_limit
+        if max_playouts is None:
+            max_playouts = self.max_playouts
+
+        start = time.perf_counter()
+        kept = self.reuse_tree(bitboard)
+        playouts = 0
+
+        # a player who cannot move has nothing to search
+        if not self.root.children and len(bitboard.get_legal_moves()) == 0:
+            self.stats = {'playouts': 0, 'seconds': time.perf_counter() - start, 'playouts_per_second': 0.0,
+                          'nodes': self.node_count, 'kept_nodes': kept}
+            return {}
+
+        while max_playouts is None or playouts < max_playouts:
+            self.iterate(bitboard.copy())
+            playouts += 1
+            if time.perf_counter() - start > time_limit:
+                break
+
+        seconds = time.perf_counter() - start
+        self.stats = {'playouts': playouts, 'seconds': seconds,
+                      'playouts_per_second': playouts / seconds if seconds > 0 else 0.0,
+                      'nodes': self.node_count, 'kept_nodes': kept}
+        return {child.move: (child.visits, child.wins) for child in self.root.children}
+
+    def reuse_tree(self, bitboard):
+        '''MCTSEngine.reuse_tree(bitboard) -> int
+        makes the root the node of the last tree holding the position of
+        bitboard, up to two moves below the old root, or a new node
+        returns the number of nodes kept'''
+        position = bitboard.get_position()
+        found = None
+        if self.root is not None and (self.root.rows, self.root.columns) == (bitboard.rows, bitboard.columns):
+            if self.root_position == position:
+                found = self.root
+            else:
+                board = Bitboard(bitboard.rows, bitboard.columns)
+                for child in self.root.children:
+                    for grandchild in child.children:
+                        board.set_position(self.root_position)
+                        board.play_move(child.move)
+                        board.play_move(grandchild.move)
+                        if board.get_position() == position:
+                            found = grandchild
+                            break
+                    if found is not None:
+                        break
+
+        if found is None:
+            self.root = MCTSRoot(bitboard.rows, bitboard.columns, 1 - bitboard.player)
+            self.node_count = 1
+            kept = 0
+        else:
+            # the rest of the old tree is dropped
+            self.root = MCTSRoot.take(found, bitboard.rows, bitboard.columns)
+            self.node_count = self.root.count()
+            kept = self.node_count
+        self.root_position = position
+        return kept
+
+    def iterate(self, bitboard):
+        '''MCTSEngine.iterate(bitboard)
+        selects a leaf from the root, whose position is bitboard, expands it,
+        plays it out and backs the result up the tree'''
+        node = self.root
+        full = self.node_count >= self.max_nodes
+
+        # selection: follow the best UCT child while every move has been tried
+        # or no node can be added
+        while node.children and (full or len(node.untried) == 0):
+            node = self.select_child(node)
+            bitboard.play_move(node.move)
+
+        # expansion: add one untried move unless the tree is full
+        if node.untried is None:
+            node.untried = bitboard.get_legal_moves()
+            self.rng.shuffle(node.untried)
+        if node.untried and not full:
+            move = node.untried.pop()
+            child = MCTSNode(move, node, bitboard.player)
+            node.children.append(child)
+            self.node_count += 1
+            bitboard.play_move(move)
+            node = child
+
+        result = playout(bitboard, self.rng, self.heuristic)
+
+        # backpropagation: each node counts the wins of the player who moved into it
+        while node is not None:
+            node.visits += 1
+            node.wins += result if node.mover == 0 else 1.0 - result
+            node = node.parent
+
+    def select_child(self, node):
+        '''MCTSEngine.select_child(node) -> MCTSNode
+        returns the child of node with the best UCT value'''
+        scale = self.exploration * math.sqrt(math.log(node.visits))
+        best = None
+        best_value = -1.0
+        for child in node.children:
+            value = child.wins / child.visits + scale / math.sqrt(child.visits)
+            if value > best_value:
+                best = child
+                best_value = value
+
+        return best
+
+
+class MCTSRoot(MCTSNode):
+    '''represents the root of a search tree, which knows the board size'''
+
+    __slots__ = ('rows', 'columns')
+
+    def __init__(self, rows, columns, mover):
+        '''MCTSRoot(rows, columns, mover)
+        creates an empty root of a rows * columns tree'''
+        super().__init__(None, None, mover)
+        self.rows = rows
+        self.columns = columns
+
+    @classmethod
+    def take(cls, node, rows, columns):
+        '''MCTSRoot.take(node, rows, columns) -> MCTSRoot
+        returns a root taking over the children and counts of node'''
+        root = cls(rows, columns, node.mover)
+        root.children = node.children
+        root.untried = node.untried
+        root.visits = node.visits
+        root.wins = node.wins
+        for child in root.children:
+            child.parent = root
+
+        return root
+
+
+def run_worker(task):
+    '''run_worker(task) -> (dict, dict)
+    searches the position of the tuple
+        (position, rows, columns, deadline, max_playouts, options, search)
+    with this process's engine for options until the time.time() deadline
+    and returns the visits and wins of each root move and the stats
+    search identifies the move searched, the trees of its tasks stay apart'''
+    (position, rows, columns, deadline, max_playouts, options, search) = task
+
+    # the seed only starts the random generator, the tree can serve any task
+    key = tuple(sorted((name, value) for (name, value) in options.items() if name != 'seed'))
+    if key not in _engines:
+        _engines[key] = MCTSEngine(**options)
+    engine = _engines[key]
+
+    # a second task of the same search grows a new tree, its own visits
+    # would count twice otherwise
+    if _searches.get(key) == search:
+        engine.root = None
+    _searches[key] = search
+
+    bitboard = Bitboard(rows, columns)
+    bitboard.set_position(position)
+    time_limit = max(0.0, deadline - time.time())
+    return (engine.run(bitboard, time_limit, max_playouts), engine.get_stats())
+
+
+class ParallelMCTS:
+    '''runs MCTS with one tree per process, root parallelism'''
+
+    def __init__(self, workers=None, time_limit=1.0, max_playouts=None, **options):
+        '''ParallelMCTS([workers=None, time_limit=1.0, max_playouts=None, **options])
+        creates an engine searching on workers processes, one per core
+        if None, each with an MCTSEngine made with options
+        max_playouts is the number of playouts of each process'''
+        # attributes
+        self.workers = workers or multiprocessing.cpu_count()
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.options = options
+        self.pool = None
+        self.searches = 0
+        self.stats = {}
+
+    def close(self):
+        '''ParallelMCTS.close()
+        stops the worker processes'''
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def get_stats(self):
+        '''ParallelMCTS.get_stats() -> dict
+        returns the playouts of all the processes, the seconds, the
+        playouts per second and the nodes of the trees, of the last search'''
+        return dict(self.stats)
+
+    def search(self, board, time_limit=None, max_playouts=None):
+        '''ParallelMCTS.search(board[, time_limit=None, max_playouts=None]) -> CheckersMove or None
+        returns the best move of the current player of board
+        returns None if the player cannot move'''
+        path = self.search_bitboard(board.get_bitboard(), time_limit, max_playouts)
+        if path is None:
+            return None
+
+        positions = [board.get_bitboard().square_position(index) for index in path]
+        for move in board.get_legal_moves():
+            if list(move.get_path()) == positions:
+                return move
+
+    def search_bitboard(self, bitboard, time_limit=None, max_playouts=None):
+        '''ParallelMCTS.search_bitboard(bitboard[, time_limit=None, max_playouts=None]) -> tuple or None
+        returns the move with the most visits over all the trees
+        returns None if the player cannot move'''
+        if time_limit is None:
+            time_limit = self.time_limit
+        if max_playouts is None:
+            max_playouts = self.max_playouts
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+
+        start = time.perf_counter()
+        self.searches += 1
+        search = (id(self), self.searches)
+
+        # every task stops at the same time, even one a busy process starts late
+        deadline = time.time() + time_limit
+        tasks = []
+        for worker in range(self.workers):
+            # each tree gets its own random generator
+            options = dict(self.options, seed=self.options.get('seed', 0) * 1000 + worker)
+            tasks.append((bitboard.get_position(), bitboard.rows, bitboard.columns, deadline, max_playouts,
+                          options, search))
+
+        visits = {}
+        playouts = 0
+        nodes = 0
+        for (moves, stats) in self.pool.imap_unordered(run_worker, tasks):
+            for (move, (count, _)) in moves.items():
+                visits[move] = visits.get(move, 0) + count
+            playouts += stats['playouts']
+            nodes += stats['nodes']
+
+        seconds = time.perf_counter() - start
+        self.stats = {'playouts': playouts, 'seconds': seconds,
+                      'playouts_per_second': playouts / seconds if seconds > 0 else 0.0, 'nodes': nodes}
+        if len(visits) == 0:
+            return None
+        return max(visits, key=visits.get)
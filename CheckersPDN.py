@@ -0,0 +1,587 @@
+'''game records of Checkers in PDN, Portable Draughts Notation, and in a
+compact binary archive
+
+squares are numbered from 1 on the side of the player who moves first,
+the way PDN numbers them: square number n is Bitboard index num_squares - n.
+that player is Black in PDN, and a result of 1-0 is a win for them
+
+read_pdn parses a file one game at a time and replays every game through
+the rules, so files of any size can be read. an archive stores each move
+as its index among the legal moves, in as few bits as that index needs,
+with an index of the games at the end of the file for random access
+
+    python CheckersPDN.py convert games.pdn games.ckga
+    python CheckersPDN.py show games.ckga 1234'''
+import argparse
+from array import array
+import mmap
+import re
+import struct
+import sys
+
+from CheckersBitboard import Bitboard
+from CheckersEngine import CheckersBoard
+
+# results in PDN, the index is the code in an archive
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN = re.compile(r'\{[^}]*\}|\(|\)|1-0|0-1|1/2-1/2|\*|\d+(?:[-x]\d+)+|\d+\.+|[^\s{}()]+')
+MOVE = re.compile(r'\d+(?:[-x]\d+)+')
+
+# what read_pdn looks for in move text to find where a game ends, and
+# the lines it has to look at
+PART = re.compile(r'[{}()]|[^\s{}()]+')
+BRACKETS = re.compile(r'[{}()]')
+ENDINGS = frozenset(RESULTS)
+
+# archive layout: a header, the games, then the offset of every game
+MAGIC = b'CKGA'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxIQ')
+GAME = struct.Struct('<BBHHH')
+
+# flags of a game in an archive
+CUSTOM_START = 1
+
+# the usual start position and the squares of every move text seen, by board size
+_start_positions = {}
+_move_paths = {}
+
+
+def square_number(index, num_squares=32):
+    '''square_number(index[, num_squares=32]) -> int
+    returns the PDN number of the square at Bitboard index'''
+    return num_squares - index
+
+
+def square_index(number, num_squares=32):
+    '''square_index(number[, num_squares=32]) -> int
+    returns the Bitboard index of the square with PDN number'''
+    if not 1 <= number <= num_squares:
+        raise ValueError(f'no square {number}')
+    return num_squares - number
+
+
+def get_start_position(rows=8, columns=8):
+    '''get_start_position([rows=8, columns=8]) -> tuple
+    returns the position games of rows * columns start from'''
+    if (rows, columns) not in _start_positions:
+        _start_positions[(rows, columns)] = Bitboard(rows, columns).get_position()
+
+    return _start_positions[(rows, columns)]
+
+
+def make_fen(position, rows=8, columns=8):
+    '''make_fen(position[, rows=8, columns=8]) -> str
+    returns the FEN of a position returned by Bitboard.get_position
+    like B:W21,22,K30:B1,2'''
+    num_squares = rows * (columns//2)
+    (p0, p1, kings, player) = position
+    fields = ['BW'[player]]
+    for (color, mask) in (('W', p1), ('B', p0)):
+        squares = []
+        for index in sorted(range(num_squares), key=lambda index: square_number(index, num_squares)):
+            if mask & (1 << index):
+                prefix = 'K' if kings & (1 << index) else ''
+                squares.append(f'{prefix}{square_number(index, num_squares)}')
+        fields.append(color + ','.join(squares))
+
+    return ':'.join(fields)
+
+
+def parse_fen(text, rows=8, columns=8):
+    '''parse_fen(text[, rows=8, columns=8]) -> tuple
+    returns the Bitboard position of a FEN like B:W21,22,K30:B1,2
+    ranges of men like B1-12 are allowed'''
+    num_squares = rows * (columns//2)
+    fields = text.strip().rstrip('.').split(':')
+    if fields[0].upper() not in ('B', 'W'):
+        raise ValueError(f'bad FEN {text!r}')
+
+    pieces = [0, 0]
+    kings = 0
+    for field in fields[1:]:
+        if field == '':
+            continue
+        player = {'B': 0, 'W': 1}.get(field[0].upper())
+        if player is None:
+            raise ValueError(f'bad FEN {text!r}')
+        for item in filter(None, field[1:].split(',')):
+            is_king = item[0].upper() == 'K'
+            (first, _, last) = item.lstrip('Kk').partition('-')
+            try:
+                numbers = range(int(first), int(last or first) + 1)
+            except ValueError:
+                raise ValueError(f'bad FEN {text!r}') from None
+            for number in numbers:
+                index = square_index(number, num_squares)
+                pieces[player] |= 1 << index
+                if is_king:
+                    kings |= 1 << index
+
+    return (pieces[0], pieces[1], kings, 'BW'.index(fields[0].upper()))
+
+
+def format_move(path, bitboard):
+    '''format_move(path, bitboard) -> str
+    returns a move of bitboard, a tuple of squares, in PDN like 11-15 or 15x24x31'''
+    separator = 'x' if bitboard.is_jump(path[0], path[1]) else '-'
+    return separator.join(str(square_number(index, bitboard.num_squares)) for index in path)
+
+
+def find_move(path, legal_moves):
+    '''find_move(path, legal_moves) -> tuple
+    returns the legal move written as path, where a jump sequence may
+    give only its first and last squares
+    raises ValueError if no move or more than one move matches'''
+    if path in legal_moves:
+        return path
+
+    found = [move for move in legal_moves if len(path) == 2 and (move[0], move[-1]) == path]
+    if len(found) != 1:
+        raise ValueError('illegal move' if len(found) == 0 else 'ambiguous move')
+    return found[0]
+
+
+class GameRecord:
+    '''represents a recorded game: its tags, start position, moves and result'''
+
+    def __init__(self, moves=(), tags=None, start=None, result='*', rows=8, columns=8):
+        '''GameRecord([moves=(), tags=None, start=None, result='*', rows=8, columns=8])
+        creates a record of moves, tuples of Bitboard squares, played from
+        the position start, the usual start position if None'''
+        if result not in RESULTS:
+            raise ValueError(f'unknown result {result!r}')
+
+        # attributes
+        self.moves = [tuple(move) for move in moves]
+        self.tags = dict(tags or {})
+        self.rows = rows
+        self.columns = columns
+        self.start = start if start is not None else get_start_position(rows, columns)
+        self.result = result
+
+    def get_moves(self):
+        '''GameRecord.get_moves() -> list
+        returns the moves as tuples of Bitboard squares'''
+        return self.moves
+
+    def get_tags(self):
+        '''GameRecord.get_tags() -> dict
+        returns the PDN tags, Result and FEN excluded'''
+        return self.tags
+
+    def get_start(self):
+        '''GameRecord.get_start() -> tuple
+        returns the start position as returned by Bitboard.get_position'''
+        return self.start
+
+    def get_result(self):
+        '''GameRecord.get_result() -> str
+        returns the result as written in PDN'''
+        return self.result
+
+    def has_custom_start(self):
+        '''GameRecord.has_custom_start() -> bool
+        returns whether the game starts from another position than the usual one'''
+        return self.start != get_start_position(self.rows, self.columns)
+
+    def replay(self):
+        '''GameRecord.replay() -> Bitboard
+        plays the moves by the rules, completing jump sequences given by
+        their first and last squares, and returns the final position
+        raises ValueError at the first move that is not legal'''
+        bitboard = Bitboard(self.rows, self.columns)
+        bitboard.set_position(self.start)
+        for (ply, path) in enumerate(self.moves):
+            try:
+                move = find_move(path, bitboard.get_legal_moves())
+            except ValueError as error:
+                raise ValueError(f'{error} {format_path(path, bitboard.num_squares)} at ply {ply+1}') from None
+            self.moves[ply] = move
+            bitboard.play_move(move)
+
+        return bitboard
+
+    def get_board(self):
+        '''GameRecord.get_board() -> CheckersBoard
+        returns a board with the moves played, so they can be taken back'''
+        board = CheckersBoard(self.rows, self.columns)
+        board.set_position(self.start)
+        for path in self.moves:
+            for move in board.get_legal_moves():
+                if tuple(board.get_bitboard().square_index(pos) for pos in move.get_path()) == path:
+                    board.make_move(move)
+                    break
+            else:
+                raise ValueError(f'illegal move {format_path(path, board.get_bitboard().num_squares)}')
+
+        board.check_endgame()
+        return board
+
+
+def format_path(path, num_squares=32):
+    '''format_path(path[, num_squares=32]) -> str
+    returns path with PDN square numbers, for messages'''
+    return '-'.join(str(square_number(index, num_squares)) for index in path)
+
+
+def record_board(board, tags=None):
+    '''record_board(board[, tags=None]) -> GameRecord
+    returns the record of the game played on a CheckersBoard
+    the result is taken from its endgame'''
+    bitboard = board.get_bitboard()
+    moves = [tuple(bitboard.square_index(pos) for pos in move.get_path()) for move in board.get_history()]
+    winner = board.get_endgame()
+    result = '*' if winner is None else RESULTS[winner]
+    return GameRecord(moves, tags, board.get_start_position(), result, board.rows, board.columns)
+
+
+def format_game(record):
+    '''format_game(record) -> str
+    returns the PDN of a GameRecord, tags then moves'''
+    lines = []
+    tags = dict(record.get_tags())
+    tags['Result'] = record.get_result()
+    if record.has_custom_start():
+        tags['FEN'] = make_fen(record.get_start(), record.rows, record.columns)
+    for (key, value) in tags.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'[{key} "{value}"]')
+    lines.append('')
+
+    # number the moves from the player who moved first
+    bitboard = Bitboard(record.rows, record.columns)
+    bitboard.set_position(record.get_start())
+    words = []
+    if bitboard.player == 1 and record.get_moves():
+        words.append('1...')
+    for (ply, move) in enumerate(record.get_moves(), start=bitboard.player):
+        if ply % 2 == 0:
+            words.append(f'{ply//2 + 1}.')
+        words.append(format_move(move, bitboard))
+        bitboard.play_move(move)
+    words.append(record.get_result())
+
+    # wrap the move text
+    line = ''
+    for word in words:
+        if line and len(line) + 1 + len(word) > 79:
+            lines.append(line)
+            line = word
+        else:
+            line = f'{line} {word}' if line else word
+    lines.append(line)
+    lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def write_pdn(records, out):
+    '''write_pdn(records, out)
+    writes every GameRecord of records to the text file out'''
+    for record in records:
+        out.write(format_game(record))
+
+
+def parse_game(tags, text, rows=8, columns=8):
+    '''parse_game(tags, text[, rows=8, columns=8]) -> GameRecord
+    returns the record of the move text of a game with tags
+    the moves are kept as written, GameRecord.replay checks them'''
+    tags = dict(tags)
+    result = tags.pop('Result', '*')
+    start = None
+    if 'FEN' in tags:
+        start = parse_fen(tags.pop('FEN'), rows, columns)
+
+    num_squares = rows * (columns//2)
+    paths = _move_paths.setdefault(num_squares, {})
+    moves = []
+    variations = 0
+    for token in TOKEN.findall(text):
+        # the same few hundred moves come up again and again
+        path = paths.get(token)
+        if path is not None:
+            if variations == 0:
+                moves.append(path)
+        elif token == '(':
+            variations += 1
+        elif token == ')':
+            variations -= 1
+        # skip comments, variations and move numbers
+        elif variations > 0 or token[0] == '{' or token[-1] == '.':
+            continue
+        elif token in RESULTS:
+            result = token
+        elif MOVE.fullmatch(token):
+            paths[token] = tuple(square_index(int(number), num_squares) for number in re.split('[-x]', token))
+            moves.append(paths[token])
+
+    if result not in RESULTS:
+        result = '*'
+    return GameRecord(moves, tags, start, result, rows, columns)
+
+
+def read_pdn(lines, rows=8, columns=8, replay=True, errors=None):
+    '''read_pdn(lines[, rows=8, columns=8, replay=True, errors=None]) -> generator
+    yields a GameRecord for every game of lines, a PDN file or any
+    iterable of its lines, reading one game at a time
+    every game is checked and completed by GameRecord.replay if replay
+    a game ends at its result, outside comments and variations, or at the
+    tags of the next game
+    a game that cannot be read raises ValueError, or if errors is a list
+    is skipped and its (game number, message) appended to errors'''
+    tags = {}
+    text = []
+    comments = 0
+    variations = 0
+    ended = False
+    number = 0
+
+    def finish():
+        try:
+            record = parse_game(tags, ' '.join(text), rows, columns)
+            if replay:
+                record.replay()
+        except ValueError as error:
+            if errors is None:
+                raise ValueError(f'game {number}: {error}') from None
+            errors.append((number, str(error)))
+            return None
+        return record
+
+    for line in lines:
+        # a tag after move text starts the next game
+        if comments == 0 and line.lstrip().startswith('['):
+            if text:
+                record = finish()
+                if record is not None:
+                    yield record
+                (tags, text, variations, ended) = ({}, [], 0, False)
+                number += 1
+            for (key, value) in TAG.findall(line):
+                tags[key] = value.replace('\\"', '"').replace('\\\\', '\\')
+        elif comments == 0 and not ended and not BRACKETS.search(line) and ENDINGS.isdisjoint(line.split()):
+            text.append(line)
+        elif line.strip():
+            # so does anything but a comment after the result
+            start = 0
+            for part in PART.finditer(line):
+                token = part.group()
+                if token == '{':
+                    comments += 1
+                elif token == '}':
+                    comments = max(0, comments - 1)
+                elif comments == 0:
+                    if ended:
+                        text.append(line[start:part.start()])
+                        record = finish()
+                        if record is not None:
+                            yield record
+                        (tags, text, variations, ended) = ({}, [], 0, False)
+                        number += 1
+                        start = part.start()
+                    if token == '(':
+                        variations += 1
+                    elif token == ')':
+                        variations -= 1
+                    elif variations == 0 and token in RESULTS:
+                        ended = True
+            text.append(line[start:])
+
+    if text or tags:
+        record = finish()
+        if record is not None:
+            yield record
+
+
+def report_errors(errors, out=sys.stderr):
+    '''report_errors(errors[, out=sys.stderr])
+    prints the games read_pdn skipped, listed in errors, to out'''
+    if errors:
+        print(f'{len(errors):,} games skipped', file=out)
+        for (number, message) in errors[:10]:
+            print(f'  game {number}: {message}', file=out)
+        if len(errors) > 10:
+            print('  ...', file=out)
+
+
+def encode_moves(record):
+    '''encode_moves(record) -> (int, bytes)
+    returns the number of moves of a replayed GameRecord and the moves packed
+    as their index among the sorted legal moves, each in as few bits as the
+    number of legal moves needs'''
+    bitboard = Bitboard(record.rows, record.columns)
+    bitboard.set_position(record.get_start())
+    bits = 0
+    length = 0
+    for move in record.get_moves():
+        legal = sorted(bitboard.get_legal_moves())
+        bits |= legal.index(move) << length
+        length += (len(legal) - 1).bit_length()
+        bitboard.play_move(move)
+
+    return (len(record.get_moves()), bits.to_bytes((length + 7) // 8, 'little'))
+
+
+def decode_moves(data, count, start, rows=8, columns=8):
+    '''decode_moves(data, count, start[, rows=8, columns=8]) -> list
+    returns the count moves packed by encode_moves in data, played from start'''
+    bitboard = Bitboard(rows, columns)
+    bitboard.set_position(start)
+    bits = int.from_bytes(data, 'little')
+    moves = []
+    for _ in range(count):
+        legal = sorted(bitboard.get_legal_moves())
+        width = (len(legal) - 1).bit_length()
+        move = legal[bits & ((1 << width) - 1)]
+        bits >>= width
+        moves.append(move)
+        bitboard.play_move(move)
+
+    return moves
+
+
+def write_archive(path, records, rows=8, columns=8):
+    '''write_archive(path, records[, rows=8, columns=8]) -> int
+    writes the replayed GameRecords of records, all of rows * columns,
+    to the archive file path and returns how many there were'''
+    mask_size = (rows * (columns//2) + 7) // 8
+    offsets = array('Q')
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, columns, 0, 0))
+        for record in records:
+            if (record.rows, record.columns) != (rows, columns):
+                raise ValueError('every game of an archive must be on the same board size')
+            offsets.append(f.tell())
+
+            tags = '\0'.join(f'{key}\0{value}' for (key, value) in record.get_tags().items()).encode()
+            (count, moves) = encode_moves(record)
+            flags = CUSTOM_START if record.has_custom_start() else 0
+            f.write(GAME.pack(flags, RESULTS.index(record.get_result()), len(tags), count, len(moves)))
+            f.write(tags)
+            if flags & CUSTOM_START:
+                (p0, p1, kings, player) = record.get_start()
+                for mask in (p0, p1, kings):
+                    f.write(mask.to_bytes(mask_size, 'little'))
+                f.write(bytes([player]))
+            f.write(moves)
+
+        # the index of the games, then the header again with their number
+        index_offset = f.tell()
+        offsets.tofile(f)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, rows, columns, len(offsets), index_offset))
+
+    return len(offsets)
+
+
+class Archive:
+    '''represents a game archive file, read through mmap'''
+
+    def __init__(self, path):
+        '''Archive(path)
+        opens the archive written by write_archive to path'''
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.rows, self.columns, self.count, index_offset) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a game archive')
+
+        # attributes
+        self.path = path
+        self.offsets = memoryview(self.data)[index_offset:index_offset + 8*self.count].cast('Q')
+        self.mask_size = (self.rows * (self.columns//2) + 7) // 8
+
+    def close(self):
+        '''Archive.close()
+        closes the file'''
+        self.offsets.release()
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def get_count(self):
+        '''Archive.get_count() -> int
+        returns the number of games'''
+        return self.count
+
+    def get_record(self, index):
+        '''Archive.get_record(index) -> GameRecord
+        returns the game number index, counting from 0'''
+        if not 0 <= index < self.count:
+            raise IndexError(f'no game {index} in {self.path}')
+
+        offset = self.offsets[index]
+        (flags, result, tags_size, count, moves_size) = GAME.unpack_from(self.data, offset)
+        offset += GAME.size
+        fields = self.data[offset:offset + tags_size].decode().split('\0') if tags_size else []
+        tags = dict(zip(fields[::2], fields[1::2]))
+        offset += tags_size
+
+        start = get_start_position(self.rows, self.columns)
+        if flags & CUSTOM_START:
+            masks = [int.from_bytes(self.data[offset + k*self.mask_size:offset + (k+1)*self.mask_size], 'little')
+                     for k in range(3)]
+            offset += 3*self.mask_size
+            start = (*masks, self.data[offset])
+            offset += 1
+
+        moves = decode_moves(self.data[offset:offset + moves_size], count, start, self.rows, self.columns)
+        return GameRecord(moves, tags, start, RESULTS[result], self.rows, self.columns)
+
+    def iter_records(self):
+        '''Archive.iter_records() -> generator
+        yields every game in order'''
+        for index in range(self.count):
+            yield self.get_record(index)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers game records')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert_parser = commands.add_parser('convert', help='convert between PDN (.pdn) and archives (.ckga)')
+    convert_parser.add_argument('source')
+    convert_parser.add_argument('target')
+    show_parser = commands.add_parser('show', help='print games of a PDN file or an archive as PDN')
+    show_parser.add_argument('path')
+    show_parser.add_argument('games', nargs='*', type=int, help='game numbers from 0, every game by default')
+    options = parser.parse_args(args)
+
+    errors = []
+
+    def load(path):
+        if path.endswith('.ckga'):
+            yield from Archive(path).iter_records()
+        else:
+            with open(path, encoding='utf-8') as lines:
+                yield from read_pdn(lines, errors=errors)
+
+    if options.command == 'convert':
+        if options.target.endswith('.ckga'):
+            count = write_archive(options.target, load(options.source))
+        else:
+            with open(options.target, 'w', encoding='utf-8') as out:
+                count = 0
+                for record in load(options.source):
+                    out.write(format_game(record))
+                    count += 1
+        print(f'{count} games written to {options.target}')
+        report_errors(errors)
+        return 0
+
+    if options.games and options.path.endswith('.ckga'):
+        archive = Archive(options.path)
+        records = (archive.get_record(index) for index in options.games)
+    else:
+        records = (record for (index, record) in enumerate(load(options.path))
+                   if not options.games or index in options.games)
+    write_pdn(records, sys.stdout)
+    report_errors(errors)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
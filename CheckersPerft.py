@@ -0,0 +1,194 @@
+'''perft for Checkers: counts the move tree to a depth to check and time
+move generation
+
+    python CheckersPerft.py [depth]     counts from the start position
+    python CheckersPerft.py --verify    checks the known counts
+    python CheckersPerft.py --diff 4    compares CheckersBoard with the list-based rules'''
+import argparse
+import copy
+import sys
+import time
+
+from CheckersBitboard import Bitboard
+from CheckersEngine import CheckersBoard
+import CheckersReference
+
+# published perft counts of 8x8 checkers from the start position, from depth 1
+PUBLISHED_PERFT = (7, 49, 302, 1469, 7361, 36768, 179740, 845931, 3963680, 18391564, 85242128, 388623673)
+
+# positions with many kings, long jump sequences and crowning during a jump
+# each is (name, men of player 0, kings of player 0, men of player 1, kings of player 1, player to move)
+# their counts were found by this tool and agree with the list-based rules
+REFERENCE_POSITIONS = (
+    ('king captures', (21, 22, 25, 29), (9,), (5, 6, 13), (18, 26), 0),
+    ('double jump', (24, 25, 28, 30), (), (1, 2, 6, 13, 14, 21), (), 0),
+    ('crowning jump', (10, 20, 22), (), (5, 6, 17), (30,), 0),
+    ('kings only', (), (0, 14, 27), (), (4, 16, 31), 1),
+)
+REFERENCE_COUNTS = {
+    'king captures': (4, 4, 9, 49, 191, 1046),
+    'double jump': (3, 8, 39, 224, 1063, 5705),
+    'crowning jump': (2, 2, 4, 10, 26, 100),
+    'kings only': (6, 38, 223, 1362, 7691, 45251),
+}
+
+
+def make_position(men0, kings0, men1, kings1, player):
+    '''make_position(men0, kings0, men1, kings1, player) -> tuple
+    returns the Bitboard position with the pieces on the given square numbers'''
+    pieces = [0, 0]
+    kings = 0
+    for (player_id, men, player_kings) in ((0, men0, kings0), (1, men1, kings1)):
+        for index in men + player_kings:
+            pieces[player_id] |= 1 << index
+        for index in player_kings:
+            kings |= 1 << index
+
+    return (pieces[0], pieces[1], kings, player)
+
+
+def perft(bitboard, depth):
+    '''perft(bitboard, depth) -> int
+    returns the number of move sequences of depth moves from bitboard'''
+    moves = bitboard.get_legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        bitboard.make_move(move)
+        nodes += perft(bitboard, depth-1)
+        bitboard.unmake_move()
+
+    return nodes
+
+
+def run_perft(position, depth, out=sys.stdout):
+    '''run_perft(position, depth[, out=sys.stdout]) -> list
+    counts position at every depth up to depth, printing the timings
+    returns the counts'''
+    bitboard = Bitboard()
+    bitboard.set_position(position)
+    counts = []
+    for d in range(1, depth+1):
+        start = time.perf_counter()
+        nodes = perft(bitboard, d)
+        seconds = time.perf_counter() - start
+        counts.append(nodes)
+        rate = nodes / seconds if seconds > 0 else 0.0
+        print(f'  depth {d:2} {nodes:14,} nodes {seconds:9.3f} s {rate:12,.0f} nodes/sec', file=out)
+
+    return counts
+
+
+def verify(depth, out=sys.stdout):
+    '''verify(depth[, out=sys.stdout]) -> bool
+    returns whether the counts up to depth match the published and reference counts'''
+    ok = True
+    print('start position', file=out)
+    counts = run_perft(Bitboard().get_position(), min(depth, len(PUBLISHED_PERFT)), out)
+    if counts != list(PUBLISHED_PERFT[:len(counts)]):
+        print(f'  MISMATCH, expected {list(PUBLISHED_PERFT[:len(counts)])}', file=out)
+        ok = False
+
+    for (name, *pieces) in REFERENCE_POSITIONS:
+        print(name, file=out)
+        expected = list(REFERENCE_COUNTS[name][:depth])
+        counts = run_perft(make_position(*pieces), len(expected), out)
+        if counts != expected:
+            print(f'  MISMATCH, expected {expected}', file=out)
+            ok = False
+
+    return ok
+
+
+def reference_step(board, start, end):
+    '''reference_step(board, start, end) -> bool
+    plays one step on a list-based board the way the game always has
+    returns True if the piece must keep jumping'''
+    piece = board.get_piece(start)
+    was_not_king = not piece.get_king()
+    board.move(piece, end)
+
+    # piece jumped
+    if abs(start[0]-end[0]) == 2:
+        board.remove_piece(board.get_piece(((start[0]+end[0]) // 2, (start[1]+end[1]) // 2)))
+        new_king = was_not_king and piece.get_king()
+        if piece in board.get_playable_pieces() and board.is_jumpable(piece) is not None and not new_king:
+            return True
+
+    board.next_player()
+    return False
+
+
+def reference_moves(board):
+    '''reference_moves(board) -> set
+    returns the paths of the complete moves of board found by the list-based rules'''
+    bitboard = board.get_bitboard()
+    reference = CheckersReference.make_board(bitboard.get_position(), board.rows, board.columns)
+    paths = set()
+
+    def extend(reference, path, targets):
+        for end in targets:
+            child = copy.deepcopy(reference)
+            if reference_step(child, path[-1], end):
+                piece = child.get_piece(end)
+                extend(child, path + (end,), child.is_jumpable(piece).get(piece))
+            else:
+                paths.add(path + (end,))
+
+    for (piece, targets) in reference.get_playable_pieces().items():
+        extend(reference, (piece.get_position(),), targets)
+
+    return paths
+
+
+def diff_generators(generate, depth, board=None, out=sys.stdout):
+    '''diff_generators(generate, depth[, board=None, out=sys.stdout]) -> int
+    walks the move tree of board to depth comparing generate(board),
+    a set of move paths, with the moves of CheckersBoard
+    prints every position where they differ and returns how many there are'''
+    if board is None:
+        board = CheckersBoard()
+
+    moves = board.get_legal_moves()
+    expected = set(move.get_path() for move in moves)
+    found = set(generate(board))
+    differences = 0
+    if found != expected:
+        print(f'position {board.get_bitboard().get_position()}', file=out)
+        print(f'  only in generator: {sorted(found - expected)}', file=out)
+        print(f'  only in CheckersBoard: {sorted(expected - found)}', file=out)
+        differences += 1
+
+    if depth > 1:
+        for move in moves:
+            board.make_move(move)
+            differences += diff_generators(generate, depth-1, board, out)
+            board.unmake_move()
+
+    return differences
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers perft')
+    parser.add_argument('depth', nargs='?', type=int, default=7)
+    parser.add_argument('--verify', action='store_true', help='check the published and reference counts')
+    parser.add_argument('--diff', action='store_true', help='compare CheckersBoard with the list-based rules')
+    options = parser.parse_args(args)
+
+    if options.verify:
+        return 0 if verify(options.depth) else 1
+
+    if options.diff:
+        differences = diff_generators(reference_moves, options.depth)
+        print(f'{differences} positions differ')
+        return 1 if differences else 0
+
+    print('start position')
+    run_perft(Bitboard().get_position(), options.depth)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+'''the original list-based Checkers rules, kept as a reference
+used by the benchmarks to measure and check the bitboard engine'''
+from CheckersBitboard import Bitboard, iter_bits
+from CheckersEngine import CheckersPiece
+
+
+class CheckersBoard:
+    '''represents a board of Checkers'''
+    player_ids = (0, 1)
+    
+    def __init__(self, rows=8, columns=8):
+        '''CheckersBoard([rows=8, columns=8])
+        creates a CheckersBoard in starting position'''
+        # create starting board
+        self.pieces = []
+        for row in range(rows):
+            for col in range(columns):
+                pos = (row, col)
+                
+                # find starting positions
+                if row % 2 != col % 2 and row < rows//2 - 1:
+                    # player 1
+                    self.pieces.append(CheckersPiece(self.player_ids[1], pos))
+                elif row % 2 != col % 2 and row > rows//2:
+                    # player 0
+                    self.pieces.append(CheckersPiece(self.player_ids[0], pos))
+
+        # attributes
+        self.rows = rows
+        self.columns = columns
+        self.current_player = self.player_ids[0]
+        self.endgame = None
+
+    def get_piece(self, pos):
+        '''CheckersBoard.get_piece(pos) -> int or None
+        returns the piece at position'''
+        for p in self.pieces:
+            # piece has been found
+            if p.get_position() == pos:
+                return p
+
+        return None
+
+    def remove_piece(self, piece):
+        '''CheckersBoard.remove_piece(piece)
+        removes piece from board'''
+        self.pieces.remove(piece)
+
+    def get_all_pieces_positions(self, player=None):
+        '''CheckersBoard.get_all_pieces_positions([players=None]) -> list
+        None returns all piece positions
+        otherwise returns only player piece positions'''
+        positions = []
+        for p in self.pieces:
+            # append all the positions
+            if player is None:
+                positions.append(p.get_position())
+            # append only the positions of player
+            elif p.get_player() == player:
+                positions.append(p.get_position())
+
+        return positions
+    
+    def get_all_pieces(self):
+        '''CheckersBoard.get_all_pieces() -> list
+        returns all the pieces on board'''
+        return self.pieces
+
+    def get_player(self):
+        '''CheckersBoard.get_player() -> int
+        returns the current player'''
+        return self.current_player
+
+    def next_player(self):
+        '''CheckersBoard.next_player()
+        goes to the next player'''
+        self.current_player = self.player_ids[1-self.current_player]
+
+    def get_endgame(self):
+        '''CheckersBoard.get_endgame() -> int or None
+        returns endgame state'''
+        return self.endgame
+
+    def is_movable(self, piece):
+        '''CheckersBoard.is_movable(piece) -> dict or None
+        returns a dict of the possible positions where piece can move
+            key: piece, value: possible move positions
+        returns None if piece cannot move'''
+        # piece does not belong to current player
+        if piece.get_player() != self.current_player:
+            return None
+
+        (row, col) = piece.get_position()
+        possible_moves = []
+        # piece is not king
+        if not piece.get_king():
+            # player 0
+            if piece.get_player() == 0:
+                # check the diagonal positions on top to see if they are empty
+                for dc in (-1, 1):
+                    if (0 <= row-1 < self.rows) and (0 <= col+dc < self.columns) and \
+                        (row-1, col+dc) not in self.get_all_pieces_positions():
+                        possible_moves.append((row-1, col+dc))
+            # player 1
+            else:
+                # check the diagonal positions on the botton to see if they are empty
+                for dc in (-1, 1):
+                    if (0 <= row+1 < self.rows) and (0 <= col+dc < self.columns) and \
+                        (row+1, col+dc) not in self.get_all_pieces_positions():
+                        possible_moves.append((row+1, col+dc))
+        # piece is king
+        else:
+            # check diangonal positions to see if they are empty
+            for dr in (-1, 1):
+                for dc in (-1, 1):
+                    if (0 <= row+dr < self.rows) and (0 <= col+dc < self.columns) and \
+                        (row+dr, col+dc) not in self.get_all_pieces_positions():
+                        possible_moves.append((row+dr, col+dc))    
+
+        # no possible moves
+        if len(possible_moves) == 0:
+            return None
+        else:
+            return {piece: possible_moves}
+
+    def is_jumpable(self, piece):
+        '''CheckersBoard.is_jumpable(piece) -> dict or None
+        returns a dict of the possible positions where piece can jump
+            key: piece, value: positions jump positions
+        returns None if piece cannot jump'''
+        # piece does not belong to current player
+        if piece.get_player() != self.current_player:
+            return None
+
+        (row, col) = piece.get_position()
+        possible_jumps = []
+        # piece is not king
+        if not piece.get_king():
+            # player 0
+            if piece.get_player() == 0:
+                for dc in (-1, 1):
+                    # check if the diagonal positions on top contains the other player's piece
+                    if (0 <= row-1 < self.rows) and (0 <= col+dc < self.columns) and \
+                        (row-1, col+dc) in self.get_all_pieces_positions(1):
+                        # check if the positions over them are empty
+                        if (0 <= row-2 < self.rows) and (0 <= col+2*dc < self.columns) and \
+                            (row-2, col+2*dc) not in self.get_all_pieces_positions():
+                            possible_jumps.append((row-2, col+2*dc))
+            # player 1
+            else:
+                for dc in (-1, 1):
+                    # check if the diagonal positions on the bottom contain the other player's piece
+                    if (0 <= row+1 < self.rows) and (0 <= col+dc < self.columns) and \
+                        (row+1, col+dc) in self.get_all_pieces_positions(0):
+                        # check if the positions over them are empty
+                        if (0 <= row+2 < self.rows) and (0 <= col+2*dc < self.columns) and \
+                            (row+2, col+2*dc) not in self.get_all_pieces_positions():
+                            possible_jumps.append((row+2, col+2*dc))
+        # piece is king
+        else:
+            # player 0
+            if piece.get_player() == 0:
+                for dr in (-1, 1):
+                    for dc in (-1, 1):
+                        # check if the diagonal positions contain the other player's piece
+                        if (0 <= row+dr < self.rows) and (0 <= col+dc < self.columns) and \
+                            (row+dr, col+dc) in self.get_all_pieces_positions(1):
+                            # check if the positions over them are empty
+                            if (0 <= row+2*dr < self.rows) and (0 <= col+2*dc < self.columns) and \
+                                (row+2*dr, col+2*dc) not in self.get_all_pieces_positions():
+                                possible_jumps.append((row+2*dr, col+2*dc))
+            # player 1
+            else:
+                for dr in (-1, 1):
+                    for dc in (-1, 1):
+                        # check if the diagonal positions contain the other player's piece
+                        if (0 <= row+dr < self.rows) and (0 <= col+dc < self.columns) and \
+                            (row+dr, col+dc) in self.get_all_pieces_positions(0):
+                            # check if the positions over them are empty
+                            if (0 <= row+2*dr < self.rows) and (0 <= col+2*dc < self.columns) and \
+                                (row+2*dr, col+2*dc) not in self.get_all_pieces_positions():
+                                possible_jumps.append((row+2*dr, col+2*dc))
+
+        # no possible jumps
+        if len(possible_jumps) == 0:
+            return None
+        else:
+            return {piece: possible_jumps}
+
+
+    def get_movable_pieces(self):
+        '''CheckersBoard.get_movable_pieces() -> dict
+        returns a dict of pieces that can move
+            key: piece, value: possible move positions'''
+        movable_pieces = {}
+        for p in self.pieces:
+            # check if piece is movable
+            if self.is_movable(p) is not None:
+                movable_pieces[p] = self.is_movable(p).get(p)
+
+        return movable_pieces
+
+    def get_jumpable_pieces(self):
+        '''CheckersBoard.get_jumpable_pieces() -> dict
+        returns a dict of pieces that can jump
+            key: piece, value: possible jump positions'''
+        jumpable_pieces = {}
+        for p in self.pieces:
+            # check if piece is jumpable
+            if self.is_jumpable(p) is not None:
+                jumpable_pieces[p] = self.is_jumpable(p).get(p)
+        
+        return jumpable_pieces
+
+    def get_playable_pieces(self):
+        '''CheckersBoard.get_playable_pieces() -> dict
+        returns a dict of piece that can be played
+            key: piece, value: playable positions'''
+        # no pieces can jump
+        if len(self.get_jumpable_pieces()) == 0:
+            return self.get_movable_pieces()
+        else:
+            return self.get_jumpable_pieces()
+
+    def move(self, piece, pos):
+        '''CheckersBoard.move(piece, pos)
+        moves piece to pos'''
+        piece.change_position(pos)
+        
+        # player 0
+        if self.current_player == 0:
+            # turn piece into king if it reaches the end
+            if pos[0] == 0:
+                piece.make_king()
+        # player 1
+        else:
+            # turn piece into king if it reaches the end
+            if pos[0] == self.rows-1:
+                piece.make_king()
+
+    def check_endgame(self):
+        '''CheckersBoard.check_endgame()
+        checks if game is over
+        updates the endgame message if over'''
+        pieces = [p for p in self.pieces if p.get_player() == self.current_player]
+
+        # check if there are no pieces left of current player or no playable pieces
+        if len(pieces) == 0 or len(self.get_playable_pieces()) == 0:
+            self.endgame = 1 - self.current_player
+
+
+def make_board(position, rows=8, columns=8):
+    '''make_board(position[, rows=8, columns=8]) -> CheckersBoard
+    returns a list-based board holding a position returned by Bitboard.get_position'''
+    bitboard = Bitboard(rows, columns)
+    board = CheckersBoard(rows, columns)
+    board.pieces = []
+    for player in board.player_ids:
+        for index in iter_bits(position[player]):
+            is_king = bool(position[2] & (1 << index))
+            board.pieces.append(CheckersPiece(player, bitboard.square_position(index), is_king))
+    board.current_player = position[3]
+    return board
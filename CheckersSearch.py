@@ -0,0 +1,426 @@
+'''alpha-beta search for Checkers
+searches the Bitboard behind a CheckersBoard, so jumps are forced and
+jump sequences are played to the end, exactly like get_playable_pieces
+
+the evaluation weights can be tuned with CheckersTune, and the weights
+file it writes is loaded at startup from CHECKERS_WEIGHTS if that is set'''
+import json
+import os
+import time
+
+from CheckersBitboard import get_square_tables
+from CheckersEngine import LOSS, WIN
+from CheckersTransposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# score of a won position, lowered by the number of plies needed to win
+WIN_SCORE = 100000
+INFINITY = WIN_SCORE + 1
+MAX_PLY = 256
+
+# piece values for the evaluation
+MAN_VALUE = 100
+KING_VALUE = 150
+
+# the terms of the evaluation, each counted for the player to move minus the opponent
+#     men, kings: the pieces
+#     back_rank: the men still on the row the opponent crowns on
+#     center: the pieces on the middle squares of the two middle rows
+#     mobility: the simple moves, forced jumps aside
+FEATURES = ('men', 'kings', 'back_rank', 'center', 'mobility')
+DEFAULT_WEIGHTS = {'men': MAN_VALUE, 'kings': KING_VALUE, 'back_rank': 0, 'center': 0, 'mobility': 0}
+
+# back rank and center masks already built for each board size
+_evaluation_masks = {}
+
+# how many nodes are searched between two checks of the clock
+CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    '''raised inside the search when the time budget has run out or it is stopped'''
+
+
+def get_evaluation_masks(rows, columns):
+    '''get_evaluation_masks(rows, columns) -> (tuple, int)
+    returns the masks of the back ranks of both players and of the center
+    squares of a rows * columns board'''
+    if (rows, columns) not in _evaluation_masks:
+        positions = get_square_tables(rows, columns)[3]
+        back_ranks = [0, 0]
+        center = 0
+        for (index, (row, col)) in enumerate(positions):
+            # player 0 starts at the bottom and crowns on row 0
+            if row == rows-1:
+                back_ranks[0] |= 1 << index
+            elif row == 0:
+                back_ranks[1] |= 1 << index
+            if rows//2 - 1 <= row <= rows//2 and 2 <= col <= columns-3:
+                center |= 1 << index
+        _evaluation_masks[(rows, columns)] = (tuple(back_ranks), center)
+
+    return _evaluation_masks[(rows, columns)]
+
+
+def load_weights(path):
+    '''load_weights(path) -> dict
+    returns the evaluation weights of the file path written by CheckersTune
+    features the file leaves out weigh nothing'''
+    with open(path, encoding='utf-8') as f:
+        values = json.load(f)['weights']
+
+    unknown = set(values) - set(FEATURES)
+    if unknown:
+        raise ValueError(f'unknown features {sorted(unknown)} in {path}')
+    return {name: int(values.get(name, 0)) for name in FEATURES}
+
+
+def evaluate(bitboard, weights=None):
+    '''evaluate(bitboard[, weights=None]) -> int
+    returns the score of bitboard for the player to move
+    weights holds the weight of each of FEATURES, DEFAULT_WEIGHTS if None,
+    which are the weights of CHECKERS_WEIGHTS if it is set'''
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    player = bitboard.player
+    own = bitboard.pieces[player]
+    enemy = bitboard.pieces[1-player]
+    kings = bitboard.kings
+    score = (weights['men'] * ((own & ~kings).bit_count() - (enemy & ~kings).bit_count()) +
+             weights['kings'] * ((own & kings).bit_count() - (enemy & kings).bit_count()))
+
+    # the other terms cost more, skip the ones that weigh nothing
+    if weights['back_rank'] or weights['center']:
+        (back_ranks, center) = get_evaluation_masks(bitboard.rows, bitboard.columns)
+        score += weights['back_rank'] * ((own & ~kings & back_ranks[player]).bit_count() -
+                                         (enemy & ~kings & back_ranks[1-player]).bit_count())
+        score += weights['center'] * ((own & center).bit_count() - (enemy & center).bit_count())
+    if weights['mobility']:
+        score += weights['mobility'] * (bitboard.count_steps(player) - bitboard.count_steps(1-player))
+
+    return score
+
+
+# tuned weights for every engine of the process
+if os.environ.get('CHECKERS_WEIGHTS'):
+    DEFAULT_WEIGHTS = load_weights(os.environ['CHECKERS_WEIGHTS'])
+
+
+class SearchEngine:
+    '''searches Checkers positions with negamax alpha-beta and iterative deepening'''
+
+    def __init__(self, max_depth=64, time_limit=1.0, table=None, tablebase=None, book=None, weights=None):
+        '''SearchEngine([max_depth=64, time_limit=1.0, table=None, tablebase=None, book=None, weights=None])
+        creates an engine searching at most max_depth plies
+        and at most time_limit seconds per move
+        table is the TranspositionTable to use, a new one if None
+        tablebase is an endgame Tablebase giving exact scores, if any
+        book is an opening Book whose moves are played without searching, if any
+        weights are the evaluation weights, or the path of a weights file, DEFAULT_WEIGHTS if None'''
+        if table is None:
+            table = TranspositionTable()
+        if weights is None:
+            weights = DEFAULT_WEIGHTS
+        elif isinstance(weights, str):
+            weights = load_weights(weights)
+
+        # attributes
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.table = table
+        self.tablebase = tablebase
+        self.book = book
+        self.weights = weights
+        self.deadline = None
+        self.start_time = None
+        self.stop_requested = False
+        self.nodes = 0
+        self.progress = {'depth': 0, 'score': 0, 'move': None}
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.stats = {}
+
+    def get_stats(self):
+        '''SearchEngine.get_stats() -> dict
+        returns the depth, score, nodes, seconds and nodes per second
+        of the last search, and the transposition table counters'''
+        stats = dict(self.stats)
+        stats['table'] = self.table.get_stats()
+        return stats
+
+    def get_progress(self):
+        '''SearchEngine.get_progress() -> dict
+        returns the depth, score and move of the last iteration completed
+        and the nodes, seconds and nodes per second so far
+        safe to call from another thread while a search runs'''
+        progress = dict(self.progress)
+        seconds = time.perf_counter() - self.start_time if self.start_time is not None else 0.0
+        progress.update(nodes=self.nodes, seconds=seconds,
+                        nodes_per_second=self.nodes / seconds if seconds > 0 else 0.0)
+        return progress
+
+    def stop(self):
+        '''SearchEngine.stop()
+        makes the running search return the best move found so far
+        safe to call from another thread'''
+        self.stop_requested = True
+
+    def search(self, board, time_limit=None, max_depth=None):
+        '''SearchEngine.search(board[, time_limit=None, max_depth=None]) -> CheckersMove or None
+        returns the best move of the current player of board
+        returns None if the player cannot move'''
+        path = self.search_bitboard(board.get_bitboard().copy(), time_limit, max_depth)
+        if path is None:
+            return None
+
+        positions = [board.get_bitboard().square_position(index) for index in path]
+        for move in board.get_legal_moves():
+            if list(move.get_path()) == positions:
+                return move
+
+    def search_bitboard(self, bitboard, time_limit=None, max_depth=None):
+        '''SearchEngine.search_bitboard(bitboard[, time_limit=None, max_depth=None]) -> tuple or None
+        returns the best move of the player to move as a tuple of squares
+        returns None if the player cannot move'''
+        if time_limit is None:
+            time_limit = self.time_limit
+        if max_depth is None:
+            max_depth = self.max_depth
+
+        start = time.perf_counter()
+        self.deadline = start + time_limit
+        self.start_time = start
+        self.nodes = 0
+        self.progress = {'depth': 0, 'score': 0, 'move': None}
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+
+        # keep some history from the last move, but let the new position dominate
+        self.history = {move: score // 2 for (move, score) in self.history.items() if score > 1}
+
+        moves = bitboard.get_legal_moves()
+        if len(moves) == 0:
+            self.stats = {'depth': 0, 'score': -WIN_SCORE, 'nodes': 0, 'seconds': 0.0, 'nodes_per_second': 0.0}
+            self.stop_requested = False
+            return None
+
+        # a book move needs no search either
+        if self.book is not None:
+            book_move = self.book.choose(bitboard)
+            if book_move is not None:
+                self.stats = {'depth': 0, 'score': 0, 'nodes': 0, 'seconds': time.perf_counter() - start,
+                              'nodes_per_second': 0.0, 'book': True}
+                self.stop_requested = False
+                return book_move
+
+        best_move = moves[0]
+        best_score = 0
+        completed_depth = 0
+
+        # a forced move needs no search
+        if len(moves) > 1:
+            undo_depth = len(bitboard.undo_stack)
+            for depth in range(1, max_depth+1):
+                try:
+                    (best_score, best_move) = self.search_root(bitboard, moves, depth)
+                except SearchTimeout:
+                    # take back the moves of the interrupted search
+                    while len(bitboard.undo_stack) > undo_depth:
+                        bitboard.unmake_move()
+                    break
+                completed_depth = depth
+                self.progress = {'depth': depth, 'score': best_score, 'move': best_move}
+
+                # search the best move first in the next iteration
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+
+                # the game is decided, deeper searches cannot change it
+                if abs(best_score) >= WIN_SCORE - MAX_PLY:
+                    break
+
+        # a stop only ends the search it interrupted
+        self.stop_requested = False
+
+        seconds = time.perf_counter() - start
+        self.stats = {'depth': completed_depth, 'score': best_score, 'nodes': self.nodes, 'seconds': seconds,
+                      'nodes_per_second': self.nodes / seconds if seconds > 0 else 0.0}
+        return best_move
+
+    def search_root(self, bitboard, moves, depth):
+        '''SearchEngine.search_root(bitboard, moves, depth) -> (int, tuple)
+        returns the score and the best of moves searched to depth'''
+        alpha = -INFINITY
+        best_move = moves[0]
+        for move in moves:
+            bitboard.make_move(move)
+            score = -self.negamax(bitboard, depth-1, -INFINITY, -alpha, 1)
+            bitboard.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = move
+
+        return (alpha, best_move)
+
+    def negamax(self, bitboard, depth, alpha, beta, ply):
+        '''SearchEngine.negamax(bitboard, depth, alpha, beta, ply) -> int
+        returns the score of bitboard for the player to move
+        searched to depth with the window alpha, beta'''
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(bitboard, alpha, beta, ply)
+
+        self.count_node()
+        score = self.probe_tablebase(bitboard, ply)
+        if score is not None:
+            return score
+
+        moves = bitboard.get_legal_moves()
+
+        # a player who cannot move has lost
+        if len(moves) == 0:
+            return -WIN_SCORE + ply
+
+        # use what an earlier search found out about this position
+        original_alpha = alpha
+        table_move = None
+        entry = self.table.probe(bitboard.hash)
+        if entry is not None:
+            (table_depth, score, kind, table_move) = entry
+            score = score_from_table(score, ply)
+            if table_depth >= depth:
+                if kind == EXACT:
+                    return score
+                elif kind == LOWER and score >= beta:
+                    return score
+                elif kind == UPPER and score <= alpha:
+                    return score
+
+        is_capture = bitboard.is_jump(moves[0][0], moves[0][1])
+        best_score = -INFINITY
+        best_move = None
+        for move in self.order_moves(moves, is_capture, ply, table_move):
+            bitboard.make_move(move)
+            score = -self.negamax(bitboard, depth-1, -beta, -alpha, ply+1)
+            bitboard.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                # remember quiet moves that cut off for the ordering of other nodes
+                if not is_capture:
+                    self.add_cutoff(move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            kind = UPPER
+        elif best_score >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.table.store(bitboard.hash, depth, score_to_table(best_score, ply), kind, best_move)
+
+        return best_score
+
+    def quiescence(self, bitboard, alpha, beta, ply):
+        '''SearchEngine.quiescence(bitboard, alpha, beta, ply) -> int
+        returns the score of bitboard once no jump is forced'''
+        self.count_node()
+        score = self.probe_tablebase(bitboard, ply)
+        if score is not None:
+            return score
+
+        moves = bitboard.get_legal_moves()
+
+        if len(moves) == 0:
+            return -WIN_SCORE + ply
+
+        # the position is quiet
+        if not bitboard.is_jump(moves[0][0], moves[0][1]) or ply >= MAX_PLY - 1:
+            return evaluate(bitboard, self.weights)
+
+        # jumps are forced, so there is no standing pat
+        best_score = -INFINITY
+        for move in self.order_moves(moves, True, ply):
+            bitboard.make_move(move)
+            score = -self.quiescence(bitboard, -beta, -alpha, ply+1)
+            bitboard.unmake_move()
+
+            if score > best_score:
+                best_score = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        return best_score
+
+    def probe_tablebase(self, bitboard, ply):
+        '''SearchEngine.probe_tablebase(bitboard, ply) -> int or None
+        returns the exact score of bitboard from the tablebase
+        returns None if there is no tablebase or it does not cover bitboard'''
+        if self.tablebase is None or not self.tablebase.covers(bitboard):
+            return None
+
+        (result, distance) = self.tablebase.probe(bitboard)
+        if result == WIN:
+            return WIN_SCORE - ply - distance
+        elif result == LOSS:
+            return -WIN_SCORE + ply + distance
+        return 0
+
+    def count_node(self):
+        '''SearchEngine.count_node()
+        counts a searched node and stops the search when time is up or stop was called'''
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and (self.stop_requested or time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+    def order_moves(self, moves, is_capture, ply, table_move=None):
+        '''SearchEngine.order_moves(moves, is_capture, ply[, table_move=None]) -> list
+        returns moves in the order they should be searched
+        the transposition table move first, then the longest captures,
+        or the killer moves and the rest by history score'''
+        killers = self.killers[ply]
+
+        def priority(move):
+            if table_move is not None and move[:2] == table_move:
+                return 2 * INFINITY
+            elif is_capture:
+                return len(move)
+            elif move == killers[0]:
+                return INFINITY
+            elif move == killers[1]:
+                return INFINITY - 1
+            return self.history.get(move, 0)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def add_cutoff(self, move, depth, ply):
+        '''SearchEngine.add_cutoff(move, depth, ply)
+        records a quiet move that caused a beta cutoff'''
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth*depth
+
+
+def score_to_table(score, ply):
+    '''score_to_table(score, ply) -> int
+    returns score with wins counted from the current position, for storing'''
+    if score >= WIN_SCORE - MAX_PLY:
+        return score + ply
+    elif score <= -WIN_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    '''score_from_table(score, ply) -> int
+    returns a stored score with wins counted from the root again'''
+    if score >= WIN_SCORE - MAX_PLY:
+        return score - ply
+    elif score <= -WIN_SCORE + MAX_PLY:
+        return score + ply
+    return score
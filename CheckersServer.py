@@ -0,0 +1,372 @@
+'''an asyncio server hosting many Checkers games at once
+
+clients send one JSON object per line and get one JSON object per line
+back, with the id of the request they answer. a connection may have many
+requests in flight, answers come back as they are ready
+
+    {"id": 1, "cmd": "new", "engine": "search:depth=6"}
+    {"id": 1, "ok": true, "game": 1, "fen": "B:W21,...:B1,...", "moves": ["9-13", ...], "result": null}
+    {"id": 2, "cmd": "move", "game": 1, "move": "11-15"}
+    {"id": 2, "ok": true, "game": 1, "reply": "23-19", "fen": "...", "moves": [...], "result": null}
+
+commands
+    new        rows, columns, engine (a player spec, none for two humans,
+               of the options of ENGINE_OPTIONS only), side (0 or 1, the
+               side of the engine, 1 by default)
+    moves      game
+    move       game, move in PDN like 11-15 or 15x24
+    resign     game
+    stats
+a game whose result is set is closed, and so are the games of a
+connection when it closes. moves are written in PDN, so square 1 is on
+the side of player 0, who moves first
+
+engine moves are searched in a process pool so they never block the loop
+
+    python CheckersServer.py --port 8765
+    python CheckersServer.py --unix /tmp/checkers.sock'''
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import itertools
+import json
+import signal
+import sys
+
+from CheckersEngine import CheckersBoard
+import CheckersPDN
+from CheckersTournament import get_player, parse_spec
+
+# requests longer than this are refused
+MAX_LINE = 64 * 1024
+
+# the options a client may give each kind of engine, with their smallest
+# and largest values. the time per move and the memory are the server's
+ENGINE_OPTIONS = {'random': {}, 'search': {'depth': (1, 64)}, 'mcts': {'heuristic': (0, 1)}}
+
+
+class ProtocolError(Exception):
+    '''raised for a request the server cannot carry out, the message goes to the client'''
+
+
+def check_engine(spec):
+    '''check_engine(spec) -> str
+    returns the player spec a client asked for with its options clamped to
+    the ranges of ENGINE_OPTIONS
+    raises ProtocolError for an unknown engine or option'''
+    if not isinstance(spec, str):
+        raise ProtocolError('engine must be a player spec')
+    (kind, options) = parse_spec(spec)
+    if kind not in ENGINE_OPTIONS:
+        raise ProtocolError(f'unknown engine {spec}')
+
+    items = []
+    for (key, value) in sorted(options.items()):
+        if key not in ENGINE_OPTIONS[kind]:
+            raise ProtocolError(f'{kind} engines take no option {key}')
+        (low, high) = ENGINE_OPTIONS[kind][key]
+        items.append(f'{key}={min(max(int(value), low), high)}')
+    return kind + (':' + ','.join(items) if items else '')
+
+
+def engine_move(spec, position, rows, columns, time_limit):
+    '''engine_move(spec, position, rows, columns, time_limit) -> tuple
+    returns the move, a tuple of Bitboard squares, that the player of spec
+    plays in position, runs in the worker processes'''
+    board = CheckersBoard(rows, columns)
+    board.set_position(position)
+    move = get_player(spec, time_limit).choose_move(board)
+    return tuple(board.get_bitboard().square_index(pos) for pos in move.get_path())
+
+
+class GameSession:
+    '''represents a game hosted by the server'''
+
+    def __init__(self, game_id, rows=8, columns=8, engine=None, engine_side=1):
+        '''GameSession(game_id[, rows=8, columns=8, engine=None, engine_side=1])
+        creates a game of rows * columns where the player spec engine,
+        if any, plays side engine_side'''
+        # attributes
+        self.game_id = game_id
+        self.board = CheckersBoard(rows, columns)
+        self.engine = engine
+        self.engine_side = engine_side
+        self.lock = asyncio.Lock()
+
+    def get_legal_moves(self):
+        '''GameSession.get_legal_moves() -> dict
+        returns the legal moves of the board by their PDN text'''
+        bitboard = self.board.get_bitboard()
+        moves = {}
+        for move in self.board.get_legal_moves():
+            path = tuple(bitboard.square_index(pos) for pos in move.get_path())
+            moves[CheckersPDN.format_move(path, bitboard)] = move
+        return moves
+
+    def play(self, text):
+        '''GameSession.play(text) -> str
+        plays the move written as text, where a jump sequence may be
+        written by its first and last squares, and returns it in full'''
+        bitboard = self.board.get_bitboard()
+        moves = self.get_legal_moves()
+        if text not in moves:
+            try:
+                path = tuple(CheckersPDN.square_index(int(number), bitboard.num_squares)
+                             for number in text.replace('x', '-').split('-'))
+                path = CheckersPDN.find_move(path, bitboard.get_legal_moves())
+            except ValueError as error:
+                raise ProtocolError(f'{error} {text}') from None
+            text = CheckersPDN.format_move(path, bitboard)
+
+        self.board.make_move(moves[text])
+        self.board.check_endgame()
+        return text
+
+    def engine_to_move(self):
+        '''GameSession.engine_to_move() -> bool
+        returns whether the engine plays the next move'''
+        return (self.engine is not None and self.board.get_endgame() is None and
+                self.board.get_player() == self.engine_side)
+
+    def get_result(self):
+        '''GameSession.get_result() -> str or None
+        returns the result in PDN, None while the game goes on'''
+        winner = self.board.get_endgame()
+        return None if winner is None else CheckersPDN.RESULTS[winner]
+
+    def describe(self):
+        '''GameSession.describe() -> dict
+        returns the state of the game sent to clients'''
+        bitboard = self.board.get_bitboard()
+        return {'game': self.game_id,
+                'fen': CheckersPDN.make_fen(bitboard.get_position(), bitboard.rows, bitboard.columns),
+                'moves': list(self.get_legal_moves()) if self.board.get_endgame() is None else [],
+                'result': self.get_result()}
+
+
+class CheckersServer:
+    '''serves Checkers games over a JSON-lines protocol'''
+
+    def __init__(self, workers=None, engine_time=0.1, max_games=100000):
+        '''CheckersServer([workers=None, engine_time=0.1, max_games=100000])
+        creates a server searching engine moves on workers processes,
+        one per core if None, for engine_time seconds per move
+        with at most max_games games open at once'''
+        # attributes
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers)
+        self.engine_time = engine_time
+        self.max_games = max_games
+        self.sessions = {}
+        self.game_ids = itertools.count(1)
+        self.stats = {'connections': 0, 'requests': 0, 'errors': 0, 'games': 0, 'engine_moves': 0}
+
+    def get_stats(self):
+        '''CheckersServer.get_stats() -> dict
+        returns the counters of the server and the number of open games'''
+        return dict(self.stats, open_games=len(self.sessions))
+
+    def get_session(self, request):
+        '''CheckersServer.get_session(request) -> GameSession
+        returns the game named by request'''
+        session = self.sessions.get(request.get('game'))
+        if session is None:
+            raise ProtocolError(f"unknown game {request.get('game')}")
+        return session
+
+    async def play_engine(self, session):
+        '''CheckersServer.play_engine(session) -> str or None
+        plays the engine move of session if it is the engine's turn
+        returns the move in PDN'''
+        if not session.engine_to_move():
+            return None
+
+        bitboard = session.board.get_bitboard()
+        executor = self.executor
+        try:
+            path = await asyncio.get_running_loop().run_in_executor(
+                executor, engine_move, session.engine, bitboard.get_position(), bitboard.rows, bitboard.columns,
+                self.engine_time)
+        except Exception as error:
+            # a worker that died breaks the pool for good, the next moves go to a new one
+            if isinstance(error, BrokenProcessPool) and executor is self.executor:
+                self.executor = ProcessPoolExecutor(self.workers)
+                executor.shutdown(wait=False)
+            raise ProtocolError(f'the engine failed: {type(error).__name__} {error}') from None
+        self.stats['engine_moves'] += 1
+        return session.play(CheckersPDN.format_move(path, bitboard))
+
+    def close_if_over(self, session, answer):
+        '''CheckersServer.close_if_over(session, answer) -> dict
+        closes session if its game is over and returns answer'''
+        if answer['result'] is not None:
+            self.sessions.pop(session.game_id, None)
+        return answer
+
+    async def handle_request(self, request, games=None):
+        '''CheckersServer.handle_request(request[, games=None]) -> dict
+        carries out a request and returns the answer, without the id
+        the id of a new game is added to the set games if it is not None'''
+        command = request.get('cmd')
+        if command == 'new':
+            if len(self.sessions) >= self.max_games:
+                raise ProtocolError('too many games')
+            engine = request.get('engine')
+            if engine is not None:
+                engine = check_engine(engine)
+            side = request.get('side', 1)
+            if side not in (0, 1):
+                raise ProtocolError('side must be 0 or 1')
+            (rows, columns) = (request.get('rows', 8), request.get('columns', 8))
+            if not (isinstance(rows, int) and isinstance(columns, int) and 4 <= rows <= 16 and 4 <= columns <= 16):
+                raise ProtocolError('rows and columns must be from 4 to 16')
+
+            session = GameSession(next(self.game_ids), rows, columns, engine, side)
+            self.sessions[session.game_id] = session
+            if games is not None:
+                games.add(session.game_id)
+            self.stats['games'] += 1
+            async with session.lock:
+                try:
+                    reply = await self.play_engine(session)
+                except ProtocolError:
+                    # a game the engine cannot start is not kept
+                    self.sessions.pop(session.game_id, None)
+                    raise
+                return self.close_if_over(session, dict(session.describe(), reply=reply))
+
+        elif command == 'moves':
+            return self.get_session(request).describe()
+
+        elif command == 'move':
+            session = self.get_session(request)
+            async with session.lock:
+                if session.engine_to_move():
+                    raise ProtocolError('it is the engine to move')
+                move = session.play(str(request.get('move')))
+                try:
+                    reply = await self.play_engine(session)
+                except ProtocolError:
+                    # take the move back, the client may play it again
+                    session.board.unmake_move()
+                    raise
+                return self.close_if_over(session, dict(session.describe(), move=move, reply=reply))
+
+        elif command == 'resign':
+            session = self.get_session(request)
+            async with session.lock:
+                session.board.endgame = 1 - session.board.get_player()
+                return self.close_if_over(session, session.describe())
+
+        elif command == 'stats':
+            return self.get_stats()
+
+        raise ProtocolError(f'unknown command {command!r}')
+
+    async def respond(self, line, writer, games=None):
+        '''CheckersServer.respond(line, writer[, games=None])
+        answers the request line on writer, adding the id of a new game to games'''
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ProtocolError('a request must be an object')
+            request_id = request.get('id')
+            answer = dict(await self.handle_request(request, games), ok=True)
+        except (ProtocolError, ValueError, TypeError) as error:
+            self.stats['errors'] += 1
+            answer = {'ok': False, 'error': str(error)}
+        except Exception as error:
+            # a failure of the server itself still gets an answer
+            self.stats['errors'] += 1
+            answer = {'ok': False, 'error': f'internal error: {type(error).__name__}'}
+
+        answer['id'] = request_id
+        writer.write(json.dumps(answer).encode() + b'\n')
+        await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        '''CheckersServer.handle_client(reader, writer)
+        reads the requests of one connection until it closes, then closes
+        the games it started'''
+        self.stats['connections'] += 1
+        tasks = set()
+        games = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the line is over the limit
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.stats['requests'] += 1
+                task = asyncio.create_task(self.respond(line, writer, games))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in games:
+                self.sessions.pop(game_id, None)
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None, started=None):
+        '''CheckersServer.serve([host='127.0.0.1', port=8765, path=None, started=None])
+        serves clients on the Unix socket path, or on TCP host and port
+        if path is None, until cancelled
+        started is called with the asyncio server once it listens'''
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+
+        if started is not None:
+            started(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help='serve on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='engine processes, one per core by default')
+    parser.add_argument('--engine-time', type=float, default=0.1, help='seconds per engine move')
+    parser.add_argument('--max-games', type=int, default=100000)
+    options = parser.parse_args(args)
+
+    server = CheckersServer(options.workers, options.engine_time, options.max_games)
+
+    def started(listener):
+        where = options.unix or f'{options.host}:{options.port}'
+        print(f'serving on {where}', flush=True)
+
+    async def run():
+        # SIGTERM and SIGINT cancel serve, so its engine processes are shut down
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, task.cancel)
+        try:
+            await server.serve(options.host, options.port, options.unix, started)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+'''endgame tablebases for 8x8 Checkers
+
+build finds, by retrograde analysis, which positions with at most a
+given number of pieces are won or lost for the player to move, and in
+how many plies. positions are split into slices by their material, the
+men and kings of each side, and a slice is solved after the slices its
+captures and crownings lead to, so only one slice's moves are held in
+memory at a time
+
+a position with player 1 to move is kept as the same position turned
+around with the colours swapped, and has a perfect index in its slice:
+the ranks of the squares of each kind of piece in the combinatorial
+number system. the file is one byte per position at that index, 0 for a
+draw or the plies to the end plus one, a win if the plies are odd, and
+Tablebase reads it through mmap so every process probing the same file
+shares one copy in the page cache
+
+4 pieces take about ten minutes and make a 7 MB file, 5 pieces hours and about 200 MB
+
+    python CheckersTablebase.py build endgame4.cktb --pieces 4
+    python CheckersTablebase.py probe endgame4.cktb 0x80000000,0x9,0x8,1'''
+import argparse
+from array import array
+from itertools import combinations
+from math import comb
+import mmap
+import struct
+import sys
+import time
+
+from CheckersBitboard import Bitboard
+from CheckersEngine import DRAW, LOSS, WIN
+
+# the most pieces build can solve
+MAX_PIECES = 5
+
+# the most plies to the end a byte of the file holds
+MAX_DISTANCE = 254
+
+# file layout: a header, then a byte per position of each material in the
+# order of get_materials
+MAGIC = b'CKTB'
+VERSION = 2
+HEADER = struct.Struct('<4sBBBBI')
+
+# BINOMIALS[n][k] is n choose k
+BINOMIALS = [[comb(n, k) for k in range(MAX_PIECES+1)] for n in range(65)]
+
+
+def get_materials(max_pieces):
+    '''get_materials(max_pieces) -> list
+    returns the materials of 2 to max_pieces pieces, as (men, kings, enemy
+    men, enemy kings) of the player to move, in the order they are solved:
+    fewer pieces first, then fewer men, so every capture and crowning leads
+    to a material before its own'''
+    materials = []
+    for total in range(2, max_pieces+1):
+        for men in range(total+1):
+            for own_men in range(men+1):
+                for own_kings in range(total-men+1):
+                    material = (own_men, own_kings, men-own_men, total-men-own_kings)
+                    if material[0] + material[1] > 0 and material[2] + material[3] > 0:
+                        materials.append(material)
+    return materials
+
+
+def rank(mask, occupied):
+    '''rank(mask, occupied) -> int
+    returns the rank of the squares of mask among the squares not in
+    occupied, in the combinatorial number system'''
+    total = 0
+    count = 1
+    while mask:
+        low = mask & -mask
+        total += BINOMIALS[low.bit_length() - 1 - (occupied & (low-1)).bit_count()][count]
+        count += 1
+        mask ^= low
+    return total
+
+
+class PositionIndex:
+    '''numbers the positions of each material of a board, player 0 to move,
+    one after another'''
+
+    def __init__(self, max_pieces, rows=8, columns=8):
+        '''PositionIndex(max_pieces[, rows=8, columns=8])
+        creates the index of the materials of at most max_pieces pieces'''
+        # attributes
+        self.num_squares = rows * (columns//2)
+        self.width = columns//2
+        self.materials = get_materials(max_pieces)
+        self.factors = {}
+        self.sizes = {}
+        self.offsets = {}
+        self.count = 0
+
+        # men never stand on the row they are crowned on
+        squares = self.num_squares
+        for material in self.materials:
+            (own_men, own_kings, enemy_men, enemy_kings) = material
+            factors = (comb(squares - self.width, own_men), comb(squares - self.width, enemy_men),
+                       comb(squares - own_men - enemy_men, own_kings),
+                       comb(squares - own_men - enemy_men - own_kings, enemy_kings))
+            self.factors[material] = factors
+            self.sizes[material] = factors[0] * factors[1] * factors[2] * factors[3]
+            self.offsets[material] = self.count
+            self.count += self.sizes[material]
+
+    def flip(self, mask):
+        '''PositionIndex.flip(mask) -> int
+        returns mask with the board turned around'''
+        return int(format(mask, f'0{self.num_squares}b')[::-1], 2)
+
+    def canonical(self, position):
+        '''PositionIndex.canonical(position) -> (int, int, int)
+        returns the masks of the player to move, the other player and the
+        kings of position, turned around if player 1 is to move'''
+        (first, second, kings, player) = position
+        if player == 1:
+            return (self.flip(second), self.flip(first), self.flip(kings))
+        return (first, second, kings)
+
+    def index(self, own, enemy, kings):
+        '''PositionIndex.index(own, enemy, kings) -> (tuple, int)
+        returns the material of the position where the player to move has
+        the pieces own, and its index among the positions of that material'''
+        own_men = own & ~kings
+        enemy_men = enemy & ~kings
+        own_kings = own & kings
+        enemy_kings = enemy & kings
+        material = (own_men.bit_count(), own_kings.bit_count(), enemy_men.bit_count(), enemy_kings.bit_count())
+        (_, enemy_factor, own_king_factor, enemy_king_factor) = self.factors[material]
+
+        men = own_men | enemy_men
+        value = rank(own_men, (1 << self.width) - 1)
+        value = value * enemy_factor + rank(enemy_men, 0)
+        value = value * own_king_factor + rank(own_kings, men)
+        value = value * enemy_king_factor + rank(enemy_kings, men | own_kings)
+        return (material, value)
+
+    def iter_positions(self, material):
+        '''PositionIndex.iter_positions(material) -> generator
+        yields (own, enemy, kings) for every position of material'''
+        (own_men, own_kings, enemy_men, enemy_kings) = material
+        squares = self.num_squares
+        for own_squares in combinations(range(self.width, squares), own_men):
+            own_mask = sum(1 << index for index in own_squares)
+            for enemy_squares in combinations(range(squares - self.width), enemy_men):
+                enemy_mask = sum(1 << index for index in enemy_squares)
+                if own_mask & enemy_mask:
+                    continue
+                free = [index for index in range(squares) if not ((own_mask | enemy_mask) >> index) & 1]
+                for king_squares in combinations(free, own_kings):
+                    king_mask = sum(1 << index for index in king_squares)
+                    rest = [index for index in free if not (king_mask >> index) & 1]
+                    for enemy_king_squares in combinations(rest, enemy_kings):
+                        enemy_king_mask = sum(1 << index for index in enemy_king_squares)
+                        yield (own_mask | king_mask, enemy_mask | enemy_king_mask, king_mask | enemy_king_mask)
+
+
+def solve_slices(group, index, tables, rows=8, columns=8):
+    '''solve_slices(group, index, tables[, rows=8, columns=8]) -> bytearray
+    returns the bytes of the positions of the materials of group, one after
+    another, where the moves that leave group lead to materials whose
+    bytes are in the dict tables
+    group is a material and the one with the colours swapped, which its
+    quiet moves lead to'''
+    starts = {}
+    size = 0
+    for material in group:
+        starts[material] = size
+        size += index.sizes[material]
+
+    # moves inside the group, and for every position the moves out of it
+    # that decide it: the nearest win, a draw, and the longest loss
+    parents = array('i')
+    children = array('i')
+    remaining = bytearray(size)
+    blocked = bytearray(size)
+    longest = bytearray(size)
+    buckets = [[] for _ in range(MAX_DISTANCE + 2)]
+    bitboard = Bitboard(rows, columns)
+    for material in group:
+        for (own, enemy, kings) in index.iter_positions(material):
+            (_, value) = index.index(own, enemy, kings)
+            i = starts[material] + value
+            bitboard.set_position((own, enemy, kings, 0), 0)
+            moves = bitboard.get_legal_moves()
+            if len(moves) == 0:
+                # a player who cannot move has lost
+                buckets[0].append(i)
+                continue
+
+            inside = set()
+            nearest = None
+            for move in moves:
+                bitboard.make_move(move)
+                child = bitboard.get_position()
+                bitboard.unmake_move()
+
+                # capturing the last piece wins at once
+                if child[1] == 0:
+                    nearest = 1
+                    break
+                (child_material, child_value) = index.index(*index.canonical(child))
+                if child_material in starts:
+                    inside.add(starts[child_material] + child_value)
+                    continue
+                found = tables[child_material][child_value]
+                if found == 0:
+                    blocked[i] = 1
+                elif found % 2 == 1:
+                    # the child is lost in found - 1 plies, this move wins in found
+                    nearest = found if nearest is None else min(nearest, found)
+                else:
+                    longest[i] = max(longest[i], found)
+
+            if nearest is not None:
+                blocked[i] = 1
+                buckets[nearest].append(i)
+            if len(inside) == 0:
+                if not blocked[i]:
+                    buckets[longest[i]].append(i)
+                continue
+            remaining[i] = len(inside)
+            for child in inside:
+                parents.append(i)
+                children.append(child)
+
+    # the positions each position is reached from, grouped by child
+    counts = array('i', [0]) * (size + 1)
+    for child in children:
+        counts[child+1] += 1
+    for i in range(size):
+        counts[i+1] += counts[i]
+    predecessors = array('i', [0]) * len(children)
+    fill = array('i', counts)
+    for (parent, child) in zip(parents, children):
+        predecessors[fill[child]] = parent
+        fill[child] += 1
+    del parents, children, fill
+
+    # decide the positions nearest the end first, a position is decided
+    # the first time it comes out of a bucket
+    table = bytearray(size)
+    for distance in range(MAX_DISTANCE + 2):
+        for i in buckets[distance]:
+            if table[i]:
+                continue
+            if distance > MAX_DISTANCE:
+                raise ValueError(f'an ending of {group[0]} lasts over {MAX_DISTANCE} plies')
+            table[i] = distance + 1
+            for k in range(counts[i], counts[i+1]):
+                parent = predecessors[k]
+                if table[parent]:
+                    continue
+                if distance % 2 == 0:
+                    # a move to a lost position wins
+                    found = distance + 1
+                elif blocked[parent]:
+                    continue
+                else:
+                    # every move goes to a won position, the last one found is the longest
+                    remaining[parent] -= 1
+                    if remaining[parent] > 0:
+                        continue
+                    found = max(distance + 1, longest[parent])
+                buckets[found].append(parent)
+        buckets[distance] = None
+
+    return table
+
+
+def build(path, max_pieces=4, out=None):
+    '''build(path[, max_pieces=4, out=None])
+    solves every 8x8 position with at most max_pieces pieces and writes the
+    tablebase to the file path
+    progress is printed to out if it is not None
+    raises ValueError if max_pieces is not from 2 to MAX_PIECES'''
+    if not 2 <= max_pieces <= MAX_PIECES:
+        raise ValueError(f'tablebases can be built for 2 to {MAX_PIECES} pieces, not {max_pieces}')
+
+    start = time.perf_counter()
+    index = PositionIndex(max_pieces)
+    tables = {}
+    for material in index.materials:
+        if material in tables:
+            continue
+        swapped = material[2:] + material[:2]
+        group = (material,) if swapped == material else (material, swapped)
+        table = solve_slices(group, index, tables)
+
+        position = 0
+        for member in group:
+            tables[member] = table[position:position + index.sizes[member]]
+            position += index.sizes[member]
+        if out is not None:
+            names = ' and '.join('%dm%dk v %dm%dk' % member for member in group)
+            decided = len(table) - table.count(0)
+            print(f'{names}: {len(table):,} positions, {decided:,} decided'
+                  f' in {time.perf_counter() - start:.1f} s', file=out, flush=True)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 8, 8, max_pieces, index.count))
+        for material in index.materials:
+            f.write(tables[material])
+
+
+class Tablebase:
+    '''represents an endgame tablebase file, read through mmap'''
+
+    def __init__(self, path):
+        '''Tablebase(path)
+        opens the tablebase written by build to path'''
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.rows, self.columns, self.max_pieces, self.count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a tablebase file')
+
+        # attributes
+        self.path = path
+        self.index = PositionIndex(self.max_pieces, self.rows, self.columns)
+        width = self.columns // 2
+        self.crown_masks = ((1 << width) - 1, ((1 << width) - 1) << (self.index.num_squares - width))
+        self.probes = 0
+        self.hits = 0
+
+    def close(self):
+        '''Tablebase.close()
+        closes the file'''
+        self.data.close()
+
+    def get_max_pieces(self):
+        '''Tablebase.get_max_pieces() -> int
+        returns the largest number of pieces the tablebase covers'''
+        return self.max_pieces
+
+    def covers(self, bitboard):
+        '''Tablebase.covers(bitboard) -> bool
+        returns whether the position of bitboard is in the tablebase
+        men on the row they are crowned on, which play never leaves, are not'''
+        return ((bitboard.rows, bitboard.columns) == (self.rows, self.columns) and
+                (bitboard.pieces[0] | bitboard.pieces[1]).bit_count() <= self.max_pieces and
+                bitboard.pieces[0] != 0 and bitboard.pieces[1] != 0 and
+                bitboard.pieces[0] & ~bitboard.kings & self.crown_masks[0] == 0 and
+                bitboard.pieces[1] & ~bitboard.kings & self.crown_masks[1] == 0)
+
+    def probe(self, bitboard):
+        '''Tablebase.probe(bitboard) -> (int, int) or None
+        returns the result for the player to move, LOSS, DRAW or WIN,
+        and the plies to the end of the game with best play
+        returns None if the position is not covered'''
+        if not self.covers(bitboard):
+            return None
+
+        self.probes += 1
+        (material, value) = self.index.index(*self.index.canonical(bitboard.get_position()))
+        found = self.data[HEADER.size + self.index.offsets[material] + value]
+        if found == 0:
+            return (DRAW, 0)
+
+        self.hits += 1
+        distance = found - 1
+        return (WIN if distance % 2 == 1 else LOSS, distance)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers endgame tablebases')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='solve the endgames and write a tablebase')
+    build_parser.add_argument('path')
+    build_parser.add_argument('--pieces', type=int, default=4, choices=range(2, MAX_PIECES+1))
+    probe_parser = commands.add_parser('probe', help='look up positions')
+    probe_parser.add_argument('path')
+    probe_parser.add_argument('positions', nargs='+', help='positions as p0,p1,kings,player masks')
+    options = parser.parse_args(args)
+
+    if options.command == 'build':
+        build(options.path, options.pieces, out=sys.stdout)
+        return 0
+
+    tablebase = Tablebase(options.path)
+    bitboard = Bitboard()
+    for text in options.positions:
+        bitboard.set_position(tuple(int(value, 0) for value in text.split(',')))
+        print(text, tablebase.probe(bitboard))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
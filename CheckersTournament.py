@@ -0,0 +1,280 @@
+'''headless self-play tournaments between two Checkers players
+games are played on CheckersBoard across a multiprocessing pool and the
+results are printed as each game finishes
+
+    python CheckersTournament.py --games 200 -a search:depth=6 -b random'''
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from CheckersEngine import CheckersBoard
+from CheckersMCTS import MCTSEngine
+from CheckersSearch import SearchEngine
+from CheckersTransposition import TranspositionTable
+
+# games longer than this many plies are drawn, the rules have no other draw
+MAX_PLIES = 200
+
+# players already built in this process, by side, spec and time limit
+_players = {}
+
+
+class RandomPlayer:
+    '''plays a random legal move'''
+
+    def __init__(self, seed=None):
+        '''RandomPlayer([seed=None])
+        creates a player drawing moves from a random generator seeded with seed'''
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.nodes = 0
+
+    def new_game(self):
+        '''RandomPlayer.new_game()
+        starts the random generator over from the seed'''
+        self.rng.seed(self.seed)
+
+    def choose_move(self, board):
+        '''RandomPlayer.choose_move(board) -> CheckersMove
+        returns a random legal move of board'''
+        return self.rng.choice(board.get_legal_moves())
+
+    def get_nodes(self):
+        '''RandomPlayer.get_nodes() -> int
+        returns the nodes searched for the last move'''
+        return self.nodes
+
+
+class SearchPlayer:
+    '''plays the move found by a SearchEngine'''
+
+    def __init__(self, depth=64, time_limit=0.1, memory=16*1024*1024):
+        '''SearchPlayer([depth=64, time_limit=0.1, memory=16*1024*1024])
+        creates a player searching depth plies or time_limit seconds
+        with a transposition table of memory bytes'''
+        self.engine = SearchEngine(depth, time_limit, TranspositionTable(memory))
+
+    def new_game(self):
+        '''SearchPlayer.new_game()
+        forgets the transposition table and move history of earlier games'''
+        self.engine.table.clear()
+        self.engine.history = {}
+
+    def choose_move(self, board):
+        '''SearchPlayer.choose_move(board) -> CheckersMove
+        returns the move the engine finds for board'''
+        return self.engine.search(board)
+
+    def get_nodes(self):
+        '''SearchPlayer.get_nodes() -> int
+        returns the nodes searched for the last move'''
+        return self.engine.get_stats()['nodes']
+
+
+class MCTSPlayer:
+    '''plays the move found by Monte Carlo tree search'''
+
+    def __init__(self, time_limit=0.1, max_nodes=200000, heuristic=True, seed=None):
+        '''MCTSPlayer([time_limit=0.1, max_nodes=200000, heuristic=True, seed=None])
+        creates a player searching time_limit seconds with a tree of at most
+        max_nodes nodes, with guided playouts if heuristic'''
+        self.seed = seed
+        self.engine = MCTSEngine(time_limit, max_nodes=max_nodes, heuristic=heuristic, seed=seed)
+
+    def new_game(self):
+        '''MCTSPlayer.new_game()
+        drops the tree of earlier games and starts the random generator over'''
+        self.engine.root = None
+        self.engine.rng.seed(self.seed)
+
+    def choose_move(self, board):
+        '''MCTSPlayer.choose_move(board) -> CheckersMove
+        returns the move the engine finds for board'''
+        return self.engine.search(board)
+
+    def get_nodes(self):
+        '''MCTSPlayer.get_nodes() -> int
+        returns the playouts of the last move'''
+        return self.engine.get_stats()['playouts']
+
+
+def parse_spec(spec):
+    '''parse_spec(spec) -> (str, dict)
+    returns the kind and options of a player spec, like search:depth=6,time=0.5'''
+    (kind, _, text) = spec.partition(':')
+    options = {}
+    for item in filter(None, text.split(',')):
+        (key, _, value) = item.partition('=')
+        options[key] = float(value) if '.' in value else int(value)
+
+    return (kind, options)
+
+
+def make_player(spec, time_limit):
+    '''make_player(spec, time_limit) -> player
+    returns a new player described by spec, searching time_limit seconds per move'''
+    (kind, options) = parse_spec(spec)
+    if kind == 'random':
+        return RandomPlayer(options.get('seed'))
+    elif kind == 'search':
+        return SearchPlayer(options.get('depth', 64), options.get('time', time_limit),
+                            options.get('memory', 16*1024*1024))
+    elif kind == 'mcts':
+        return MCTSPlayer(options.get('time', time_limit), options.get('nodes', 200000),
+                          bool(options.get('heuristic', 1)), options.get('seed'))
+
+    raise ValueError(f'unknown player {spec!r}')
+
+
+def get_player(spec, time_limit, side=0):
+    '''get_player(spec, time_limit[, side=0]) -> player
+    returns the player of spec for side 0 or 1 built in this process,
+    building it the first time, so the two sides of a game never share one'''
+    key = (side, spec, time_limit)
+    if key not in _players:
+        _players[key] = make_player(spec, time_limit)
+
+    return _players[key]
+
+
+def play_game(task):
+    '''play_game(task) -> dict
+    plays one game described by the tuple
+        (game, spec_a, spec_b, a_first, opening_plies, seed, time_limit, max_plies)
+    and returns its result'''
+    (game, spec_a, spec_b, a_first, opening_plies, seed, time_limit, max_plies) = task
+    players = [get_player(spec_a, time_limit, 0), get_player(spec_b, time_limit, 1)]
+    if not a_first:
+        players.reverse()
+
+    # the players start every game from a clean state, so a result does not
+    # depend on which games the worker played before
+    for player in players:
+        player.new_game()
+
+    board = CheckersBoard()
+    start = time.perf_counter()
+    nodes = 0
+
+    # random opening, the same for both games of a pair
+    rng = random.Random(seed)
+    plies = 0
+    while plies < opening_plies and len(board.get_legal_moves()) > 0:
+        board.make_move(rng.choice(board.get_legal_moves()))
+        plies += 1
+
+    board.check_endgame()
+    while board.get_endgame() is None and plies < max_plies:
+        player = players[board.get_player()]
+        board.make_move(player.choose_move(board))
+        nodes += player.get_nodes()
+        plies += 1
+        board.check_endgame()
+
+    # winner from player a's point of view
+    winner = board.get_endgame()
+    if winner is None:
+        result = 0.5
+    elif (winner == 0) == a_first:
+        result = 1.0
+    else:
+        result = 0.0
+
+    seconds = time.perf_counter() - start
+    return {'game': game, 'a_first': a_first, 'result': result, 'plies': plies, 'nodes': nodes,
+            'seconds': seconds}
+
+
+def make_tasks(games, spec_a, spec_b, opening_plies, time_limit, max_plies, seed=0):
+    '''make_tasks(games, spec_a, spec_b, opening_plies, time_limit, max_plies[, seed=0]) -> list
+    returns the tasks of a tournament of games games
+    consecutive games share an opening and swap sides'''
+    tasks = []
+    for game in range(games):
+        opening_seed = seed * 1000003 + game // 2
+        tasks.append((game, spec_a, spec_b, game % 2 == 0, opening_plies, opening_seed, time_limit, max_plies))
+
+    return tasks
+
+
+def elo_estimate(wins, losses, draws):
+    '''elo_estimate(wins, losses, draws) -> (float, float)
+    returns the Elo difference of player a over player b and its 95% margin'''
+    games = wins + losses + draws
+    if games == 0:
+        return (0.0, 0.0)
+
+    score = (wins + draws/2) / games
+    variance = (wins * (1-score)**2 + losses * score**2 + draws * (0.5-score)**2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(s):
+        # keep a clean sweep finite
+        s = min(max(s, 1 / (2*games)), 1 - 1 / (2*games))
+        return -400 * math.log10(1/s - 1) + 0.0
+
+    return (elo(score), (elo(score + margin) - elo(score - margin)) / 2)
+
+
+def run_tournament(tasks, workers=None, out=sys.stdout):
+    '''run_tournament(tasks[, workers=None, out=sys.stdout]) -> dict
+    plays tasks on a pool of workers processes, one per core if None,
+    printing each result as it arrives
+    returns the totals'''
+    totals = {'games': 0, 'wins': 0, 'losses': 0, 'draws': 0, 'plies': 0, 'nodes': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            if result['result'] == 1.0:
+                totals['wins'] += 1
+            elif result['result'] == 0.0:
+                totals['losses'] += 1
+            else:
+                totals['draws'] += 1
+            totals['plies'] += result['plies']
+            totals['nodes'] += result['nodes']
+            totals['seconds'] += result['seconds']
+            totals['games'] += 1
+
+            (elo, margin) = elo_estimate(totals['wins'], totals['losses'], totals['draws'])
+            nps = result['nodes'] / result['seconds'] if result['seconds'] > 0 else 0.0
+            print(f"game {result['game']:5} {'ab'[not result['a_first']]} first  score {result['result']:.1f}"
+                  f"  {result['plies']:3} plies {nps:9,.0f} nodes/sec  |  +{totals['wins']} -{totals['losses']}"
+                  f" ={totals['draws']}  elo {elo:+.0f} +/- {margin:.0f}", file=out, flush=True)
+
+    totals['wall_seconds'] = time.perf_counter() - start
+    return totals
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checkers self-play tournament')
+    parser.add_argument('-a', default='search:depth=4',
+                        help="player a, e.g. 'search:depth=6', 'mcts:nodes=100000' or 'random'")
+    parser.add_argument('-b', default='random', help='player b')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='processes, one per core by default')
+    parser.add_argument('--time', type=float, default=0.1, help='seconds per move')
+    parser.add_argument('--opening', type=int, default=4, help='random plies at the start of each game pair')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(args)
+
+    tasks = make_tasks(options.games, options.a, options.b, options.opening, options.time,
+                       options.max_plies, options.seed)
+    totals = run_tournament(tasks, options.workers)
+
+    (elo, margin) = elo_estimate(totals['wins'], totals['losses'], totals['draws'])
+    print(f"{totals['games']} games in {totals['wall_seconds']:.1f} s"
+          f" ({totals['games'] / totals['wall_seconds']:.2f} games/sec)")
+    print(f"a: +{totals['wins']} -{totals['losses']} ={totals['draws']}  elo {elo:+.0f} +/- {margin:.0f}")
+    print(f"average length {totals['plies'] / totals['games']:.1f} plies,"
+          f" {totals['nodes'] / totals['seconds']:,.0f} nodes/sec per game")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
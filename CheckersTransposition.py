@@ -0,0 +1,120 @@
+'''transposition table for the Checkers search
+stores search results by zobrist hash in a fixed amount of memory'''
+from array import array
+
+# kinds of stored scores
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# bytes used by one entry: the 64-bit key and the 64-bit packed data
+ENTRY_SIZE = 16
+
+# every score stored fits in SCORE_BITS bits once SCORE_OFFSET is added
+SCORE_BITS = 20
+SCORE_OFFSET = 1 << (SCORE_BITS-1)
+
+
+class TranspositionTable:
+    '''represents a fixed-size table of search results
+    each bucket has a depth-preferred slot, kept while deeper results
+    arrive, and an always-replace slot that takes everything else'''
+
+    def __init__(self, memory=32*1024*1024):
+        '''TranspositionTable([memory=32*1024*1024])
+        creates an empty table using at most memory bytes'''
+        # the number of buckets is a power of two so the index is a mask
+        buckets = 1
+        while 2 * buckets * 2 * ENTRY_SIZE <= memory:
+            buckets *= 2
+
+        # attributes
+        self.num_buckets = buckets
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * 2 * buckets))
+        self.data = array('Q', bytes(8 * 2 * buckets))
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def get_memory(self):
+        '''TranspositionTable.get_memory() -> int
+        returns the bytes used by the entries'''
+        return 2 * self.num_buckets * ENTRY_SIZE
+
+    def clear(self):
+        '''TranspositionTable.clear()
+        removes every entry and resets the counters'''
+        self.keys = array('Q', bytes(8 * 2 * self.num_buckets))
+        self.data = array('Q', bytes(8 * 2 * self.num_buckets))
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def get_stats(self):
+        '''TranspositionTable.get_stats() -> dict
+        returns the hits, misses, collisions and stores so far
+        a collision is a miss on a bucket holding other positions'''
+        probes = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'collisions': self.collisions, 'stores': self.stores,
+                'hit_rate': self.hits / probes if probes > 0 else 0.0}
+
+    def probe(self, key):
+        '''TranspositionTable.probe(key) -> (int, int, int, tuple) or None
+        returns the depth, score, kind of score and move stored for key
+        the move is the first two squares of the best move, or None
+        returns None if key is not in the table'''
+        # key 0 marks an empty slot
+        key = key or 1
+        slot = 2 * (key & self.mask)
+        for i in (slot, slot+1):
+            if self.keys[i] == key:
+                self.hits += 1
+                return unpack(self.data[i])
+
+        self.misses += 1
+        if self.keys[slot] or self.keys[slot+1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, kind, move=None):
+        '''TranspositionTable.store(key, depth, score, kind[, move=None])
+        stores a search result of depth for key'''
+        key = key or 1
+        slot = 2 * (key & self.mask)
+        data = pack(depth, score, kind, move)
+        self.stores += 1
+
+        # the depth-preferred slot keeps the deepest result
+        if self.keys[slot] == key or depth >= (self.data[slot] >> 2) & 0xff:
+            self.keys[slot] = key
+            self.data[slot] = data
+        else:
+            self.keys[slot+1] = key
+            self.data[slot+1] = data
+
+
+def pack(depth, score, kind, move):
+    '''pack(depth, score, kind, move) -> int
+    returns the entry data packed in 64 bits'''
+    if move is None:
+        squares = 0
+    else:
+        squares = ((move[0]+1) << 8) | (move[1]+1)
+    return (((squares << SCORE_BITS) | (score + SCORE_OFFSET)) << 10) | (min(depth, 0xff) << 2) | kind
+
+
+def unpack(data):
+    '''unpack(data) -> (int, int, int, tuple)
+    returns the depth, score, kind and move packed in data'''
+    kind = data & 3
+    depth = (data >> 2) & 0xff
+    score = ((data >> 10) & ((1 << SCORE_BITS) - 1)) - SCORE_OFFSET
+    squares = data >> (10+SCORE_BITS)
+    if squares == 0:
+        move = None
+    else:
+        move = ((squares >> 8) - 1, (squares & 0xff) - 1)
+    return (depth, score, kind, move)
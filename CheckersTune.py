@@ -0,0 +1,240 @@
+'''tuning of the evaluation weights of CheckersSearch with NumPy
+
+the quiet positions of game records, the ones where no jump is forced,
+are labelled with the result of their game for the player to move. their
+features, the terms of the evaluation, are counted with NumPy a chunk of
+positions at a time and appended to a file read back through a memory
+map, so memory stays bounded however many games are read
+
+the weights are fitted by logistic regression of the results on the
+features, Texel's method, with Newton steps that each take one pass over
+the chunks, then scaled so a man is worth MAN_VALUE
+
+    python CheckersTune.py games.ckga more.pdn --out weights.json
+    CHECKERS_WEIGHTS=weights.json python CheckersTournament.py -a search -b random'''
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from CheckersBatch import BatchMoveGenerator
+from CheckersBitboard import Bitboard, KING_DIRECTIONS, MAN_DIRECTIONS, OPPOSITE
+import CheckersPDN
+from CheckersSearch import FEATURES, MAN_VALUE, get_evaluation_masks
+
+# plies of each game left out, the openings are all alike
+SKIP_PLIES = 8
+
+# positions in memory at once while counting features and fitting
+CHUNK_SIZE = 1 << 16
+
+# result of a game for player 0, player 1 then being 1 - it
+TARGETS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+
+def extract_positions(records, skip_plies=SKIP_PLIES, rows=8, columns=8):
+    '''extract_positions(records[, skip_plies=SKIP_PLIES, rows=8, columns=8]) -> generator
+    yields (position, target) for the quiet positions of the replayed
+    GameRecords records after skip_plies plies, where target is the result
+    of the game for the player to move, 1 for a win, 0.5 for a draw and 0
+    games without a result or of another board size are skipped'''
+    for record in records:
+        target = TARGETS.get(record.get_result())
+        if target is None or (record.rows, record.columns) != (rows, columns):
+            continue
+
+        bitboard = Bitboard(rows, columns)
+        bitboard.set_position(record.get_start())
+        for (ply, move) in enumerate(record.get_moves()):
+            player = bitboard.player
+            if ply >= skip_plies and bitboard.get_jumpers(player) == 0:
+                yield (bitboard.get_position(), target if player == 0 else 1.0 - target)
+            bitboard.play_move(move)
+
+
+def count_bits(masks):
+    '''count_bits(masks) -> numpy.ndarray
+    returns the number of bits set in each of the uint64 masks, as signed integers'''
+    return np.bitwise_count(masks).astype(np.int64)
+
+
+def compute_features(positions, generator):
+    '''compute_features(positions, generator) -> numpy.ndarray
+    returns the (N, len(FEATURES)) features of an (N, 4) array of positions
+    for the player to move, the terms evaluate weighs
+    generator is the BatchMoveGenerator of the board size'''
+    positions = np.asarray(positions, dtype=np.uint64)
+    player = positions[:, 3]
+    first = player == 0
+    own = np.where(first, positions[:, 0], positions[:, 1])
+    enemy = np.where(first, positions[:, 1], positions[:, 0])
+    kings = positions[:, 2]
+    (back_ranks, center) = get_evaluation_masks(generator.rows, generator.columns)
+    own_back = np.where(first, np.uint64(back_ranks[0]), np.uint64(back_ranks[1]))
+    enemy_back = np.where(first, np.uint64(back_ranks[1]), np.uint64(back_ranks[0]))
+    center = np.uint64(center)
+
+    features = np.empty((len(positions), len(FEATURES)))
+    features[:, 0] = count_bits(own & ~kings) - count_bits(enemy & ~kings)
+    features[:, 1] = count_bits(own & kings) - count_bits(enemy & kings)
+    features[:, 2] = count_bits(own & ~kings & own_back) - count_bits(enemy & ~kings & enemy_back)
+    features[:, 3] = count_bits(own & center) - count_bits(enemy & center)
+
+    # simple moves, like Bitboard.count_steps
+    empty = ~(positions[:, 0] | positions[:, 1]) & generator.full
+    mobility = np.zeros(len(positions), dtype=np.int64)
+    for direction in KING_DIRECTIONS:
+        forward = 0 if direction in MAN_DIRECTIONS[0] else 1
+        reached = generator.step(empty, OPPOSITE[direction])
+        mobility += count_bits(reached & np.where(player == forward, own, own & kings))
+        mobility -= count_bits(reached & np.where(player == forward, enemy & kings, enemy))
+    features[:, 4] = mobility
+
+    return features
+
+
+def write_features(records, path, skip_plies=SKIP_PLIES, rows=8, columns=8, chunk_size=CHUNK_SIZE, out=None):
+    '''write_features(records, path[, skip_plies=SKIP_PLIES, rows=8, columns=8, chunk_size=CHUNK_SIZE,
+                      out=None]) -> int
+    writes the features and the target of every position extract_positions
+    finds in records to the file path, as rows of float32, chunk_size
+    positions at a time, and returns the number of positions
+    progress is printed to out if it is not None'''
+    generator = BatchMoveGenerator(rows, columns)
+    start = time.perf_counter()
+    count = 0
+    positions = []
+    targets = []
+
+    def flush():
+        chunk = np.empty((len(positions), len(FEATURES) + 1), dtype=np.float32)
+        chunk[:, :-1] = compute_features(positions, generator)
+        chunk[:, -1] = targets
+        chunk.tofile(f)
+        positions.clear()
+        targets.clear()
+
+    with open(path, 'wb') as f:
+        for (position, target) in extract_positions(records, skip_plies, rows, columns):
+            positions.append(position)
+            targets.append(target)
+            if len(positions) == chunk_size:
+                count += chunk_size
+                flush()
+                if out is not None:
+                    seconds = time.perf_counter() - start
+                    print(f'{count:,} positions, {count / seconds:,.0f} positions/sec', file=out, flush=True)
+        if positions:
+            count += len(positions)
+            flush()
+
+    return count
+
+
+def load_features(path):
+    '''load_features(path) -> numpy.memmap
+    returns the features written by write_features to path as an
+    (N, len(FEATURES) + 1) array, the target last, mapped from the file'''
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, len(FEATURES) + 1), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode='r').reshape(-1, len(FEATURES) + 1)
+
+
+def fit(data, iterations=20, chunk_size=CHUNK_SIZE, regularization=1e-6, out=None):
+    '''fit(data[, iterations=20, chunk_size=CHUNK_SIZE, regularization=1e-6, out=None]) -> (numpy.ndarray, float)
+    returns the weights of the logistic regression of the targets of data,
+    an array returned by load_features, on the features, in logits per
+    unit of each feature, and the mean log loss of the fit
+    each Newton step reads data once, chunk_size rows at a time
+    progress is printed to out if it is not None'''
+    if len(data) == 0:
+        raise ValueError('no positions to fit')
+
+    size = len(FEATURES)
+    weights = np.zeros(size)
+    penalty = regularization * len(data)
+    for iteration in range(iterations):
+        gradient = penalty * weights
+        hessian = penalty * np.eye(size)
+        loss = 0.0
+        for start in range(0, len(data), chunk_size):
+            chunk = np.asarray(data[start:start+chunk_size], dtype=np.float64)
+            (features, targets) = (chunk[:, :-1], chunk[:, -1])
+            logits = features @ weights
+            predicted = 0.5 * (1.0 + np.tanh(0.5 * logits))
+            gradient += features.T @ (predicted - targets)
+            hessian += (features * (predicted * (1.0 - predicted))[:, None]).T @ features
+            loss += float(np.sum(np.logaddexp(0.0, logits) - targets * logits))
+
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if out is not None:
+            print(f'iteration {iteration+1:2}  log loss {loss / len(data):.6f}', file=out, flush=True)
+        if np.abs(step).max() < 1e-9:
+            break
+
+    return (weights, loss / len(data))
+
+
+def save_weights(path, weights, positions=0, loss=0.0):
+    '''save_weights(path, weights[, positions=0, loss=0.0])
+    writes the weights returned by fit to path for load_weights, scaled to
+    evaluation units where a man is worth MAN_VALUE'''
+    if weights[0] <= 0:
+        raise ValueError('the men do not predict the results, there are too few positions')
+
+    scale = weights[0] / MAN_VALUE
+    values = {name: int(round(weight / scale)) for (name, weight) in zip(FEATURES, weights)}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'weights': values, 'logits_per_unit': scale, 'positions': positions, 'log_loss': loss}, f,
+                  indent=2)
+        f.write('\n')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='tune the evaluation weights of the Checkers search')
+    parser.add_argument('sources', nargs='+', help='.pdn or .ckga files of games')
+    parser.add_argument('--out', default='weights.json', help='the weights file written')
+    parser.add_argument('--features', default=None, help='keep the features in this file, reused if it exists')
+    parser.add_argument('--skip', type=int, default=SKIP_PLIES, help='opening plies left out of each game')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='positions in memory at once')
+    parser.add_argument('--iterations', type=int, default=20)
+    options = parser.parse_args(args)
+    errors = []
+
+    def load(path):
+        if path.endswith('.ckga'):
+            yield from CheckersPDN.Archive(path).iter_records()
+        else:
+            with open(path, encoding='utf-8') as lines:
+                yield from CheckersPDN.read_pdn(lines, errors=errors)
+
+    path = options.features
+    if path is None:
+        (handle, path) = tempfile.mkstemp(suffix='.ckft')
+        os.close(handle)
+    try:
+        if options.features is None or not os.path.exists(options.features):
+            records = (record for source in options.sources for record in load(source))
+            write_features(records, path, options.skip, chunk_size=options.chunk, out=sys.stdout)
+            CheckersPDN.report_errors(errors)
+
+        data = load_features(path)
+        (weights, loss) = fit(data, options.iterations, options.chunk, out=sys.stdout)
+        save_weights(options.out, weights, len(data), loss)
+        del data
+    finally:
+        if options.features is None:
+            os.remove(path)
+
+    with open(options.out, encoding='utf-8') as f:
+        print(f'{options.out}: {json.load(f)["weights"]}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
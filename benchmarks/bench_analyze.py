@@ -0,0 +1,36 @@
+'''benchmarks batch analysis throughput against the number of worker processes
+
+run from the repository root:
+    python -m benchmarks.bench_analyze [positions] [depth] [max workers]'''
+import io
+import sys
+
+from CheckersAnalyze import analyze
+import CheckersPDN
+from benchmarks.bench_bitboard import random_positions
+from benchmarks.timing import scale_workers
+
+
+def main(count=2000, depth=4, max_workers=None):
+    lines = [CheckersPDN.make_fen(position) + '\n' for position in random_positions(count)]
+    for mode in ('moves', 'endgame'):
+        totals = analyze(lines, io.StringIO(), mode, workers=0)
+        print(f'{mode:8} in process {totals["positions"] / totals["seconds"]:10,.0f} positions/sec')
+
+    # the results are the same whatever the number of workers
+    expected = io.StringIO()
+    totals = analyze(lines, expected, 'search', depth, workers=0)
+    print(f'search depth {depth}, in process {totals["positions"] / totals["seconds"]:8,.0f} positions/sec')
+
+    def measure(workers):
+        out = io.StringIO()
+        totals = analyze(lines, out, 'search', depth, workers=workers)
+        if out.getvalue() != expected.getvalue():
+            raise AssertionError(f'{workers} workers give other results than one process')
+        return totals['positions'] / totals['seconds']
+
+    scale_workers(measure, max_workers, 'positions')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,46 @@
+'''benchmarks batched NumPy move generation against a Python loop over
+Bitboard.get_playable_moves, at batches of 1, 1k and 100k positions
+
+run from the repository root:
+    python -m benchmarks.bench_batch [sizes...]'''
+import sys
+
+from benchmarks.bench_bitboard import random_positions
+from benchmarks.timing import best_time
+from CheckersBatch import BatchMoveGenerator, encode_positions
+from CheckersBitboard import Bitboard
+
+
+def main(*sizes):
+    sizes = sizes or (1, 1000, 100000)
+    sample = random_positions(10000)
+    generator = BatchMoveGenerator()
+    bitboard = Bitboard()
+
+    def loop(positions):
+        for position in positions:
+            bitboard.set_position(position)
+            bitboard.get_playable_moves()
+
+    for size in sizes:
+        positions = (sample * (size // len(sample) + 1))[:size]
+        encoded = encode_positions(positions)
+
+        # the batch must agree with the bitboard before its speed means anything
+        (moves, jumps, has_jump) = generator.generate(encoded)
+        for row in range(min(size, 1000)):
+            bitboard.set_position(positions[row])
+            expected = {k: sorted(v) for (k, v) in bitboard.get_playable_moves().items()}
+            found = {k: sorted(v) for (k, v) in generator.get_playable_moves(moves, jumps, has_jump, row).items()}
+            if expected != found:
+                raise AssertionError(f'batch and bitboard disagree on {positions[row]}')
+
+        repeats = 1 if size >= 100000 else 5
+        loop_seconds = best_time(lambda: loop(positions), repeats)
+        batch_seconds = best_time(lambda: generator.generate(encoded), repeats)
+        print(f'N={size:<7} loop {size / loop_seconds:12,.0f} positions/sec'
+              f'   batch {size / batch_seconds:14,.0f} positions/sec   {loop_seconds / batch_seconds:7.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,147 @@
+'''benchmarks legal move generation of the bitboard engine against the
+original list-based board
+
+run from the repository root:
+    python -m benchmarks.bench_bitboard [positions] [repeats]'''
+import random
+import sys
+import time
+
+from CheckersBitboard import Bitboard
+from CheckersEngine import CheckersBoard
+import CheckersReference
+from benchmarks.timing import best_time
+
+
+def random_positions(count, seed=0, rows=8, columns=8):
+    '''random_positions(count[, seed=0, rows=8, columns=8]) -> list
+    returns count positions of rows * columns reached by random play from the start'''
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Bitboard(rows, columns)
+        while len(positions) < count:
+            playable = board.get_playable_moves()
+            if len(playable) == 0:
+                break
+            positions.append(board.get_position())
+
+            # play a random move, continuing jumps like the game does
+            start = rng.choice(list(playable))
+            end = rng.choice(playable[start])
+            while True:
+                was_king = bool(board.kings & (1 << start))
+                board.move_piece(start, end)
+                (row_old, col_old) = board.square_position(start)
+                (row_new, col_new) = board.square_position(end)
+                if (board.player == 0 and row_new == 0) or (board.player == 1 and row_new == board.rows-1):
+                    board.make_king(end)
+                if abs(row_old-row_new) != 2:
+                    break
+                board.remove_piece(board.square_index(((row_old+row_new) // 2, (col_old+col_new) // 2)))
+                jumps = board.get_jumps(end)
+                if len(jumps) == 0 or (not was_king and board.kings & (1 << end)):
+                    break
+                (start, end) = (end, rng.choice(jumps))
+            board.next_player()
+
+    return positions
+
+
+def time_positions(function, items, repeats):
+    '''time_positions(function, items, repeats) -> float
+    returns the positions per second of calling function on every item'''
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for item in items:
+            function(item)
+    return repeats * len(items) / (time.perf_counter() - start)
+
+
+class UncachedBoard(CheckersBoard):
+    '''a CheckersBoard that finds its moves again at every lookup'''
+
+    def get_cached(self, name, find):
+        return find()
+
+
+def random_game_paths(count, seed=0):
+    '''random_game_paths(count[, seed=0]) -> list
+    returns count random games as lists of Bitboard move paths'''
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        bitboard = Bitboard()
+        paths = []
+        moves = bitboard.get_legal_moves()
+        while moves and len(paths) < 200:
+            paths.append(rng.choice(moves))
+            bitboard.play_move(paths[-1])
+            moves = bitboard.get_legal_moves()
+        games.append(paths)
+
+    return games
+
+
+def replay(board_class, games):
+    '''replay(board_class, games)
+    replays games on a board_class the way a game is played: the playable
+    pieces of each position are shown, the end of the game checked, then
+    the move found and made'''
+    for paths in games:
+        board = board_class()
+        for path in paths:
+            board.get_playable_pieces()
+            board.check_endgame()
+            board.make_move(board.find_move(path))
+
+
+def time_replay(board_class, games, repeats):
+    '''time_replay(board_class, games, repeats) -> float
+    returns the positions per second of the fastest of repeats replays of
+    games on a board_class, after one replay to warm up'''
+    replay(board_class, games)
+    count = sum(len(paths) for paths in games)
+    return count / best_time(lambda: replay(board_class, games), repeats)
+
+
+def main(count=2000, repeats=3):
+    positions = random_positions(count)
+    references = [CheckersReference.make_board(p) for p in positions]
+    bitboards = []
+    boards = []
+    for p in positions:
+        bitboards.append(Bitboard())
+        bitboards[-1].set_position(p)
+        boards.append(CheckersBoard())
+        boards[-1].set_position(p)
+
+    # both engines must agree before their speed means anything
+    for (reference, bitboard, board) in zip(references, bitboards, boards):
+        expected = {p.get_position(): sorted(v) for (p, v) in reference.get_playable_pieces().items()}
+        found = {bitboard.square_position(i): sorted(bitboard.square_position(t) for t in v)
+                 for (i, v) in bitboard.get_playable_moves().items()}
+        facade = {p.get_position(): sorted(v) for (p, v) in board.get_playable_pieces().items()}
+        if not (expected == found == facade):
+            raise AssertionError(f'move generators disagree on {bitboard.get_position()}')
+
+    reference_rate = time_positions(lambda b: b.get_playable_pieces(), references, repeats)
+    board_rate = time_positions(lambda b: b.find_playable_pieces(), boards, repeats)
+    bitboard_rate = time_positions(lambda b: b.get_playable_moves(), bitboards, repeats)
+    print(f'{len(positions)} positions x {repeats} repeats')
+    print(f'list board     {reference_rate:12,.0f} positions/sec')
+    print(f'CheckersBoard  {board_rate:12,.0f} positions/sec')
+    print(f'bitboard       {bitboard_rate:12,.0f} positions/sec')
+    print(f'speedup        {bitboard_rate / reference_rate:12.1f}x')
+
+    # each position is generated once, then looked up again by the end of
+    # game check and find_move
+    games = random_game_paths(max(1, count // 50))
+    uncached_rate = time_replay(UncachedBoard, games, repeats)
+    cached_rate = time_replay(CheckersBoard, games, repeats)
+    print(f'game replay    {uncached_rate:12,.0f} positions/sec')
+    print(f'  cached       {cached_rate:12,.0f} positions/sec  ({cached_rate / uncached_rate:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+'''benchmarks opening book lookups against searching the opening moves
+
+a book is built from random games, then the time to open it and to look
+up positions of its first plies is compared with searching them
+
+run from the repository root:
+    python -m benchmarks.bench_book [games] [search seconds]'''
+import os
+import random
+import sys
+import tempfile
+import time
+
+from CheckersBitboard import Bitboard
+import CheckersBook
+from CheckersSearch import SearchEngine
+from benchmarks.bench_pdn import random_games
+
+
+def main(games=20000, seconds=0.5):
+    records = [record for record in random_games(games) if record.get_result() != '*']
+    start = time.perf_counter()
+    counts = CheckersBook.count_games(records)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.ckob')
+    count = CheckersBook.write_book(path, counts)
+    print(f'{len(records):,} games -> {len(counts):,} positions, {count:,} records,'
+          f' {os.path.getsize(path):,} bytes in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    book = CheckersBook.Book(path)
+    print(f'open {1e6 * (time.perf_counter() - start):10.1f} us')
+
+    # positions of the book: the first plies of some of the games
+    rng = random.Random(1)
+    positions = []
+    for record in rng.sample(records, min(1000, len(records))):
+        bitboard = Bitboard()
+        for move in record.get_moves()[:rng.randrange(CheckersBook.BOOK_PLIES)]:
+            bitboard.play_move(move)
+        positions.append(bitboard)
+
+    start = time.perf_counter()
+    found = sum(book.choose(bitboard) is not None for bitboard in positions)
+    lookup = (time.perf_counter() - start) / len(positions)
+    print(f'lookup {1e6 * lookup:8.1f} us  ({found} of {len(positions)} found)')
+
+    engine = SearchEngine(time_limit=seconds)
+    start = time.perf_counter()
+    for bitboard in positions[:4]:
+        engine.search_bitboard(bitboard.copy())
+    search = (time.perf_counter() - start) / 4
+    print(f'search {1e6 * search:8.0f} us  ({search / lookup:,.0f}x the lookup)')
+    book.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, *[float(arg) for arg in sys.argv[2:]])
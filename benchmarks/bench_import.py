@@ -0,0 +1,45 @@
+'''benchmarks the time a fresh interpreter takes to import Checkers,
+with and without loading the tkinter interface
+
+run from the repository root:
+    python -m benchmarks.bench_import [repeats]'''
+import statistics
+import subprocess
+import sys
+
+# statements timed in a new interpreter each run
+cases = (
+    ('interpreter only', 'pass'),
+    ('import Checkers', 'import Checkers'),
+    ('import Checkers + GUI', 'import Checkers; Checkers.CheckersGame'),
+)
+
+timer = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start, 'tkinter' in sys.modules)
+'''
+
+
+def time_import(statement, repeats):
+    '''time_import(statement, repeats) -> (float, bool)
+    returns the median seconds statement takes in a new interpreter
+    and whether it loaded tkinter'''
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', timer.format(statement=statement)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+
+    return (statistics.median(times), output[1] == 'True')
+
+
+def main(repeats=20):
+    for (name, statement) in cases:
+        (seconds, loaded_tk) = time_import(statement, repeats)
+        print(f'{name:24} {seconds*1000:8.2f} ms   tkinter loaded: {loaded_tk}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
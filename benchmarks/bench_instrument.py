@@ -0,0 +1,30 @@
+'''benchmarks the cost of the instrumentation: the same clicks through
+random games before it is enabled, while it is enabled and after it is
+disabled again
+
+run from the repository root:
+    python -m benchmarks.bench_instrument [games] [repeats]'''
+import sys
+
+import CheckersInstrument
+from benchmarks.timing import best_time
+
+
+def main(games=50, repeats=5):
+    def clicks():
+        CheckersInstrument.play_clicks(games)
+
+    before = best_time(clicks, repeats)
+    CheckersInstrument.enable()
+    enabled = best_time(clicks, repeats)
+    CheckersInstrument.disable()
+    after = best_time(clicks, repeats)
+
+    print(f'{games} games x {repeats} repeats')
+    print(f'never enabled {before:8.3f} s')
+    print(f'enabled       {enabled:8.3f} s  {enabled / before:6.2f}x')
+    print(f'disabled      {after:8.3f} s  {after / before:6.2f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+'''benchmarks MCTS playouts per second with random and guided playouts,
+the tree kept between moves, and how root parallelism scales with processes
+
+run from the repository root:
+    python -m benchmarks.bench_mcts [seconds] [max workers]'''
+import random
+import sys
+
+from CheckersEngine import CheckersBoard
+from CheckersMCTS import MCTSEngine, ParallelMCTS
+from benchmarks.timing import scale_workers
+
+
+def main(seconds=2, max_workers=None):
+    for heuristic in (False, True):
+        engine = MCTSEngine(seconds, heuristic=heuristic, seed=0)
+        board = CheckersBoard()
+        engine.search(board)
+        stats = engine.get_stats()
+        print(f"{'guided' if heuristic else 'random'} playouts {stats['playouts_per_second']:10,.0f} playouts/sec"
+              f"  {stats['nodes']:,} nodes")
+
+    # two moves later the tree below them is searched again
+    engine = MCTSEngine(seconds, seed=0)
+    board = CheckersBoard()
+    rng = random.Random(0)
+    for _ in range(3):
+        board.make_move(engine.search(board))
+        board.make_move(rng.choice(board.get_legal_moves()))
+        stats = engine.get_stats()
+        print(f"tree reuse       {stats['kept_nodes']:10,} of {stats['nodes']:,} nodes kept from the last move")
+
+    def measure(workers):
+        engine = ParallelMCTS(workers, seconds)
+        engine.search(CheckersBoard())
+        engine.close()
+        return engine.get_stats()['playouts_per_second']
+
+    scale_workers(measure, max_workers, 'playouts')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+'''benchmarks reading PDN files of millions of games and reading games
+from a binary archive by index
+
+the PDN file repeats a set of random games, each with its own tags. every
+game is parsed, and a sample of them is also replayed through the rules
+
+run from the repository root:
+    python -m benchmarks.bench_pdn [games] [replayed] [distinct]'''
+import os
+import random
+import sys
+import tempfile
+import time
+
+from CheckersBitboard import Bitboard
+import CheckersPDN
+
+
+def random_games(count, seed=0):
+    '''random_games(count[, seed=0]) -> list
+    returns count GameRecords of random play to the end or 150 plies'''
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        bitboard = Bitboard()
+        moves = []
+        while len(moves) < 150:
+            legal = bitboard.get_legal_moves()
+            if len(legal) == 0:
+                break
+            moves.append(rng.choice(legal))
+            bitboard.play_move(moves[-1])
+        result = CheckersPDN.RESULTS[1 - bitboard.player] if len(moves) < 150 else '*'
+        records.append(CheckersPDN.GameRecord(moves, result=result))
+
+    return records
+
+
+def main(games=2000000, replayed=20000, distinct=1000):
+    records = random_games(distinct)
+    bodies = [CheckersPDN.format_game(record) for record in records]
+    (handle, path) = tempfile.mkstemp(suffix='.pdn')
+    archive_path = path[:-4] + '.ckga'
+    try:
+        start = time.perf_counter()
+        with os.fdopen(handle, 'w', encoding='utf-8') as out:
+            for game in range(games):
+                out.write(f'[Event "benchmark"]\n[Round "{game}"]\n{bodies[game % distinct]}')
+        size = os.path.getsize(path)
+        print(f'wrote {games:,} games, {size / 2**20:,.0f} MB, in {time.perf_counter() - start:.1f} s')
+
+        # parse every game without checking the moves
+        start = time.perf_counter()
+        with open(path, encoding='utf-8') as lines:
+            count = sum(1 for _ in CheckersPDN.read_pdn(lines, replay=False))
+        seconds = time.perf_counter() - start
+        if count != games:
+            raise AssertionError(f'parsed {count} games out of {games}')
+        print(f'parse          {count / seconds:12,.0f} games/sec {size / 2**20 / seconds:8.1f} MB/sec')
+
+        # parse and replay the first games
+        start = time.perf_counter()
+        with open(path, encoding='utf-8') as lines:
+            sample = []
+            for record in CheckersPDN.read_pdn(lines):
+                sample.append(record)
+                if len(sample) == replayed:
+                    break
+        seconds = time.perf_counter() - start
+        plies = sum(len(record.get_moves()) for record in sample)
+        print(f'parse + replay {len(sample) / seconds:12,.0f} games/sec {plies / seconds:12,.0f} plies/sec')
+
+        # the archive of the replayed games, read in random order
+        start = time.perf_counter()
+        CheckersPDN.write_archive(archive_path, sample)
+        seconds = time.perf_counter() - start
+        pdn_size = sum(len(bodies[game % distinct]) for game in range(len(sample)))
+        archive_size = os.path.getsize(archive_path)
+        print(f'archive write  {len(sample) / seconds:12,.0f} games/sec'
+              f'   {archive_size / len(sample):.1f} bytes/game vs {pdn_size / len(sample):.1f} in PDN')
+
+        archive = CheckersPDN.Archive(archive_path)
+        order = random.Random(1).sample(range(len(archive)), len(archive))
+        start = time.perf_counter()
+        for index in order:
+            if archive.get_record(index).get_moves() != sample[index].get_moves():
+                raise AssertionError(f'game {index} differs in the archive')
+        seconds = time.perf_counter() - start
+        archive.close()
+        print(f'archive read   {len(order) / seconds:12,.0f} games/sec in random order')
+    finally:
+        os.remove(path)
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
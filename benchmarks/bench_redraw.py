@@ -0,0 +1,73 @@
+'''benchmarks the incremental redraw of the Tk interface against clearing
+and repainting every square after each click, as the game used to do
+needs a display
+
+run from the repository root:
+    python -m benchmarks.bench_redraw [games]'''
+import random
+import sys
+import time
+from tkinter import Canvas, Tk
+
+from CheckersGUI import CheckersGame
+
+
+class Click:
+    '''a stand-in for the Tk event of a click on a square'''
+
+    def __init__(self, widget):
+        self.widget = widget
+
+
+def full_repaint(canvases, board, colors):
+    '''full_repaint(canvases, board, colors)
+    deletes every item of every canvas and draws the pieces again'''
+    for canvas in canvases.values():
+        for item in canvas.find_all():
+            canvas.delete(item)
+    for piece in board.get_all_pieces():
+        canvas = canvases[piece.get_position()]
+        canvas.create_oval(10, 10, 44, 44, fill=colors[piece.get_player()])
+        if piece.get_king():
+            canvas.create_text(27, 35, fill='black', font=('Arial', 30), text='*')
+
+
+def main(games=3):
+    root = Tk()
+    rng = random.Random(0)
+    incremental = 0.0
+    repaint = 0.0
+    clicks = 0
+    squares = 0
+
+    for _ in range(games):
+        game = CheckersGame(root)
+
+        # plain canvases repainted the old way, after the same clicks
+        canvases = {pos: Canvas(root, width=50, height=50) for pos in game.squares}
+        while game.board.get_endgame() is None and clicks < 10000:
+            game.click_on(Click(rng.choice(game.highlight_squares)))
+            start = time.perf_counter()
+            root.update_idletasks()
+            stats = game.get_redraw_stats()
+            incremental += stats['last_seconds'] + time.perf_counter() - start
+            squares += stats['last_squares']
+
+            start = time.perf_counter()
+            full_repaint(canvases, game.board, game.colors)
+            root.update_idletasks()
+            repaint += time.perf_counter() - start
+            clicks += 1
+
+        game.destroy()
+        for canvas in canvases.values():
+            canvas.destroy()
+
+    print(f'{clicks} clicks, {squares / clicks:.1f} squares changed per click')
+    print(f'incremental redraw {incremental / clicks * 1e6:9.1f} us per click')
+    print(f'full repaint       {repaint / clicks * 1e6:9.1f} us per click')
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,41 @@
+'''benchmarks the alpha-beta search: nodes searched and nodes per second
+at a fixed depth, then the depth reached within a time budget
+
+run from the repository root:
+    python -m benchmarks.bench_search [depth] [seconds]'''
+import sys
+
+from benchmarks.bench_bitboard import random_positions
+from CheckersBitboard import Bitboard
+from CheckersSearch import SearchEngine
+
+
+def main(depth=6, seconds=2.0):
+    positions = [Bitboard().get_position()] + random_positions(40, seed=1)[10::10]
+    total_nodes = 0
+    total_seconds = 0.0
+
+    print(f'fixed depth {depth}')
+    for position in positions:
+        bitboard = Bitboard()
+        bitboard.set_position(position)
+        engine = SearchEngine(max_depth=depth, time_limit=float('inf'))
+        engine.search_bitboard(bitboard)
+        stats = engine.get_stats()
+        total_nodes += stats['nodes']
+        total_seconds += stats['seconds']
+        print(f"  {stats['nodes']:10,} nodes {stats['seconds']:8.3f} s {stats['nodes_per_second']:10,.0f} nodes/sec")
+    print(f'  total {total_nodes:,} nodes, {total_nodes / total_seconds:,.0f} nodes/sec')
+
+    print(f'time budget {seconds} s')
+    engine = SearchEngine(time_limit=float(seconds))
+    engine.search_bitboard(Bitboard())
+    stats = engine.get_stats()
+    print(f"  depth {stats['depth']} in {stats['seconds']:.3f} s, {stats['nodes_per_second']:,.0f} nodes/sec")
+    table = stats['table']
+    print(f"  table {table['hits']:,} hits {table['misses']:,} misses {table['collisions']:,} collisions"
+          f" ({table['hit_rate']:.1%} hit rate)")
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
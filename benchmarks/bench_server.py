@@ -0,0 +1,148 @@
+'''load test of the game server: many clients play random moves against
+the engine while thousands of idle games stay open, and the latency of
+every request is measured
+
+starts a server on a Unix socket unless --connect names one, a path or host:port
+run from the repository root:
+    python -m benchmarks.bench_server [--clients 50] [--games 200] [--idle 5000]'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# games are resigned after this many plies
+MAX_PLIES = 200
+
+
+class Client:
+    '''a connection to the server that times its requests'''
+
+    def __init__(self, reader, writer, latencies):
+        '''Client(reader, writer, latencies)
+        creates a client on an open connection appending the seconds
+        of every request to latencies'''
+        self.reader = reader
+        self.writer = writer
+        self.latencies = latencies
+        self.next_id = 0
+
+    async def request(self, **request):
+        '''Client.request(**request) -> dict
+        sends request and returns the answer, one request at a time'''
+        self.next_id += 1
+        request['id'] = self.next_id
+        start = time.perf_counter()
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        answer = json.loads(await self.reader.readline())
+        self.latencies.append(time.perf_counter() - start)
+        if not answer['ok']:
+            raise RuntimeError(answer['error'])
+        return answer
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def connect(where, latencies):
+    '''connect(where, latencies) -> Client
+    opens a client to the Unix socket path or host:port where'''
+    if ':' in where and not os.path.exists(where):
+        (host, _, port) = where.rpartition(':')
+        (reader, writer) = await asyncio.open_connection(host, int(port))
+    else:
+        (reader, writer) = await asyncio.open_unix_connection(where)
+    return Client(reader, writer, latencies)
+
+
+async def play_games(where, games, engine, seed, latencies):
+    '''play_games(where, games, engine, seed, latencies) -> int
+    plays games games of random moves against engine, returns the plies played'''
+    rng = random.Random(seed)
+    client = await connect(where, latencies)
+    plies = 0
+    for _ in range(games):
+        answer = await client.request(cmd='new', engine=engine, side=rng.randrange(2))
+        for _ in range(MAX_PLIES // 2):
+            if answer['result'] is not None:
+                break
+            answer = await client.request(cmd='move', game=answer['game'], move=rng.choice(answer['moves']))
+            plies += 1 + (answer['reply'] is not None)
+        if answer['result'] is None:
+            await client.request(cmd='resign', game=answer['game'])
+    await client.close()
+    return plies
+
+
+def percentile(values, fraction):
+    '''percentile(values, fraction) -> float
+    returns the value below which fraction of the sorted values lie'''
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def load_test(where, clients, games, engine, idle):
+    idle_latencies = []
+    client = await connect(where, idle_latencies)
+    for _ in range(idle):
+        await client.request(cmd='new')
+
+    latencies = []
+    start = time.perf_counter()
+    per_client = [games // clients + (k < games % clients) for k in range(clients)]
+    plies = await asyncio.gather(*[play_games(where, per_client[k], engine, k, latencies) for k in range(clients)])
+    seconds = time.perf_counter() - start
+    stats = await client.request(cmd='stats')
+    await client.close()
+
+    latencies.sort()
+    print(f'{games} games against {engine} by {clients} clients with {idle} idle games open')
+    print(f'{len(latencies):,} requests, {sum(plies):,} plies in {seconds:.1f} s')
+    print(f'{games / seconds:10.2f} games/sec {len(latencies) / seconds:10,.0f} requests/sec')
+    print(f'latency p50 {1000 * percentile(latencies, 0.5):8.2f} ms   p99 {1000 * percentile(latencies, 0.99):8.2f} ms'
+          f'   max {1000 * latencies[-1]:8.2f} ms')
+    print(f"server: {stats['open_games']} open games, {stats['engine_moves']:,} engine moves")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='load test of the Checkers server')
+    parser.add_argument('--connect', default=None, help='a running server, a socket path or host:port')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--idle', type=int, default=5000, help='games opened and left open first')
+    parser.add_argument('--engine', default='search:depth=2')
+    parser.add_argument('--workers', type=int, default=None, help='engine processes of the started server')
+    options = parser.parse_args(args)
+
+    server = None
+    where = options.connect
+    if where is None:
+        where = os.path.join(tempfile.mkdtemp(), 'checkers.sock')
+        command = [sys.executable, 'CheckersServer.py', '--unix', where, '--max-games', str(options.idle + 10000)]
+        if options.workers is not None:
+            command += ['--workers', str(options.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()
+
+    try:
+        asyncio.run(load_test(where, options.clients, options.games, options.engine, options.idle))
+    finally:
+        if server is not None:
+            # the server shuts its engine processes down on SIGTERM
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+            if os.path.exists(where):
+                os.remove(where)
+                os.rmdir(os.path.dirname(where))
+
+
+if __name__ == '__main__':
+    main()
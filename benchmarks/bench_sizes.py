@@ -0,0 +1,42 @@
+'''benchmarks legal move generation on 8x8, 10x10 and 12x12 boards, for
+the bitboard alone and through CheckersBoard, and perft from the start
+
+run from the repository root:
+    python -m benchmarks.bench_sizes [positions] [perft depth]'''
+import sys
+import time
+
+from benchmarks.bench_bitboard import random_positions, time_positions
+from CheckersBitboard import Bitboard
+from CheckersEngine import CheckersBoard
+from CheckersPerft import perft
+
+SIZES = ((8, 8), (10, 10), (12, 12))
+
+
+def main(count=2000, depth=5):
+    print(f"{'board':8} {'legal moves':>16} {'playable pieces':>16} {'perft ' + str(depth):>16}")
+    for (rows, columns) in SIZES:
+        positions = random_positions(count, 0, rows, columns)
+        bitboard = Bitboard(rows, columns)
+        board = CheckersBoard(rows, columns)
+
+        def legal_moves(position):
+            bitboard.set_position(position)
+            bitboard.get_legal_moves()
+
+        def playable_pieces(position):
+            board.set_position(position)
+            board.get_playable_pieces()
+
+        legal_rate = time_positions(legal_moves, positions, 3)
+        playable_rate = time_positions(playable_pieces, positions, 3)
+
+        start = time.perf_counter()
+        nodes = perft(Bitboard(rows, columns), depth)
+        perft_rate = nodes / (time.perf_counter() - start)
+        print(f'{rows}x{columns:<5} {legal_rate:12,.0f} /sec {playable_rate:12,.0f} /sec {perft_rate:12,.0f} /sec')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
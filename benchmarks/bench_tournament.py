@@ -0,0 +1,24 @@
+'''benchmarks how tournament throughput scales with worker processes
+
+run from the repository root:
+    python -m benchmarks.bench_tournament [games] [max workers]'''
+import io
+import sys
+
+from CheckersTournament import make_tasks, run_tournament
+from benchmarks.timing import scale_workers
+
+
+def main(games=32, max_workers=None):
+    # fixed-depth players so every run does the same work
+    tasks = make_tasks(games, 'search:depth=3', 'search:depth=2', 4, float('inf'), 200)
+
+    def measure(workers):
+        totals = run_tournament(tasks, workers, out=io.StringIO())
+        return totals['games'] / totals['wall_seconds']
+
+    scale_workers(measure, max_workers, 'games')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
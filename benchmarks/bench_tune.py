@@ -0,0 +1,61 @@
+'''benchmarks counting evaluation features with NumPy against evaluating
+one position at a time, and fitting the weights to millions of positions
+read from a memory-mapped feature file
+
+run from the repository root:
+    python -m benchmarks.bench_tune [positions] [fitted positions]'''
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from CheckersBatch import BatchMoveGenerator
+from CheckersBitboard import Bitboard
+from CheckersSearch import FEATURES, evaluate
+import CheckersTune
+from benchmarks.bench_bitboard import random_positions
+
+
+def main(count=100000, fitted=2000000):
+    positions = random_positions(count)
+
+    start = time.perf_counter()
+    features = CheckersTune.compute_features(positions, BatchMoveGenerator())
+    batch = count / (time.perf_counter() - start)
+
+    # one evaluate per feature and position, the way a tuner built on the engine would
+    bitboard = Bitboard()
+    units = [{name: int(name == feature) for name in FEATURES} for feature in FEATURES]
+    sample = positions[:count // 10]
+    start = time.perf_counter()
+    for position in sample:
+        bitboard.set_position(position)
+        [evaluate(bitboard, weights) for weights in units]
+    single = len(sample) / (time.perf_counter() - start)
+    print(f'one by one {single:12,.0f} positions/sec')
+    print(f'numpy      {batch:12,.0f} positions/sec  ({batch / single:.1f}x)')
+
+    # a feature file of fitted rows, labelled by a known set of weights
+    rng = np.random.default_rng(0)
+    true_weights = np.array([0.8, 1.2, 0.05, 0.1, 0.02])
+    rows = features[rng.integers(0, count, fitted)]
+    chance = 1 / (1 + np.exp(-rows @ true_weights))
+    data = np.empty((fitted, len(FEATURES) + 1), dtype=np.float32)
+    data[:, :-1] = rows
+    data[:, -1] = rng.random(fitted) < chance
+    path = os.path.join(tempfile.mkdtemp(), 'bench.ckft')
+    data.tofile(path)
+    del rows, chance, data
+
+    start = time.perf_counter()
+    (weights, loss) = CheckersTune.fit(CheckersTune.load_features(path))
+    seconds = time.perf_counter() - start
+    print(f'fit {fitted:,} positions in {seconds:.2f} s, log loss {loss:.4f}')
+    print('  fitted', np.round(weights, 3), ' true', true_weights)
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
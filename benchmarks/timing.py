@@ -0,0 +1,38 @@
+'''timing helpers shared by the benchmarks: the best of several runs, and
+how a rate scales with the number of worker processes'''
+import os
+import time
+
+
+def best_time(function, repeats):
+    '''best_time(function, repeats) -> float
+    returns the fastest of repeats runs of function in seconds'''
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def worker_counts(max_workers=None):
+    '''worker_counts([max_workers=None]) -> list
+    returns the powers of two up to max_workers and max_workers itself,
+    the number of cores if max_workers is None'''
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    return sorted(set([2**i for i in range(max_workers.bit_length()) if 2**i <= max_workers] + [max_workers]))
+
+
+def scale_workers(measure, max_workers=None, unit='tasks'):
+    '''scale_workers(measure[, max_workers=None, unit='tasks'])
+    prints the rate in units per second that measure(workers) returns for
+    every number of workers of worker_counts(max_workers), with its speedup
+    and efficiency over the fewest workers'''
+    base_rate = None
+    for workers in worker_counts(max_workers):
+        rate = measure(workers)
+        if base_rate is None:
+            base_rate = rate
+        print(f'{workers:3} workers {rate:12,.1f} {unit}/sec  speedup {rate / base_rate:5.2f}x'
+              f'  efficiency {rate / base_rate / workers:6.1%}')